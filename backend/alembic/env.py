@@ -20,6 +20,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.models.base import Base
 from app.models.document import Document
 from app.models.chunk import Chunk
+from app.models.document_text import DocumentText
+from app.models.chunk_signature import ChunkSignature, ChunkLshBand
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
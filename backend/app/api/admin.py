@@ -0,0 +1,112 @@
+"""
+Admin API endpoints
+
+Every route requires the X-Admin-Token header to match ADMIN_TOKEN; with no
+token configured the admin API is disabled.
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+import hmac
+import logging
+from app.config import get_settings
+from app.services.vector_index import VectorIndexService, INDEX_TYPES
+from app import database
+from app.utils import profiler, slow_queries
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    """Dependency rejecting requests without the admin token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled: ADMIN_TOKEN is not set")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/vector-index")
+def vector_index_status():
+    """Embedding index definition, size, last build and recommended parameters"""
+    try:
+        return VectorIndexService.status()
+    except Exception as e:
+        logger.error(f"❌ Error reading vector index status: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _rebuild_in_background(index_type: str, concurrently: bool):
+    try:
+        VectorIndexService.rebuild(index_type=index_type, concurrently=concurrently)
+    except Exception as e:
+        logger.error(f"❌ Vector index rebuild failed: {str(e)}", exc_info=True)
+
+
+@router.post("/vector-index/rebuild")
+def rebuild_vector_index(
+    background_tasks: BackgroundTasks,
+    index_type: str = Query(None, description="ivfflat or hnsw (default from settings)"),
+    concurrently: bool = Query(True, description="Build without blocking writes"),
+    wait: bool = Query(False, description="Return the build report instead of building in the background")
+):
+    """Rebuild the embedding index sized for the current rows"""
+    if index_type and index_type.lower() not in INDEX_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported index type: {index_type}")
+    if not wait:
+        background_tasks.add_task(_rebuild_in_background, index_type, concurrently)
+        return {"status": "scheduled"}
+    try:
+        return VectorIndexService.rebuild(index_type=index_type, concurrently=concurrently)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Vector index rebuild failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/profiles")
+def list_profiles():
+    """Stored request profiles, newest first"""
+    return {"enabled": settings.PROFILING_ENABLED, "profiles": profiler.list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """Download a request profile; open it at https://www.speedscope.app"""
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
+
+@router.get("/slow-queries")
+def list_slow_queries(
+    kind: str = Query(None, description="retrieval, ingestion or other"),
+    limit: int = Query(50, ge=1, le=500),
+    include_indexes: bool = Query(True, description="Also list the indexes with size and scan counts")
+):
+    """Recent statements over SLOW_QUERY_MS, with sampled EXPLAIN plans"""
+    report = {
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "explain_sample_rate": settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        "queries": slow_queries.recent(kind, limit),
+    }
+    if include_indexes:
+        if database.engine is None:
+            raise HTTPException(status_code=503, detail="Database not initialized")
+        try:
+            report["indexes"] = slow_queries.index_listing(database.engine)
+        except Exception as e:
+            logger.error(f"❌ Error listing indexes: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+    return report
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries():
+    """Forget the captured statements"""
+    slow_queries.clear()
+    return {"status": "cleared"}
@@ -2,19 +2,28 @@
 Document API endpoints
 """
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
-from app.database import get_db
-from app.schemas.document import DocumentResponse
+from app import database
+from app.database import get_db, get_read_db
+from app.schemas.document import DocumentResponse, DocumentPage, BulkDeleteRequest
 from app.services.ingestion import IngestionService
 from app.services.chunking import ChunkingService
+from app.services.jobs import JobService
+from app.config import get_settings
+from app.utils.file_parser import EXTRACTION_PROFILES
+from app.utils.responses import FastJSONResponse
+from app.utils.uploads import UploadStager, UploadLimitError
+from typing import List
 import uuid
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
-UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR = Path(get_settings().UPLOAD_DIR)
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 
@@ -22,6 +31,7 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 async def upload_document(
     file: UploadFile = File(...),
     title: str = Query(None),
+    extraction_profile: str = Query(None, description="PDF extraction profile: fast, balanced or full"),
     db: Session = Depends(get_db)
 ):
     """Upload and process a document"""
@@ -36,6 +46,12 @@ async def upload_document(
                 detail=f"Unsupported file type: {file_ext}"
             )
         
+        if extraction_profile and extraction_profile.lower() not in EXTRACTION_PROFILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported extraction profile: {extraction_profile}"
+            )
+        
         # Save file
         file_id = str(uuid.uuid4())
         file_path = UPLOAD_DIR / f"{file_id}.{file_ext}"
@@ -45,21 +61,24 @@ async def upload_document(
             f.write(content)
         logger.info(f"✅ File saved to: {file_path}")
         
-        # Create document in database with chunking
+        # Create document in database with chunking; parsing and embedding
+        # block for long, so not on the event loop serving async queries
         logger.info(f"📝 Creating document in database...")
-        document = IngestionService.create_document(
+        document = await run_in_threadpool(
+            IngestionService.create_document,
             db=db,
             filename=file.filename,
             file_type=file_ext,
             file_path=str(file_path),
             title=title or file.filename,
-            content_type=f"application/{file_ext}"
+            content_type=f"application/{file_ext}",
+            extraction_profile=extraction_profile
         )
         logger.info(f"✅ Document created: {document.id}")
         logger.info(f"   Filename: {document.filename}")
         logger.info(f"   File size: {document.file_size} bytes")
         
-        return document
+        return FastJSONResponse(DocumentResponse.model_validate(document))
     
     except HTTPException:
         raise
@@ -68,19 +87,112 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/upload_batch")
+async def upload_documents_batch(
+    files: List[UploadFile] = File(..., description="Documents and/or zip archives of documents"),
+    extraction_profile: str = Query(None, description="PDF extraction profile: fast, balanced or full"),
+    background: bool = Query(None, description="Run as a job (default: only batches over the inline limits)")
+):
+    """
+    Upload many documents in one request
+
+    Returns the per-file results, or for large batches (or background=true)
+    202 with a job id to poll at /api/jobs/{job_id}. A file that fails does
+    not stop the others.
+    """
+    if extraction_profile and extraction_profile.lower() not in EXTRACTION_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported extraction profile: {extraction_profile}"
+        )
+
+    if database.SessionLocal is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Batch uploads need the primary database, which is not configured"
+        )
+
+    settings = get_settings()
+    stager = UploadStager(UPLOAD_DIR, settings.BATCH_UPLOAD_MAX_FILES, settings.BATCH_UPLOAD_MAX_BYTES)
+    try:
+        for file in files:
+            await stager.add(file)
+    except UploadLimitError as e:
+        stager.discard()
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        stager.discard()
+        raise
+    logger.info(f"📤 Staged batch upload: {len(stager.entries)} files, {stager.total_bytes} bytes")
+
+    if background is None:
+        background = (
+            len(stager.entries) > settings.BATCH_UPLOAD_INLINE_MAX_FILES
+            or stager.total_bytes > settings.BATCH_UPLOAD_INLINE_MAX_BYTES
+        )
+    if background:
+        job = JobService.submit(
+            "upload_batch", IngestionService.create_documents_batch, stager.entries, extraction_profile
+        )
+        return FastJSONResponse({"job_id": job.id, "files": len(stager.entries)}, status_code=202)
+    result = await run_in_threadpool(
+        IngestionService.create_documents_batch, None, stager.entries, extraction_profile
+    )
+    return FastJSONResponse(result)
+
+
 @router.get("/{document_id}", response_model=DocumentResponse)
-def get_document(document_id: str, db: Session = Depends(get_db)):
+async def get_document(document_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get document by ID"""
-    document = IngestionService.get_document(db, document_id)
+    document = await IngestionService.get_document_async(db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
-    return document
+    return FastJSONResponse(DocumentResponse.model_validate(document))
+
 
+@router.get("", response_model=DocumentPage)
+async def list_documents(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = Query(None, description="next_cursor of the previous page"),
+    filename_prefix: str = Query(None),
+    content_type: str = Query(None),
+    include_chunk_counts: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List documents, newest first, one page per request"""
+    try:
+        items, next_cursor = await IngestionService.list_documents_page_async(
+            db,
+            limit=limit,
+            cursor=cursor,
+            filename_prefix=filename_prefix,
+            content_type=content_type,
+            include_chunk_counts=include_chunk_counts
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Rows already have the DocumentListItem fields and types from the query:
+    # serialize them as they are instead of building and validating 10k models
+    for item in items:
+        item.setdefault("chunk_count", None)
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
 
-@router.get("", response_model=list)
-def list_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """List all documents"""
-    return IngestionService.list_documents(db, skip, limit)
+
+@router.post("/bulk_delete", status_code=202)
+def bulk_delete_documents(request: BulkDeleteRequest, db: Session = Depends(get_db)):
+    """Delete matching documents in a background job; poll /api/jobs/{job_id}"""
+    try:
+        targets = IngestionService.find_documents_to_delete(
+            db,
+            document_ids=request.document_ids,
+            filename_prefix=request.filename_prefix,
+            content_type=request.content_type,
+            uploaded_before=request.uploaded_before
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = JobService.submit("bulk_delete", IngestionService.delete_documents, targets)
+    return {"job_id": job.id, "documents": len(targets)}
 
 
 @router.delete("/{document_id}")
@@ -0,0 +1,22 @@
+"""
+Background job API endpoints
+"""
+from fastapi import APIRouter, HTTPException
+from app.services.jobs import JobService
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("")
+def list_jobs():
+    """Background jobs of this worker, newest first"""
+    return JobService.list_jobs()
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Status, progress and result of a background job"""
+    job = JobService.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -2,21 +2,23 @@
 Query API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
-from app.database import get_db
-from app.schemas.query import QueryRequest, QueryResponse
+from app.database import get_read_db
+from app.schemas.query import QueryRequest, QueryResponse, ChunkPreview, SourceReference
 from app.services.retrieval import RetrievalService
 from app.services.synthesis import SynthesisService
+from app.utils.gemini import is_quota_error
+from app.utils.responses import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/queries", tags=["queries"])
 
 
 @router.post("/ask", response_model=QueryResponse)
-def ask_question(
+async def ask_question(
     request: QueryRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Ask a question and get an answer with sources"""
     try:
@@ -25,48 +27,50 @@ def ask_question(
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
         # Retrieve relevant chunks
-        chunks = RetrievalService.retrieve_chunks(
+        chunks = await RetrievalService.retrieve_chunks_async(
             db,
             request.query,
             top_k=request.top_k or 5
         )
         
         if not chunks:
-            return QueryResponse(
+            return FastJSONResponse(QueryResponse(
                 query=request.query,
                 answer="I don't have any relevant information to answer your question.",
                 chunks=[],
                 sources=[]
-            )
+            ))
         
         # Generate answer
-        answer = SynthesisService.generate_answer(request.query, chunks)
+        answer = await SynthesisService.generate_answer_async(request.query, chunks)
         
         # Format sources
-        sources = SynthesisService.format_sources(chunks)
+        sources = [SourceReference.model_construct(**source) for source in SynthesisService.format_sources(chunks)]
         
         # Format chunks for response
         formatted_chunks = [
-            {
-                "id": chunk.id,
-                "content": chunk.content[:300] + "..." if len(chunk.content) > 300 else chunk.content,
-                "score": score,
-                "source": chunk.chunk_metadata.get("document_filename") if chunk.chunk_metadata else "Unknown"
-            }
+            ChunkPreview.model_construct(
+                id=chunk.id,
+                content=chunk.text[:300] + "..." if len(chunk.text) > 300 else chunk.text,
+                score=float(score),
+                source=chunk.document_filename or "Unknown"
+            )
             for chunk, score in chunks
         ]
         
-        return QueryResponse(
+        # Built from typed values already, so sent without validating it again
+        return FastJSONResponse(QueryResponse.model_construct(
             query=request.query,
             answer=answer,
             chunks=formatted_chunks,
-            sources=sources
-        )
+            sources=sources,
+            total_tokens=None
+        ))
     
     except ValueError as e:
         error_msg = str(e)
         # Check if it's a quota error
-        if "quota" in error_msg.lower():
+        if is_quota_error(e):
             logger.error(f"API quota exceeded: {error_msg}")
             raise HTTPException(
                 status_code=429,
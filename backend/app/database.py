@@ -1,17 +1,64 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from fastapi import Header
+from typing import Generator, AsyncGenerator
 from app.config import get_settings
+from app.utils.pool_metrics import metered_pool_class
+from app.utils.replica_router import Replica, ReplicaRouter
+from app.utils import slow_queries
 
 settings = get_settings()
 
+
+def _async_url(url: str) -> str:
+    """Database URL with an async-capable driver (psycopg 3 serves both)"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+
+def _engine_options(name: str, async_pool: bool = False) -> dict:
+    """Pool and driver options from settings, with a metered pool class"""
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode hands each transaction a different server
+        # connection, so server-side prepared statements cannot be reused
+        connect_args["prepare_threshold"] = None
+    elif settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return {
+        "poolclass": metered_pool_class(AsyncAdaptedQueuePool if async_pool else QueuePool, name),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def _apply_statement_timeout(sync_engine):
+    """Per-transaction statement timeout for PgBouncer mode"""
+    if not settings.DB_PGBOUNCER or settings.DB_STATEMENT_TIMEOUT_MS <= 0:
+        return
+    timeout_ms = int(settings.DB_STATEMENT_TIMEOUT_MS)
+
+    # PgBouncer rejects the startup "options" parameter and a session-level SET
+    # would leak to other clients of the server connection; SET LOCAL ends with
+    # the transaction
+    @event.listens_for(sync_engine, "begin")
+    def set_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
 # Create database engine
 try:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=3600,
-    )
+    engine = create_engine(settings.DATABASE_URL, **_engine_options("primary"))
+    _apply_statement_timeout(engine)
+    slow_queries.install(engine, "primary")
     # Create session factory
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 except Exception as e:
@@ -21,6 +68,50 @@ except Exception as e:
     SessionLocal = None
     engine = None
 
+# Async engine for endpoints that wait on Postgres and Gemini without
+# holding a threadpool worker
+try:
+    async_engine = create_async_engine(
+        _async_url(settings.DATABASE_URL),
+        **_engine_options("primary_async", async_pool=True)
+    )
+    _apply_statement_timeout(async_engine.sync_engine)
+    slow_queries.install(async_engine.sync_engine, "primary_async")
+    # Loaded objects stay usable after commit, lazy loads are not possible in async code
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+except Exception as e:
+    import logging
+    logging.warning(f"Async database initialization warning: {e}. Async endpoints disabled.")
+    AsyncSessionLocal = None
+    async_engine = None
+
+# Read replicas for retrieval and document reads, the primary is the fallback
+replicas = []
+for index, replica_url in enumerate(
+    url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+):
+    try:
+        replica_engine = create_async_engine(
+            _async_url(replica_url),
+            **_engine_options(f"replica_{index}", async_pool=True)
+        )
+        _apply_statement_timeout(replica_engine.sync_engine)
+        slow_queries.install(replica_engine.sync_engine, f"replica_{index}")
+        replicas.append(Replica(f"replica_{index}", replica_engine))
+    except Exception as e:
+        import logging
+        logging.warning(f"Read replica {index} initialization warning: {e}. Skipping it.")
+
+read_router = ReplicaRouter(
+    async_engine,
+    replicas,
+    selection=settings.REPLICA_SELECTION,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_LAG_CHECK_SECONDS,
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency for getting database session"""
@@ -34,3 +125,42 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting an async database session"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError(
+            "Async database not initialized. Please set DATABASE_URL in .env "
+            "and ensure PostgreSQL is running."
+        )
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db(
+    x_consistent_read: bool = Header(False, description="Read from the primary"),
+    x_read_after: float = Header(0.0, description="Unix time of a write the read must see")
+) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting a read-only async session, on a replica when one is fresh enough"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError(
+            "Async database not initialized. Please set DATABASE_URL in .env "
+            "and ensure PostgreSQL is running."
+        )
+    bind = await read_router.choose(consistent=x_consistent_read, written_at=x_read_after)
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+
+def pool_stats() -> list:
+    """Checkout wait, in-use and overflow counts of every connection pool"""
+    stats = []
+    for bound in (engine, async_engine, *(replica.engine for replica in replicas)):
+        if bound is None:
+            continue
+        pool = bound.pool
+        metrics = getattr(pool, "metrics", None)
+        if metrics is not None:
+            stats.append(metrics.snapshot(pool))
+    return stats
@@ -1,12 +1,20 @@
 """
 FastAPI application main entry point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.api import documents, queries
+from app.api import documents, queries, admin, jobs
 from app.config import get_settings
+from app.database import pool_stats
+from app.services.jobs import JobService
+from app.utils import lifecycle, metrics, profiler
+from app.utils.compression import CompressionMiddleware
+from app.utils.responses import FastJSONResponse
+import asyncio
 import logging
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +27,8 @@ app = FastAPI(
     title="RAG System with Gemini",
     description="Retrieval-Augmented Generation system using Google Gemini API",
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -32,9 +41,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_MIN_BYTES > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+if settings.METRICS_ENABLED:
+    @app.middleware("http")
+    async def count_in_flight(request, call_next):
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            return await call_next(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+
+    # Values owned by the pools and the job registry are read at scrape time
+    metrics.JOBS.set_function(lambda: {(status,): count for status, count in JobService.status_counts().items()})
+    metrics.DB_POOL_IN_USE.set_function(lambda: {(pool["pool"],): pool.get("in_use", 0) for pool in pool_stats()})
+    metrics.DB_POOL_OVERFLOW.set_function(lambda: {(pool["pool"],): pool.get("overflow", 0) for pool in pool_stats()})
+    metrics.DB_POOL_CHECKOUT_WAIT.set_function(lambda: {(pool["pool"],): pool["wait_seconds_total"] for pool in pool_stats()})
+    metrics.DB_POOL_TIMEOUTS.set_function(lambda: {(pool["pool"],): pool["timeouts"] for pool in pool_stats()})
+
+if settings.PROFILING_ENABLED:
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        if "x-profile" not in request.headers or not profiler.client_allowed(
+            request.client.host if request.client else None
+        ):
+            return await call_next(request)
+        if not profiler.try_begin():
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = "another request is being profiled"
+            return response
+        try:
+            sampler = profiler.SamplingProfiler(settings.PROFILING_INTERVAL_MS / 1000)
+            sampler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                report = sampler.stop(threading.get_ident(), f"{request.method} {request.url.path}")
+            profile_id = await asyncio.to_thread(profiler.save, report)
+        finally:
+            profiler.end()
+        logger.info(f"🔬 Profiled {request.method} {request.url.path}: {profile_id}")
+        response.headers["X-Profile-Id"] = profile_id
+        return response
+
 # Include routers
 app.include_router(documents.router)
 app.include_router(queries.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -56,16 +116,32 @@ def health():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/pool")
+def health_pool():
+    """Database connection pool metrics"""
+    return {"pools": pool_stats()}
+
+
 @app.on_event("startup")
 async def startup_event():
     """Startup event handler"""
     logger.info("RAG System API starting up...")
+    await lifecycle.warm_up()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event handler"""
     logger.info("RAG System API shutting down...")
+    await lifecycle.drain()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 from .base import Base
 from .document import Document
 from .chunk import Chunk
+from .document_text import DocumentText
+from .chunk_signature import ChunkSignature, ChunkLshBand
 
-__all__ = ["Base", "Document", "Chunk"]
+__all__ = ["Base", "Document", "Chunk", "DocumentText", "ChunkSignature", "ChunkLshBand"]
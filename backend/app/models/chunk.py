@@ -14,9 +14,28 @@ class Chunk(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
-    content = Column(Text, nullable=False)
+    # NULL for span-stored chunks, whose text is document_texts.content[start_char:end_char]
+    content = Column(Text, nullable=True)
     chunk_index = Column(Integer, nullable=True)
+    start_char = Column(Integer, nullable=True)
+    end_char = Column(Integer, nullable=True)
     # Use configured embedding dimension from settings to keep a single source of truth
     embedding = Column(Vector(get_settings().EMBEDDING_DIMENSION), nullable=True)
     chunk_metadata = Column(JSONB, nullable=True)
+    # Canonical chunk this one near-duplicates; its embedding is reused instead of a new API call
+    duplicate_of = Column(UUID(as_uuid=True), ForeignKey("chunks.id", ondelete="SET NULL"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    @property
+    def text(self) -> str:
+        """Chunk text: inline content, or the span materialized by ChunkStore"""
+        if self.content is not None:
+            return self.content
+        return getattr(self, "_span_text", None)
+    
+    @property
+    def document_filename(self) -> str:
+        """Source filename from chunk metadata, or as materialized by ChunkStore"""
+        if self.chunk_metadata and "document_filename" in self.chunk_metadata:
+            return self.chunk_metadata["document_filename"]
+        return getattr(self, "_document_filename", None)
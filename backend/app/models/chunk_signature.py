@@ -0,0 +1,22 @@
+from sqlalchemy import Column, ForeignKey, LargeBinary, SmallInteger, BigInteger
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+
+
+class ChunkSignature(Base):
+    """MinHash signature of a canonical (non-duplicate) chunk"""
+    
+    __tablename__ = "chunk_signatures"
+    
+    chunk_id = Column(UUID(as_uuid=True), ForeignKey("chunks.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+
+class ChunkLshBand(Base):
+    """LSH bucket of one signature band, the near-duplicate candidate index"""
+    
+    __tablename__ = "chunk_lsh_bands"
+    
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    chunk_id = Column(UUID(as_uuid=True), ForeignKey("chunks.id", ondelete="CASCADE"), primary_key=True, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer
+from sqlalchemy import Column, String, DateTime, Text, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 import uuid
@@ -17,3 +17,10 @@ class Document(Base):
     file_size = Column(Integer, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     doc_metadata = Column(JSONB, nullable=True)
+    
+    __table_args__ = (
+        # Keyset pagination of listings, newest first
+        Index("ix_documents_uploaded_at_id", uploaded_at.desc(), id.desc()),
+        # Filename prefix filters (LIKE 'prefix%') regardless of collation
+        Index("ix_documents_filename_pattern", filename, postgresql_ops={"filename": "varchar_pattern_ops"}),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.models.base import Base
+
+
+class DocumentText(Base):
+    """Cleaned full text of a document, referenced by span-stored chunks"""
+    
+    __tablename__ = "document_texts"
+    
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
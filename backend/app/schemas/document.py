@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
+# Document.doc_metadata keys never returned by the API
+SERVER_ONLY_METADATA = ("file_path",)
+
 
 class DocumentBase(BaseModel):
     """Base document schema"""
@@ -23,5 +26,38 @@ class DocumentResponse(DocumentBase):
     uploaded_at: datetime
     doc_metadata: Optional[dict] = None
     
+    @field_validator("doc_metadata")
+    @classmethod
+    def hide_server_fields(cls, value):
+        """Leave out metadata only the server uses (the upload's path on disk)"""
+        if value is None:
+            return value
+        return {key: item for key, item in value.items() if key not in SERVER_ONLY_METADATA}
+    
     class Config:
         from_attributes = True
+
+
+class DocumentListItem(BaseModel):
+    """Schema for a document in listings (no metadata)"""
+    id: UUID
+    filename: str
+    title: Optional[str] = None
+    content_type: Optional[str] = None
+    file_size: Optional[int] = None
+    uploaded_at: datetime
+    chunk_count: Optional[int] = None
+
+
+class DocumentPage(BaseModel):
+    """Schema for one page of a document listing"""
+    items: List[DocumentListItem]
+    next_cursor: Optional[str] = None
+
+
+class BulkDeleteRequest(BaseModel):
+    """Schema for a bulk delete: IDs and/or filters, all given conditions must match"""
+    document_ids: Optional[List[UUID]] = None
+    filename_prefix: Optional[str] = None
+    content_type: Optional[str] = None
+    uploaded_before: Optional[datetime] = None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from uuid import UUID
 
 
 class QueryRequest(BaseModel):
@@ -8,10 +9,27 @@ class QueryRequest(BaseModel):
     top_k: Optional[int] = 5
 
 
+class ChunkPreview(BaseModel):
+    """Schema for a retrieved chunk in a query response"""
+    id: UUID
+    content: str
+    score: float
+    source: str
+
+
+class SourceReference(BaseModel):
+    """Schema for a source reference in a query response"""
+    document: str
+    category: Optional[str] = None
+    chunk_index: Optional[int] = None
+    relevance_score: float
+    content_preview: str
+
+
 class QueryResponse(BaseModel):
     """Schema for query response"""
     query: str
     answer: str
-    chunks: list
-    sources: list
+    chunks: List[ChunkPreview]
+    sources: List[SourceReference]
     total_tokens: Optional[int] = None
@@ -0,0 +1,209 @@
+"""
+Span-referenced chunk storage
+
+In span mode (CHUNK_STORAGE_MODE=span) a chunk row keeps only document_id,
+start_char and end_char; the text is stored once per document in
+document_texts, so overlapping chunk text and per-row filenames are not
+duplicated. ChunkStore turns spans back into text: chunks of documents in
+the in-memory hot cache are sliced locally, all others are read with one
+substring query.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from collections import OrderedDict
+import threading
+import zlib
+import logging
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.models.document_text import DocumentText
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Uncached documents whose span reads are counted before the counts are reset
+MAX_TRACKED_DOCUMENTS = 10000
+
+
+class CompressedTextCache:
+    """LRU of zlib-compressed document texts, bounded by compressed bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # document_id -> (compressed text, filename)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, document_id):
+        """(text, filename) of a cached document, or None"""
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(document_id)
+        compressed, filename = entry
+        return zlib.decompress(compressed).decode("utf-8", "surrogatepass"), filename
+
+    def put(self, document_id, text: str, filename: str = None):
+        if self.max_bytes <= 0:
+            return
+        # Level 1: hot-path reads decompress, text compresses well even at the fastest level
+        compressed = zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+        if len(compressed) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(document_id)
+            self._entries[document_id] = (compressed, filename)
+            self._size += len(compressed)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def discard(self, document_id):
+        with self._lock:
+            self._discard(document_id)
+
+    def _discard(self, document_id):
+        entry = self._entries.pop(document_id, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+
+class ChunkStore:
+    """Stores and materializes span-referenced chunk text"""
+
+    settings = get_settings()
+    cache = CompressedTextCache(settings.CHUNK_TEXT_CACHE_MB * 1024 * 1024)
+    _reads = {}  # document_id -> span reads since the last admission check
+    _reads_lock = threading.Lock()
+
+    @staticmethod
+    def span_mode() -> bool:
+        """Whether new chunks are stored as spans"""
+        return ChunkStore.settings.CHUNK_STORAGE_MODE.lower() == "span"
+
+    @staticmethod
+    def save_document_text(db: Session, document_id, text: str, filename: str = None):
+        """Add the single stored copy of a document's cleaned text (caller commits)"""
+        db.add(DocumentText(document_id=document_id, content=text))
+        ChunkStore.cache.put(document_id, text, filename)
+
+    @staticmethod
+    def extend_document_text(db: Session, document_id, text: str, stored: int = None, filename: str = None):
+        """
+        Store a document's text as it grows during streaming ingestion (caller commits)
+
+        Chunk batches are committed before the whole document is read; storing
+        the text along with each batch keeps their spans resolvable meanwhile.
+
+        Args:
+            db: Database session
+            document_id: Document the text belongs to
+            text: Cleaned text so far
+            stored: Characters of text already stored, None if nothing is yet
+            filename: Document filename once text is complete, to cache it hot
+        """
+        if stored is None:
+            db.add(DocumentText(document_id=document_id, content=text))
+        elif len(text) > stored:
+            db.query(DocumentText).filter(DocumentText.document_id == document_id).update(
+                {DocumentText.content: DocumentText.content + text[stored:]},
+                synchronize_session=False
+            )
+        if filename is not None:
+            ChunkStore.cache.put(document_id, text, filename)
+
+    @staticmethod
+    def attach(chunk: Chunk, text: str, filename: str = None):
+        """Give a span chunk its text in memory (never written back to the row)"""
+        chunk._span_text = text
+        chunk._document_filename = filename
+
+    @staticmethod
+    def materialize(db: Session, chunks: list) -> list:
+        """
+        Fill in the text of span-stored chunks
+
+        Args:
+            db: Database session
+            chunks: Chunk instances, inline chunks are left as they are
+
+        Returns:
+            The same chunks, with chunk.text and chunk.document_filename set
+        """
+        pending = [
+            chunk for chunk in chunks
+            if chunk.content is None and getattr(chunk, "_span_text", None) is None
+        ]
+        if not pending:
+            return chunks
+
+        by_document = {}
+        for chunk in pending:
+            by_document.setdefault(chunk.document_id, []).append(chunk)
+
+        misses = []
+        for document_id, document_chunks in by_document.items():
+            cached = ChunkStore.cache.get(document_id)
+            if cached is None:
+                misses.extend(document_chunks)
+                continue
+            text, filename = cached
+            for chunk in document_chunks:
+                ChunkStore.attach(chunk, text[chunk.start_char:chunk.end_char], filename)
+
+        if misses:
+            rows = db.query(
+                Chunk.id,
+                func.substr(DocumentText.content, Chunk.start_char + 1, Chunk.end_char - Chunk.start_char),
+                Document.filename
+            ).join(
+                DocumentText, DocumentText.document_id == Chunk.document_id
+            ).join(
+                Document, Document.id == Chunk.document_id
+            ).filter(
+                Chunk.id.in_([chunk.id for chunk in misses])
+            ).all()
+            found = {chunk_id: (text, filename) for chunk_id, text, filename in rows}
+            for chunk in misses:
+                text, filename = found.get(chunk.id, ("", None))
+                ChunkStore.attach(chunk, text, filename)
+            ChunkStore._admit_hot_documents(db, {chunk.document_id for chunk in misses})
+
+        return chunks
+
+    @staticmethod
+    def _admit_hot_documents(db: Session, document_ids: set):
+        """Cache the whole text of documents that keep being read"""
+        if ChunkStore.cache.max_bytes <= 0:
+            return
+        admit = []
+        with ChunkStore._reads_lock:
+            if len(ChunkStore._reads) > MAX_TRACKED_DOCUMENTS:
+                ChunkStore._reads.clear()
+            for document_id in document_ids:
+                reads = ChunkStore._reads.get(document_id, 0) + 1
+                if reads >= ChunkStore.settings.CHUNK_TEXT_CACHE_ADMIT_AFTER:
+                    ChunkStore._reads.pop(document_id, None)
+                    admit.append(document_id)
+                else:
+                    ChunkStore._reads[document_id] = reads
+        if not admit:
+            return
+        rows = db.query(
+            DocumentText.document_id, DocumentText.content, Document.filename
+        ).join(
+            Document, Document.id == DocumentText.document_id
+        ).filter(
+            DocumentText.document_id.in_(admit)
+        ).all()
+        for document_id, text, filename in rows:
+            ChunkStore.cache.put(document_id, text, filename)
+        logger.info(f"🔥 Cached text of {len(rows)} hot document(s)")
+
+    @staticmethod
+    def forget(document_id):
+        """Drop a deleted document from the hot cache"""
+        ChunkStore.cache.discard(document_id)
+        with ChunkStore._reads_lock:
+            ChunkStore._reads.pop(document_id, None)
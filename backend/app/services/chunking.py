@@ -1,8 +1,11 @@
 from sqlalchemy.orm import Session
 from app.models.chunk import Chunk
 from app.models.document import Document
-from app.utils.text_processor import TextProcessor
+from app.utils.text_processor import TextProcessor, StreamingChunker
+from app.services.chunk_store import ChunkStore
+from app.services.dedup import DedupService
 from app.config import get_settings
+from app.utils.metrics import CHUNK_SECONDS, DB_INSERT_SECONDS
 from datetime import datetime
 import uuid
 import logging
@@ -63,42 +66,173 @@ class ChunkingService:
         
         logger.info(f"📏 Content length: {len(content)} chars")
         
+        doc_filename = document.filename if document else "Unknown"
+        span_mode = ChunkStore.span_mode()
+        if span_mode:
+            # Chunk offsets refer to the cleaned text, which becomes the stored copy
+            content = TextProcessor.clean_text(content)
+            ChunkStore.save_document_text(db, document_id, content, doc_filename)
+        
         # Chunk text
         logger.info(f"✂️  Processing chunks...")
-        chunk_data = TextProcessor.smart_chunk_text(
-            content,
-            chunk_size=chunk_size,
-            overlap=overlap
-        )
+        with CHUNK_SECONDS.time():
+            chunk_data = TextProcessor.smart_chunk_text(
+                content,
+                chunk_size=chunk_size,
+                overlap=overlap
+            )
         logger.info(f"✅ Generated {len(chunk_data)} chunks from text")
         
-        doc_filename = document.filename if document else "Unknown"
-        
         # Create chunk records
         chunks = []
         for idx, (chunk_text, start_char, end_char) in enumerate(chunk_data):
-            chunk = Chunk(
-                id=uuid_module.uuid4(),
-                document_id=document_id,
-                content=chunk_text,
-                chunk_index=idx,
-                chunk_metadata={
-                    "start_char": start_char,
-                    "end_char": end_char,
-                    "document_filename": doc_filename,
-                    "category": "document"
-                },
-                created_at=datetime.utcnow()
+            span = TextProcessor.strip_span(content, start_char, end_char) if span_mode else None
+            chunk = ChunkingService._new_chunk(
+                document_id, idx, chunk_text, start_char, end_char, doc_filename, span
             )
             chunks.append(chunk)
             db.add(chunk)
         
+        if DedupService.enabled():
+            DedupService.assign(db, chunks)
+        
         logger.info(f"💾 Saving {len(chunks)} chunks to DB...")
-        db.commit()
+        with DB_INSERT_SECONDS.time():
+            db.commit()
         logger.info(f"✅ Chunks committed to DB")
         
         return chunks
     
+    @staticmethod
+    def iter_chunk_batches(
+        db: Session,
+        document_id,
+        pages,
+        chunk_size: int = None,
+        overlap: int = None,
+        batch_size: int = None
+    ):
+        """
+        Chunk a stream of page texts, committing chunks in batches
+        
+        Chunk boundaries and offsets are the same as chunk_document would
+        produce for the pages joined into one text, but only one page and one
+        batch of chunks are held in memory at a time (plus the cleaned text
+        in span storage mode, stored as far as it goes with each batch).
+        
+        Args:
+            db: Database session
+            document_id: ID of document to chunk (UUID or string)
+            pages: Iterable of page texts
+            chunk_size: Size of chunks in tokens
+            overlap: Overlap between chunks
+            batch_size: Chunks per commit
+            
+        Yields:
+            Lists of committed Chunk instances
+        """
+        if chunk_size is None:
+            chunk_size = ChunkingService.settings.CHUNK_SIZE
+        if overlap is None:
+            overlap = ChunkingService.settings.CHUNK_OVERLAP
+        if batch_size is None:
+            batch_size = ChunkingService.settings.STREAMING_BATCH_CHUNKS
+        
+        if isinstance(document_id, str):
+            try:
+                document_id = uuid.UUID(document_id)
+            except (ValueError, AttributeError):
+                raise ValueError(f"Invalid document_id format: {document_id}")
+        
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        doc_filename = document.filename
+        
+        span_mode = ChunkStore.span_mode()
+        chunker = StreamingChunker(chunk_size=chunk_size, overlap=overlap, keep_text=span_mode)
+        dedup = DedupService.enabled()
+        batch = []
+        idx = 0
+        stored = None  # characters of the cleaned text stored so far (span mode)
+        
+        def store_text(filename: str = None):
+            nonlocal stored
+            text = chunker.text
+            ChunkStore.extend_document_text(db, document_id, text, stored, filename)
+            stored = len(text)
+        
+        def pending_chunks():
+            for page_text in pages:
+                yield from chunker.feed(page_text)
+            yield from chunker.finish()
+        
+        for chunk_text, start_char, end_char in pending_chunks():
+            span = chunker.span(start_char, end_char) if span_mode else None
+            chunk = ChunkingService._new_chunk(
+                document_id, idx, chunk_text, start_char, end_char, doc_filename, span
+            )
+            idx += 1
+            batch.append(chunk)
+            db.add(chunk)
+            if len(batch) >= batch_size:
+                if dedup:
+                    DedupService.assign(db, batch)
+                if span_mode:
+                    # Committed with the batch, so its chunks resolve right away
+                    store_text()
+                with DB_INSERT_SECONDS.time():
+                    db.commit()
+                yield batch
+                batch = []
+        
+        if span_mode:
+            store_text(doc_filename)
+        if batch and dedup:
+            DedupService.assign(db, batch)
+        if batch or span_mode:
+            with DB_INSERT_SECONDS.time():
+                db.commit()
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _new_chunk(
+        document_id,
+        idx: int,
+        chunk_text: str,
+        start_char: int,
+        end_char: int,
+        doc_filename: str,
+        span: tuple = None
+    ) -> Chunk:
+        if span is not None:
+            # Span storage: offsets only, text and filename come from the document
+            chunk = Chunk(
+                id=uuid.uuid4(),
+                document_id=document_id,
+                content=None,
+                chunk_index=idx,
+                start_char=span[0],
+                end_char=span[1],
+                created_at=datetime.utcnow()
+            )
+            ChunkStore.attach(chunk, chunk_text, doc_filename)
+            return chunk
+        return Chunk(
+            id=uuid.uuid4(),
+            document_id=document_id,
+            content=chunk_text,
+            chunk_index=idx,
+            chunk_metadata={
+                "start_char": start_char,
+                "end_char": end_char,
+                "document_filename": doc_filename,
+                "category": "document"
+            },
+            created_at=datetime.utcnow()
+        )
+    
     @staticmethod
     def get_document_chunks(db: Session, document_id: str) -> list:
         """Get all chunks for a document"""
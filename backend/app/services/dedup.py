@@ -0,0 +1,159 @@
+"""
+Near-duplicate chunk detection
+
+Corporate documents repeat disclaimers, templates and table headers. Before
+new chunks are committed, DedupService links every chunk that near-duplicates
+an existing (or earlier new) chunk to that canonical chunk through
+Chunk.duplicate_of. Duplicates reuse the canonical embedding instead of
+calling the embedding API, and retrieval can collapse a duplicate group to
+its best hit. Only canonical chunks are indexed (chunk_signatures and
+chunk_lsh_bands), so the index grows with unique content only.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import tuple_
+import logging
+from app.models.chunk import Chunk
+from app.models.chunk_signature import ChunkSignature, ChunkLshBand
+from app.utils import minhash
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# New chunks looked up per candidate query (each contributes BANDS bucket keys)
+LOOKUP_BATCH = 256
+
+
+class DedupService:
+    """Service for near-duplicate chunk linking"""
+
+    settings = get_settings()
+
+    @staticmethod
+    def enabled() -> bool:
+        return DedupService.settings.DEDUP_ENABLED
+
+    @staticmethod
+    def assign(db: Session, chunks: list) -> int:
+        """
+        Link near-duplicate chunks to their canonical chunk and index the rest
+
+        Must run before the chunks are committed; the caller commits.
+
+        Args:
+            db: Database session
+            chunks: New Chunk instances with ids and text
+
+        Returns:
+            Number of chunks marked as duplicates
+        """
+        duplicates = 0
+        # Canonical chunks of this call: bucket -> chunk ids, chunk id -> signature
+        local_buckets = {}
+        local_signatures = {}
+        for start in range(0, len(chunks), LOOKUP_BATCH):
+            duplicates += DedupService._assign_batch(
+                db, chunks[start:start + LOOKUP_BATCH], local_buckets, local_signatures
+            )
+        if duplicates:
+            logger.info(f"🧬 {duplicates} of {len(chunks)} chunks are near-duplicates")
+        return duplicates
+
+    @staticmethod
+    def _assign_batch(db: Session, chunks: list, local_buckets: dict, local_signatures: dict) -> int:
+        signatures = [minhash.signature(chunk.text or "") for chunk in chunks]
+        # Chunks without words have no signature: never duplicates, not indexed
+        keys = [minhash.band_keys(sig) if sig is not None else None for sig in signatures]
+
+        # Indexed chunks sharing any bucket, with their signatures and embeddings
+        pairs = {
+            (band, bucket) for chunk_keys in keys if chunk_keys is not None
+            for band, bucket in enumerate(chunk_keys)
+        }
+        stored_buckets = {}
+        if pairs:
+            for band, bucket, chunk_id in db.query(
+                ChunkLshBand.band, ChunkLshBand.bucket, ChunkLshBand.chunk_id
+            ).filter(tuple_(ChunkLshBand.band, ChunkLshBand.bucket).in_(pairs)):
+                stored_buckets.setdefault((band, bucket), []).append(chunk_id)
+
+        candidates = {}
+        candidate_ids = {chunk_id for ids in stored_buckets.values() for chunk_id in ids}
+        if candidate_ids:
+            for chunk_id, signature, embedding in db.query(
+                ChunkSignature.chunk_id, ChunkSignature.signature, Chunk.embedding
+            ).join(
+                Chunk, Chunk.id == ChunkSignature.chunk_id
+            ).filter(ChunkSignature.chunk_id.in_(candidate_ids)):
+                candidates[chunk_id] = (minhash.from_bytes(signature), embedding)
+
+        threshold = DedupService.settings.DEDUP_THRESHOLD
+        duplicates = 0
+        for chunk, sig, chunk_keys in zip(chunks, signatures, keys):
+            if sig is None:
+                continue
+            best_id, best_score, best_embedding = None, threshold, None
+            for band, bucket in enumerate(chunk_keys):
+                for chunk_id in stored_buckets.get((band, bucket), ()):
+                    stored_sig, embedding = candidates.get(chunk_id, (None, None))
+                    if stored_sig is not None:
+                        score = minhash.similarity(sig, stored_sig)
+                        if score >= best_score:
+                            best_id, best_score, best_embedding = chunk_id, score, embedding
+                for chunk_id in local_buckets.get((band, bucket), ()):
+                    score = minhash.similarity(sig, local_signatures[chunk_id])
+                    if score >= best_score:
+                        best_id, best_score, best_embedding = chunk_id, score, None
+
+            if best_id is not None:
+                chunk.duplicate_of = best_id
+                if best_embedding is not None:
+                    chunk.embedding = best_embedding
+                duplicates += 1
+                continue
+
+            # Canonical: index it for later chunks and documents
+            db.add(ChunkSignature(chunk_id=chunk.id, signature=minhash.to_bytes(sig)))
+            for band, bucket in enumerate(chunk_keys):
+                db.add(ChunkLshBand(band=band, bucket=bucket, chunk_id=chunk.id))
+                local_buckets.setdefault((band, bucket), []).append(chunk.id)
+            local_signatures[chunk.id] = sig
+        return duplicates
+
+    @staticmethod
+    def copy_embeddings(db: Session, chunks: list) -> int:
+        """
+        Give duplicate chunks without an embedding the one of their canonical chunk
+
+        Args:
+            db: Database session
+            chunks: Chunk instances (canonical chunks embedded in the same
+                    batch are used directly, others are loaded)
+
+        Returns:
+            Number of embeddings copied
+        """
+        pending = [
+            chunk for chunk in chunks
+            if chunk.duplicate_of is not None and chunk.embedding is None
+        ]
+        if not pending:
+            return 0
+        known = {chunk.id: chunk.embedding for chunk in chunks if chunk.embedding is not None}
+        missing = {chunk.duplicate_of for chunk in pending} - known.keys()
+        if missing:
+            known.update(db.query(Chunk.id, Chunk.embedding).filter(
+                Chunk.id.in_(missing),
+                Chunk.embedding != None
+            ).all())
+        copied = 0
+        for chunk in pending:
+            embedding = known.get(chunk.duplicate_of)
+            if embedding is not None:
+                chunk.embedding = embedding
+                copied += 1
+        return copied
+
+    @staticmethod
+    def group_key(chunk: Chunk):
+        """Id shared by all chunks of a duplicate group"""
+        return chunk.duplicate_of or chunk.id
@@ -1,12 +1,19 @@
 """
 Embedding service using Google Gemini API
 """
-import google.generativeai as genai
+import asyncio
 import time
 import logging
 from sqlalchemy.orm import Session
 from app.models.chunk import Chunk
+from app.services.chunk_store import ChunkStore
+from app.services.dedup import DedupService
+from app.utils.metrics import (
+    EMBED_ITEM_SECONDS, EMBED_BATCH_SECONDS, EMBED_BATCH_ITEM_SECONDS,
+    GEMINI_ERRORS, GEMINI_QUOTA_HITS
+)
 from app.config import get_settings
+from app.utils.gemini import configure_gemini, uses_rest, QuotaExceededError, is_quota_error
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +24,43 @@ class EmbeddingService:
     settings = get_settings()
     MAX_RETRIES = 3
     RETRY_DELAY = 2  # seconds
+    QUOTA_MESSAGE = (
+        "Google Gemini API quota exceeded for today. "
+        "Free tier limits: 1 request per minute, 100 requests per day. "
+        "Please wait until tomorrow or upgrade your API plan at https://ai.google.dev"
+    )
     
     def __init__(self):
         """Initialize Gemini API"""
         if not self.settings.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not set in environment")
         
-        genai.configure(api_key=self.settings.GOOGLE_API_KEY)
+        self.genai = configure_gemini()
+    
+    @staticmethod
+    def _count_error(error: Exception):
+        if is_quota_error(error):
+            GEMINI_QUOTA_HITS.inc("embed")
+        else:
+            GEMINI_ERRORS.inc("embed")
+    
+    @staticmethod
+    def _fit_dimension(emb: list) -> list:
+        """Ensure embedding length matches expected dimension"""
+        expected_dim = EmbeddingService.settings.EMBEDDING_DIMENSION
+        if len(emb) != expected_dim:
+            # If embedding is longer, truncate with a warning to avoid DB errors.
+            # Truncation may reduce quality; a better long-term fix is to regenerate
+            # stored embeddings with the new model and update the DB vector size.
+            if len(emb) > expected_dim:
+                logger.warning(
+                    f"Embedding length {len(emb)} != expected {expected_dim}. Truncating to {expected_dim}."
+                )
+                emb = emb[:expected_dim]
+            else:
+                # If shorter, fail explicitly
+                raise ValueError(f"Embedding length {len(emb)} shorter than expected {expected_dim}")
+        return emb
     
     @staticmethod
     def embed_text(text: str, retry_count: int = 0) -> list:
@@ -38,47 +75,30 @@ class EmbeddingService:
             Embedding vector
             
         Raises:
-            ValueError: If embedding fails after retries or quota exceeded
+            QuotaExceededError: If quota exceeded
+            ValueError: If embedding fails after retries
         """
         service = EmbeddingService()
         try:
-            result = genai.embed_content(
-                model="models/gemini-embedding-001",
-                content=text,
-                task_type="RETRIEVAL_DOCUMENT"
-            )
+            with EMBED_ITEM_SECONDS.time():
+                result = service.genai.embed_content(
+                    model="models/gemini-embedding-001",
+                    content=text,
+                    task_type="RETRIEVAL_DOCUMENT"
+                )
             emb = result.get('embedding') or result.get('embeddings')
             if emb is None:
                 raise ValueError(f"Embedding response missing 'embedding' field: {result}")
 
-            # Ensure embedding length matches expected dimension
-            expected_dim = EmbeddingService.settings.EMBEDDING_DIMENSION
-            if len(emb) != expected_dim:
-                # If embedding is longer, truncate with a warning to avoid DB errors.
-                # Truncation may reduce quality; a better long-term fix is to regenerate
-                # stored embeddings with the new model and update the DB vector size.
-                if len(emb) > expected_dim:
-                    logger.warning(
-                        f"Embedding length {len(emb)} != expected {expected_dim}. Truncating to {expected_dim}."
-                    )
-                    emb = emb[:expected_dim]
-                else:
-                    # If shorter, fail explicitly
-                    raise ValueError(f"Embedding length {len(emb)} shorter than expected {expected_dim}")
-
-            return emb
+            return EmbeddingService._fit_dimension(emb)
         except Exception as e:
             error_msg = str(e)
+            EmbeddingService._count_error(e)
             
             # Check if it's a quota error
-            if "429" in error_msg or "quota" in error_msg.lower():
-                quota_msg = (
-                    "Google Gemini API quota exceeded for today. "
-                    "Free tier limits: 1 request per minute, 100 requests per day. "
-                    "Please wait until tomorrow or upgrade your API plan at https://ai.google.dev"
-                )
+            if is_quota_error(e):
                 logger.error(f"Quota exceeded: {error_msg}")
-                raise ValueError(quota_msg)
+                raise QuotaExceededError(EmbeddingService.QUOTA_MESSAGE)
             
             # Retry for temporary errors
             if retry_count < EmbeddingService.MAX_RETRIES and ("deadline exceeded" in error_msg.lower() or "temporarily unavailable" in error_msg.lower()):
@@ -88,6 +108,44 @@ class EmbeddingService:
             
             raise ValueError(f"Failed to embed text: {error_msg}")
     
+    @staticmethod
+    async def embed_text_async(text: str, retry_count: int = 0) -> list:
+        """
+        Generate embedding for text without blocking the event loop
+        
+        Same retries and errors as embed_text.
+        """
+        if uses_rest():
+            # The REST client has no async methods, keep the loop free with a thread
+            return await asyncio.to_thread(EmbeddingService.embed_text, text)
+        service = EmbeddingService()
+        try:
+            with EMBED_ITEM_SECONDS.time():
+                result = await service.genai.embed_content_async(
+                    model="models/gemini-embedding-001",
+                    content=text,
+                    task_type="RETRIEVAL_DOCUMENT"
+                )
+            emb = result.get('embedding') or result.get('embeddings')
+            if emb is None:
+                raise ValueError(f"Embedding response missing 'embedding' field: {result}")
+
+            return EmbeddingService._fit_dimension(emb)
+        except Exception as e:
+            error_msg = str(e)
+            EmbeddingService._count_error(e)
+            
+            if is_quota_error(e):
+                logger.error(f"Quota exceeded: {error_msg}")
+                raise QuotaExceededError(EmbeddingService.QUOTA_MESSAGE)
+            
+            if retry_count < EmbeddingService.MAX_RETRIES and ("deadline exceeded" in error_msg.lower() or "temporarily unavailable" in error_msg.lower()):
+                logger.warning(f"Retry {retry_count + 1}/{EmbeddingService.MAX_RETRIES} for embedding. Error: {error_msg}")
+                await asyncio.sleep(EmbeddingService.RETRY_DELAY)
+                return await EmbeddingService.embed_text_async(text, retry_count + 1)
+            
+            raise ValueError(f"Failed to embed text: {error_msg}")
+    
     
     @staticmethod
     def embed_chunks(db: Session, chunk_ids: list = None) -> int:
@@ -118,15 +176,19 @@ class EmbeddingService:
             chunks = db.query(Chunk).filter(Chunk.id.in_(uuid_list)).all()
         else:
             chunks = db.query(Chunk).filter(Chunk.embedding == None).all()
+        ChunkStore.materialize(db, chunks)
         
         count = 0
         for chunk in chunks:
+            if chunk.duplicate_of is not None:
+                # Takes its canonical chunk's embedding below
+                continue
             try:
-                embedding = EmbeddingService.embed_text(chunk.content)
+                embedding = EmbeddingService.embed_text(chunk.text)
                 chunk.embedding = embedding
                 count += 1
             except ValueError as e:
-                if "quota" in str(e).lower():
+                if isinstance(e, QuotaExceededError):
                     logger.error(f"Quota exceeded while embedding chunk {chunk.id}. Stopping.")
                     break
                 logger.warning(f"Failed to embed chunk {chunk.id}: {str(e)}")
@@ -134,7 +196,90 @@ class EmbeddingService:
             except Exception as e:
                 logger.error(f"Unexpected error embedding chunk {chunk.id}: {str(e)}")
                 continue
+        count += DedupService.copy_embeddings(db, chunks)
         
         if count > 0:
             db.commit()
         return count
+    
+    @staticmethod
+    def embed_texts(texts: list) -> list:
+        """
+        Generate embeddings for several texts with batch requests
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Embedding vectors in input order
+            
+        Raises:
+            QuotaExceededError: If quota exceeded
+            ValueError: If a batch fails
+        """
+        service = EmbeddingService()
+        batch_size = EmbeddingService.settings.EMBEDDING_BATCH_SIZE
+        embeddings = []
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            started = time.perf_counter()
+            try:
+                result = service.genai.embed_content(
+                    model="models/gemini-embedding-001",
+                    content=batch,
+                    task_type="RETRIEVAL_DOCUMENT"
+                )
+            except Exception as e:
+                error_msg = str(e)
+                EmbeddingService._count_error(e)
+                if is_quota_error(e):
+                    logger.error(f"Quota exceeded: {error_msg}")
+                    raise QuotaExceededError(EmbeddingService.QUOTA_MESSAGE)
+                raise ValueError(f"Failed to embed batch: {error_msg}")
+            
+            elapsed = time.perf_counter() - started
+            EMBED_BATCH_SECONDS.observe(elapsed)
+            EMBED_BATCH_ITEM_SECONDS.observe(elapsed / len(batch))
+            batch_embeddings = result.get('embedding') or []
+            if len(batch_embeddings) != len(batch):
+                raise ValueError(
+                    f"Batch embedding returned {len(batch_embeddings)} vectors for {len(batch)} texts"
+                )
+            embeddings.extend(EmbeddingService._fit_dimension(emb) for emb in batch_embeddings)
+        return embeddings
+    
+    @staticmethod
+    def embed_chunk_batch(db: Session, chunks: list) -> int:
+        """
+        Embed already loaded chunks with batch requests and commit
+        
+        Near-duplicate chunks are not sent: they get the embedding of their
+        canonical chunk. Falls back to per-chunk requests if a batch request
+        fails for a reason other than quota.
+        
+        Args:
+            db: Database session
+            chunks: Chunk instances to embed
+            
+        Returns:
+            Number of chunks embedded
+            
+        Raises:
+            QuotaExceededError: If quota exceeded
+        """
+        if not chunks:
+            return 0
+        unique = [chunk for chunk in chunks if chunk.duplicate_of is None]
+        try:
+            embeddings = EmbeddingService.embed_texts([chunk.text for chunk in unique])
+            for chunk, embedding in zip(unique, embeddings):
+                chunk.embedding = embedding
+            count = len(unique) + DedupService.copy_embeddings(db, chunks)
+        except QuotaExceededError:
+            raise
+        except ValueError as e:
+            logger.warning(f"Batch embedding failed, retrying per chunk: {str(e)}")
+            return EmbeddingService.embed_chunks(db, [chunk.id for chunk in chunks])
+        
+        db.commit()
+        return count
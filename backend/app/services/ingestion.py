@@ -2,20 +2,42 @@
 Ingestion service for document handling
 """
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, tuple_
+from typing import Optional, Tuple
 from app.models.document import Document
-from app.utils.file_parser import FileParser
+from app.models.chunk import Chunk
+from app.utils.file_parser import FileParser, parse_file_timed
 from app.services.chunking import ChunkingService
 from app.services.embedding import EmbeddingService
+from app.services.chunk_store import ChunkStore
+from app.services.vector_index import VectorIndexService
+from app import database
+from app.config import get_settings
+from app.utils import metrics
+from app.utils.gemini import is_quota_error
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
+from pathlib import Path
+import base64
+import itertools
+import multiprocessing
+import os
+import time
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Batch uploads parse these in worker processes, other types in the calling thread
+POOL_PARSED_TYPES = ("pdf", "docx")
+
 
 class IngestionService:
     """Service for ingesting and storing documents"""
     
+    settings = get_settings()
+    
     @staticmethod
     def create_document(
         db: Session,
@@ -24,7 +46,8 @@ class IngestionService:
         file_path: str,
         title: str = None,
         content_type: str = None,
-        metadata: dict = None
+        metadata: dict = None,
+        extraction_profile: str = None
     ) -> Document:
         """
         Create a new document in the database
@@ -37,32 +60,36 @@ class IngestionService:
             title: Document title
             content_type: MIME type
             metadata: Additional metadata
+            extraction_profile: PDF extraction profile (fast, balanced, full)
             
         Returns:
             Created Document instance
         """
-        # Parse file content
-        content = FileParser.parse_file(file_path, file_type)
-        
         # Get file size
         import os
         file_size = os.path.getsize(file_path)
+        # Kept so deleting the document also removes the saved upload
+        metadata = {**(metadata or {}), "file_path": str(file_path)}
         
-        # Create document
-        document = Document(
-            id=uuid.uuid4(),
-            filename=filename,
-            title=title or filename,
-            content_type=content_type or f"application/{file_type}",
-            file_size=file_size,
-            uploaded_at=datetime.utcnow(),
-            doc_metadata=metadata or {}
-        )
+        if file_type.lower() == 'pdf' and file_size >= IngestionService.settings.STREAMING_INGEST_MIN_BYTES:
+            return IngestionService.create_document_streaming(
+                db=db,
+                filename=filename,
+                file_type=file_type,
+                file_path=file_path,
+                title=title,
+                content_type=content_type,
+                metadata=metadata,
+                extraction_profile=extraction_profile
+            )
         
-        db.add(document)
-        db.commit()
-        db.refresh(document)
-        logger.info(f"✅ Document saved to DB: {document.id}")
+        # Parse file content
+        with metrics.PARSE_SECONDS.time(file_type.lower()):
+            content = FileParser.parse_file(file_path, file_type, profile=extraction_profile)
+        
+        document = IngestionService._save_document(
+            db, filename, file_type, file_size, title, content_type, metadata
+        )
         
         # Chunk the document content
         try:
@@ -79,6 +106,7 @@ class IngestionService:
             logger.info(f"🔄 Starting embedding generation for {len(chunk_ids)} chunks...")
             embeddings_count = EmbeddingService.embed_chunks(db, chunk_ids)
             logger.info(f"✅ Generated embeddings for {embeddings_count} chunks")
+            VectorIndexService.rebuild_after_ingest(embeddings_count)
         except Exception as e:
             logger.error(f"❌ Error during chunking/embedding: {str(e)}", exc_info=True)
             db.rollback()
@@ -86,6 +114,356 @@ class IngestionService:
         
         return document
     
+    @staticmethod
+    def create_document_streaming(
+        db: Session,
+        filename: str,
+        file_type: str,
+        file_path: str,
+        title: str = None,
+        content_type: str = None,
+        metadata: dict = None,
+        extraction_profile: str = None
+    ) -> Document:
+        """
+        Create a document by streaming pages through chunking and embedding
+        
+        Pages are parsed one at a time, chunks are committed in batches and
+        each batch is embedded right after its commit, so memory stays bounded
+        and the document becomes searchable progressively. Arguments are the
+        same as create_document.
+        
+        Returns:
+            Created Document instance
+        """
+        import os
+        file_size = os.path.getsize(file_path)
+        
+        document = IngestionService._save_document(
+            db, filename, file_type, file_size, title, content_type, metadata
+        )
+        
+        chunk_count = 0
+        embeddings_count = 0
+        embed = True
+        try:
+            logger.info(f"🔄 Streaming pages of document {document.id}...")
+            for batch in ChunkingService.iter_chunk_batches(
+                db=db,
+                document_id=document.id,
+                pages=IngestionService._timed_pages(
+                    FileParser.iter_pages(file_path, file_type, profile=extraction_profile),
+                    file_type.lower()
+                )
+            ):
+                chunk_count += len(batch)
+                if not embed:
+                    continue
+                try:
+                    embeddings_count += EmbeddingService.embed_chunk_batch(db, batch)
+                except ValueError as e:
+                    # Keep storing chunks, they can be embedded later
+                    logger.error(f"❌ Embedding stopped for document {document.id}: {str(e)}")
+                    db.rollback()
+                    embed = False
+            logger.info(
+                f"✅ Streamed {chunk_count} chunks, embedded {embeddings_count} "
+                f"for document {document.id}"
+            )
+            VectorIndexService.rebuild_after_ingest(embeddings_count)
+        except Exception as e:
+            logger.error(f"❌ Error during streaming ingestion: {str(e)}", exc_info=True)
+            db.rollback()
+            # Document and committed batches are kept, but marked as truncated
+            document.doc_metadata = {
+                **(document.doc_metadata or {}),
+                "ingestion": {"status": "partial", "chunks": chunk_count, "error": str(e)[:500]},
+            }
+            db.commit()
+        
+        return document
+    
+    @staticmethod
+    def _timed_pages(pages, file_type: str):
+        """Pass pages through, observing the total time spent parsing them"""
+        if not metrics.ENABLED:
+            yield from pages
+            return
+        parse_seconds = 0.0
+        iterator = iter(pages)
+        while True:
+            started = time.perf_counter()
+            try:
+                page = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                parse_seconds += time.perf_counter() - started
+            yield page
+        metrics.PARSE_SECONDS.observe(parse_seconds, file_type)
+    
+    @staticmethod
+    def create_documents_batch(job, files: list, extraction_profile: str = None) -> dict:
+        """
+        Ingest a batch of staged uploads; a failed file does not stop the rest
+        
+        Files are parsed across a process pool (BATCH_PARSE_WORKERS) and each
+        one is stored and chunked as soon as its text is ready. Chunks of
+        consecutive files are pooled so embedding requests go out full
+        (EMBEDDING_BATCH_SIZE texts) rather than one small request per chunk.
+        PDFs large enough for streaming ingestion take that path afterwards.
+        
+        Args:
+            job: Job whose progress is updated (None when run inline)
+            files: Entries from UploadStager (filename, file_type, file_path,
+                   file_size, error)
+            extraction_profile: PDF extraction profile (fast, balanced, full)
+        
+        Returns:
+            Totals and per-file results in upload order
+            
+        Raises:
+            RuntimeError: If sync database sessions are not configured
+        """
+        if database.SessionLocal is None:
+            raise RuntimeError("Batch ingestion needs the primary database (DATABASE_URL)")
+        settings = IngestionService.settings
+        results = [
+            {
+                "filename": entry["filename"],
+                "status": "failed" if entry["error"] else "pending",
+                "document_id": None,
+                "chunks": 0,
+                "embedded": 0,
+                "error": entry["error"],
+            }
+            for entry in files
+        ]
+        parsed, streamed = [], []
+        for index, entry in enumerate(files):
+            if entry["error"]:
+                continue
+            if entry["file_type"] == "pdf" and entry["file_size"] >= settings.STREAMING_INGEST_MIN_BYTES:
+                streamed.append(index)
+            else:
+                parsed.append(index)
+        if job is not None:
+            job.update(
+                total_files=len(files), created=0, embedded_chunks=0,
+                failed=len(files) - len(parsed) - len(streamed)
+            )
+        
+        def fail(index: int, error: str):
+            results[index].update(status="failed", error=error)
+            IngestionService._remove_upload(files[index]["file_path"])
+            if job is not None:
+                job.increment(failed=1)
+        
+        # Chunks stay loaded after their commit, so pooled chunks are embedded
+        # without being read back
+        db = database.SessionLocal(expire_on_commit=False)
+        by_document = {}  # document id -> result, for embedding counts
+        pending = []  # committed chunks waiting for a full embedding request
+        request_size = settings.EMBEDDING_BATCH_SIZE
+        embed = True
+        embedded = 0
+        try:
+            for index, text, seconds, error in IngestionService._parse_batch(files, parsed, extraction_profile):
+                entry = files[index]
+                if error:
+                    logger.error(f"❌ Failed to parse {entry['filename']}: {error}")
+                    fail(index, f"Failed to parse: {error}")
+                    continue
+                metrics.PARSE_SECONDS.observe(seconds, entry["file_type"])
+                try:
+                    document = IngestionService._save_document(
+                        db, entry["filename"], entry["file_type"], entry["file_size"],
+                        metadata={"file_path": entry["file_path"]}
+                    )
+                except Exception as e:
+                    db.rollback()
+                    fail(index, f"Failed to store: {e}")
+                    continue
+                result = results[index]
+                result.update(status="created", document_id=str(document.id))
+                if job is not None:
+                    job.increment(created=1)
+                try:
+                    chunks = ChunkingService.chunk_document(db=db, document_id=document.id, content=text)
+                except Exception as e:
+                    # The document is kept, as for single uploads
+                    logger.error(f"❌ Error chunking {entry['filename']}: {str(e)}")
+                    db.rollback()
+                    result["error"] = f"Chunking failed: {e}"
+                    continue
+                result["chunks"] = len(chunks)
+                if not embed:
+                    result["error"] = "Not embedded: embedding stopped earlier in the batch"
+                    continue
+                by_document[document.id] = result
+                pending.extend(chunks)
+                if len(pending) >= request_size:
+                    full = len(pending) - len(pending) % request_size
+                    count, embed = IngestionService._embed_pooled(db, pending[:full], by_document)
+                    embedded += count
+                    pending = pending[full:]
+                    if job is not None:
+                        job.increment(embedded_chunks=count)
+            if pending and embed:
+                count, embed = IngestionService._embed_pooled(db, pending, by_document)
+                embedded += count
+                if job is not None:
+                    job.increment(embedded_chunks=count)
+            
+            for index in streamed:
+                entry = files[index]
+                try:
+                    document = IngestionService.create_document(
+                        db=db,
+                        filename=entry["filename"],
+                        file_type=entry["file_type"],
+                        file_path=entry["file_path"],
+                        extraction_profile=extraction_profile
+                    )
+                except Exception as e:
+                    logger.error(f"❌ Failed to ingest {entry['filename']}: {str(e)}")
+                    db.rollback()
+                    fail(index, str(e))
+                    continue
+                chunks, streamed_embedded = db.query(
+                    func.count(Chunk.id), func.count(Chunk.embedding)
+                ).filter(Chunk.document_id == document.id).one()
+                results[index].update(
+                    status="created", document_id=str(document.id),
+                    chunks=chunks, embedded=streamed_embedded
+                )
+                ingestion = (document.doc_metadata or {}).get("ingestion") or {}
+                if ingestion.get("status") == "partial":
+                    results[index]["error"] = f"Only partly ingested: {ingestion['error']}"
+                if job is not None:
+                    job.increment(created=1, embedded_chunks=streamed_embedded)
+        finally:
+            db.close()
+        
+        VectorIndexService.rebuild_after_ingest(embedded)
+        summary = {
+            "files": len(files),
+            "created": sum(result["status"] == "created" for result in results),
+            "failed": sum(result["status"] == "failed" for result in results),
+            "chunks": sum(result["chunks"] for result in results),
+            "embedded_chunks": sum(result["embedded"] for result in results),
+        }
+        logger.info(
+            f"✅ Batch ingested: {summary['created']} documents created, {summary['failed']} failed, "
+            f"{summary['embedded_chunks']}/{summary['chunks']} chunks embedded"
+        )
+        return {**summary, "documents": results}
+    
+    @staticmethod
+    def _parse_batch(files: list, indexes: list, extraction_profile: str = None):
+        """Yield (index, text, seconds, error) of the given files as their parsing finishes"""
+        workers = IngestionService.settings.BATCH_PARSE_WORKERS
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        # Plain text parses faster than its text would be sent back by a worker
+        pooled = [index for index in indexes if files[index]["file_type"] in POOL_PARSED_TYPES]
+        workers = min(workers, len(pooled))
+        if workers <= 1:
+            for index in indexes:
+                yield (index, *IngestionService._parse_one(files[index], extraction_profile))
+            return
+
+        queue = iter(pooled)
+        running = {}  # future -> index
+
+        def submit(count: int):
+            for index in itertools.islice(queue, count):
+                entry = files[index]
+                try:
+                    future = pool.submit(parse_file_timed, entry["file_path"], entry["file_type"], extraction_profile)
+                except Exception as e:
+                    # A broken pool (a worker was killed) fails the files not yet parsed
+                    future = Future()
+                    future.set_exception(e)
+                running[future] = index
+
+        # spawn: forking a threaded server process is not safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # Two files in flight per worker: parsed texts wait in memory until stored
+            submit(workers * 2)
+            for index in indexes:
+                if files[index]["file_type"] not in POOL_PARSED_TYPES:
+                    yield (index, *IngestionService._parse_one(files[index], extraction_profile))
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    submit(1)
+                    try:
+                        text, seconds = future.result()
+                    except Exception as e:
+                        yield index, None, 0.0, str(e)
+                        continue
+                    yield index, text, seconds, None
+    
+    @staticmethod
+    def _parse_one(entry: dict, extraction_profile: str = None) -> tuple:
+        """(text, seconds, error) of one staged file, parsed in this process"""
+        try:
+            text, seconds = parse_file_timed(entry["file_path"], entry["file_type"], extraction_profile)
+        except Exception as e:
+            return None, 0.0, str(e)
+        return text, seconds, None
+    
+    @staticmethod
+    def _embed_pooled(db: Session, chunks: list, by_document: dict) -> Tuple[int, bool]:
+        """
+        Embed chunks of one or more documents with batch requests
+        
+        Returns:
+            (chunks embedded, whether embedding can go on: False after a quota error)
+        """
+        try:
+            EmbeddingService.embed_chunk_batch(db, chunks)
+        except Exception as e:
+            logger.error(f"❌ Embedding failed for {len(chunks)} chunks of the batch: {str(e)}")
+            db.rollback()
+            for document_id in {chunk.document_id for chunk in chunks}:
+                by_document[document_id]["error"] = f"Embedding failed: {e}"
+            return 0, not is_quota_error(e)
+        count = 0
+        for chunk in chunks:
+            if chunk.embedding is not None:
+                by_document[chunk.document_id]["embedded"] += 1
+                count += 1
+        return count, True
+    
+    @staticmethod
+    def _save_document(
+        db: Session,
+        filename: str,
+        file_type: str,
+        file_size: int,
+        title: str = None,
+        content_type: str = None,
+        metadata: dict = None
+    ) -> Document:
+        document = Document(
+            id=uuid.uuid4(),
+            filename=filename,
+            title=title or filename,
+            content_type=content_type or f"application/{file_type}",
+            file_size=file_size,
+            uploaded_at=datetime.utcnow(),
+            doc_metadata=metadata or {}
+        )
+        
+        db.add(document)
+        db.commit()
+        db.refresh(document)
+        logger.info(f"✅ Document saved to DB: {document.id}")
+        return document
+    
     @staticmethod
     def get_document(db: Session, document_id: str) -> Document:
         """Get document by ID"""
@@ -96,12 +474,186 @@ class IngestionService:
         """List all documents"""
         return db.query(Document).offset(skip).limit(limit).all()
     
+    @staticmethod
+    async def get_document_async(db: AsyncSession, document_id: str) -> Document:
+        """Get document by ID on an async session"""
+        result = await db.execute(select(Document).filter(Document.id == document_id))
+        return result.scalars().first()
+    
+    @staticmethod
+    async def list_documents_page_async(
+        db: AsyncSession,
+        limit: int = 50,
+        cursor: str = None,
+        filename_prefix: str = None,
+        content_type: str = None,
+        include_chunk_counts: bool = False
+    ) -> Tuple[list, Optional[str]]:
+        """
+        One page of documents, newest first, on an async session
+        
+        Keyset pagination on (uploaded_at, id): every page costs the same
+        index range scan however deep it is, and documents ingested while
+        paging do not shift later pages.
+        
+        Args:
+            db: Database session
+            limit: Page size
+            cursor: next_cursor of the previous page (None = first page)
+            filename_prefix: Only filenames starting with this
+            content_type: Only this content type
+            include_chunk_counts: Add each document's chunk count
+            
+        Returns:
+            (rows as dicts of listing columns, cursor of the next page or None)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        columns = [
+            Document.id, Document.filename, Document.title, Document.content_type,
+            Document.file_size, Document.uploaded_at
+        ]
+        if include_chunk_counts:
+            # Correlated count per listed row, served by the chunks.document_id index
+            columns.append(
+                select(func.count()).where(Chunk.document_id == Document.id)
+                .correlate(Document).scalar_subquery().label("chunk_count")
+            )
+        query = select(*columns)
+        if cursor:
+            uploaded_at, document_id = IngestionService._decode_cursor(cursor)
+            query = query.where(tuple_(Document.uploaded_at, Document.id) < (uploaded_at, document_id))
+        if filename_prefix:
+            # A literal 'prefix%' pattern lets the planner use the pattern index
+            escaped = filename_prefix.replace("/", "//").replace("%", "/%").replace("_", "/_")
+            query = query.where(Document.filename.like(escaped + "%", escape="/"))
+        if content_type:
+            query = query.where(Document.content_type == content_type)
+        query = query.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit + 1)
+        
+        rows = [dict(row._mapping) for row in await db.execute(query)]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = IngestionService._encode_cursor(rows[-1]["uploaded_at"], rows[-1]["id"])
+        return rows, next_cursor
+    
+    @staticmethod
+    def _encode_cursor(uploaded_at: datetime, document_id) -> str:
+        raw = f"{uploaded_at.isoformat()}|{document_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            uploaded_at, document_id = raw.split("|", 1)
+            return datetime.fromisoformat(uploaded_at), uuid.UUID(document_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
     @staticmethod
     def delete_document(db: Session, document_id: str) -> bool:
-        """Delete document by ID"""
+        """Delete document by ID, with its chunks and upload file"""
         document = db.query(Document).filter(Document.id == document_id).first()
         if document:
-            db.delete(document)
-            db.commit()
+            IngestionService._delete_one(db, document.id, (document.doc_metadata or {}).get("file_path"))
             return True
         return False
+    
+    @staticmethod
+    def find_documents_to_delete(
+        db: Session,
+        document_ids: list = None,
+        filename_prefix: str = None,
+        content_type: str = None,
+        uploaded_before: datetime = None
+    ) -> list:
+        """
+        (id, upload file path) of documents matching every given filter
+        
+        Raises:
+            ValueError: If no filter is given (a bulk delete never means "everything")
+        """
+        if not (document_ids or filename_prefix or content_type or uploaded_before):
+            raise ValueError("Bulk delete needs document IDs or at least one filter")
+        query = db.query(Document.id, Document.doc_metadata["file_path"].astext)
+        if document_ids:
+            query = query.filter(Document.id.in_([uuid.UUID(str(document_id)) for document_id in document_ids]))
+        if filename_prefix:
+            escaped = filename_prefix.replace("/", "//").replace("%", "/%").replace("_", "/_")
+            query = query.filter(Document.filename.like(escaped + "%", escape="/"))
+        if content_type:
+            query = query.filter(Document.content_type == content_type)
+        if uploaded_before:
+            query = query.filter(Document.uploaded_at < uploaded_before)
+        return query.all()
+    
+    @staticmethod
+    def delete_documents(job, targets: list) -> dict:
+        """
+        Background job: delete documents one by one with batched chunk deletes
+        
+        Args:
+            job: Job whose progress is updated
+            targets: (document id, upload file path) pairs from find_documents_to_delete
+            
+        Returns:
+            Totals of deleted documents, chunks and removed files
+        """
+        job.update(total_documents=len(targets), deleted_documents=0, deleted_chunks=0, removed_files=0)
+        db = database.SessionLocal()
+        try:
+            for document_id, file_path in targets:
+                _, removed_file = IngestionService._delete_one(db, document_id, file_path, job)
+                job.increment(deleted_documents=1, removed_files=int(removed_file))
+        finally:
+            db.close()
+        return {key: job.progress[key] for key in ("deleted_documents", "deleted_chunks", "removed_files")}
+    
+    @staticmethod
+    def _delete_one(db: Session, document_id, file_path: str = None, job=None) -> Tuple[int, bool]:
+        """Delete one document's chunks in bounded batches, then the document and its file"""
+        batch_size = IngestionService.settings.BULK_DELETE_BATCH_SIZE
+        pause = IngestionService.settings.BULK_DELETE_PAUSE_MS / 1000
+        deleted_chunks = 0
+        while True:
+            # Short transactions keep row locks and WAL bursts bounded on large documents
+            batch = select(Chunk.id).where(Chunk.document_id == document_id).limit(batch_size)
+            deleted = db.query(Chunk).filter(Chunk.id.in_(batch)).delete(synchronize_session=False)
+            db.commit()
+            deleted_chunks += deleted
+            if job is not None and deleted:
+                job.increment(deleted_chunks=deleted)
+            if deleted < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        
+        # Cascades to the stored document text
+        db.query(Document).filter(Document.id == document_id).delete(synchronize_session=False)
+        db.commit()
+        ChunkStore.forget(document_id)
+        removed_file = IngestionService._remove_upload(file_path)
+        logger.info(f"🗑️  Deleted document {document_id} ({deleted_chunks} chunks)")
+        return deleted_chunks, removed_file
+    
+    @staticmethod
+    def _remove_upload(file_path: str) -> bool:
+        """Delete a saved upload, only if it lies inside the upload directory"""
+        if not file_path:
+            return False
+        upload_dir = Path(IngestionService.settings.UPLOAD_DIR).resolve()
+        path = Path(file_path).resolve()
+        if upload_dir not in path.parents:
+            logger.warning(f"Not removing {file_path}: outside {upload_dir}")
+            return False
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Failed to remove upload {file_path}: {e}")
+            return False
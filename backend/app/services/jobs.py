@@ -0,0 +1,146 @@
+"""
+In-process background jobs
+
+Long operations (bulk deletes, batch uploads) run on a small thread pool and
+are tracked here so clients can poll GET /api/jobs/{id}. Jobs live in this
+process only and are lost on restart, which is why serve.py runs a single
+worker by default (SERVER_WORKERS): with several, a job is only visible on
+the worker that started it.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+import uuid
+import logging
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """State of one background job; the job function updates progress"""
+
+    def __init__(self, kind: str):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, **progress):
+        with self._lock:
+            self.progress.update(progress)
+
+    def increment(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.progress[key] = self.progress.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobService:
+    """Registry and runner of background jobs"""
+
+    settings = get_settings()
+    _jobs = OrderedDict()  # job id -> Job, oldest first
+    _lock = threading.Lock()
+    _executor = None
+
+    @staticmethod
+    def submit(kind: str, func, *args, **kwargs) -> Job:
+        """
+        Run func(job, *args, **kwargs) in the background
+
+        Its return value becomes job.result; an exception marks the job failed.
+
+        Returns:
+            The queued Job
+        """
+        job = Job(kind)
+        with JobService._lock:
+            if JobService._executor is None:
+                JobService._executor = ThreadPoolExecutor(
+                    max_workers=JobService.settings.JOB_WORKERS, thread_name_prefix="job"
+                )
+            JobService._jobs[job.id] = job
+            JobService._trim()
+            JobService._executor.submit(JobService._run, job, func, args, kwargs)
+        logger.info(f"🗂️  Queued {kind} job {job.id}")
+        return job
+
+    @staticmethod
+    def get(job_id: str) -> Job:
+        with JobService._lock:
+            return JobService._jobs.get(job_id)
+
+    @staticmethod
+    def list_jobs() -> list:
+        """Known jobs, newest first"""
+        with JobService._lock:
+            jobs = list(JobService._jobs.values())
+        return [job.to_dict() for job in reversed(jobs)]
+
+    @staticmethod
+    def status_counts() -> dict:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        with JobService._lock:
+            for job in JobService._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    @staticmethod
+    def active_count() -> int:
+        with JobService._lock:
+            return sum(job.status in ("queued", "running") for job in JobService._jobs.values())
+
+    @staticmethod
+    def drain(timeout: float) -> int:
+        """
+        Wait up to timeout seconds for queued and running jobs to finish
+
+        Returns:
+            Number of jobs still active
+        """
+        deadline = time.monotonic() + timeout
+        while JobService.active_count() and time.monotonic() < deadline:
+            time.sleep(0.2)
+        return JobService.active_count()
+
+    @staticmethod
+    def _run(job: Job, func, args, kwargs):
+        job.status = "running"
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = "done"
+            logger.info(f"✅ {job.kind} job {job.id} done")
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            logger.error(f"❌ {job.kind} job {job.id} failed: {str(e)}", exc_info=True)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    @staticmethod
+    def _trim():
+        # Forget the oldest finished jobs beyond the history limit
+        excess = len(JobService._jobs) - JobService.settings.JOB_HISTORY
+        for job_id in [job_id for job_id, job in JobService._jobs.items() if job.finished_at][:max(excess, 0)]:
+            del JobService._jobs[job_id]
@@ -2,11 +2,15 @@
 Retrieval service for semantic search
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import Float
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Float, select, text
 import logging
 from app.models.chunk import Chunk
 from app.services.embedding import EmbeddingService
+from app.services.chunk_store import ChunkStore
+from app.services.dedup import DedupService
 from app.config import get_settings
+from app.utils.metrics import VECTOR_SEARCH_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +26,8 @@ class RetrievalService:
         db: Session,
         query: str,
         top_k: int = None,
-        threshold: float = None
+        threshold: float = None,
+        collapse_duplicates: bool = None
     ) -> list:
         """
         Retrieve relevant chunks for a query
@@ -32,6 +37,8 @@ class RetrievalService:
             query: Query text
             top_k: Number of chunks to retrieve
             threshold: Minimum similarity threshold
+            collapse_duplicates: Keep only the best chunk of each
+                                 near-duplicate group (default from settings)
             
         Returns:
             List of (Chunk, similarity_score) tuples
@@ -43,6 +50,8 @@ class RetrievalService:
             top_k = RetrievalService.settings.TOP_K_CHUNKS
         if threshold is None:
             threshold = RetrievalService.settings.SIMILARITY_THRESHOLD
+        if collapse_duplicates is None:
+            collapse_duplicates = RetrievalService.settings.RETRIEVAL_COLLAPSE_DUPLICATES
         
         try:
             # Generate query embedding
@@ -57,26 +66,142 @@ class RetrievalService:
             logger.error(f"Failed to generate query embedding: {str(e)}")
             raise
         
-        # Query chunks with similarity scores using pgvector's <-> operator
-        # The <-> operator returns cosine distance (0 = most similar, 2 = most dissimilar for normalized vectors)
-        results = db.query(
+        results = RetrievalService.search_by_embedding(db, query_embedding, top_k, collapse_duplicates)
+        
+        # Span-stored chunks get their text in one query for the whole top-k
+        ChunkStore.materialize(db, [chunk for chunk, _ in results])
+        
+        scored_results = RetrievalService._score(results, threshold)
+        logger.info(f"Retrieved {len(scored_results)} relevant chunks for query")
+        return scored_results
+    
+    @staticmethod
+    def search_by_embedding(
+        db: Session,
+        query_embedding: list,
+        top_k: int,
+        collapse_duplicates: bool = False,
+        probes: int = None,
+        ef_search: int = None
+    ) -> list:
+        """
+        Nearest chunks to an embedding, as served by the ANN index
+        
+        Args:
+            db: Database session
+            query_embedding: Query vector
+            top_k: Number of chunks to return
+            collapse_duplicates: Keep only the best chunk of each near-duplicate group
+            probes: ivfflat.probes for this query (default from settings)
+            ef_search: hnsw.ef_search for this query (default from settings)
+            
+        Returns:
+            List of (Chunk, cosine_distance) tuples, nearest first
+        """
+        for statement, params in RetrievalService._search_settings(probes, ef_search):
+            db.execute(statement, params)
+        with VECTOR_SEARCH_SECONDS.time():
+            results = db.execute(
+                RetrievalService._similarity_query(query_embedding, top_k, collapse_duplicates)
+            ).all()
+        if collapse_duplicates:
+            results = RetrievalService._collapse(results, top_k)
+        return results
+    
+    @staticmethod
+    async def retrieve_chunks_async(
+        db: AsyncSession,
+        query: str,
+        top_k: int = None,
+        threshold: float = None,
+        collapse_duplicates: bool = None
+    ) -> list:
+        """
+        Retrieve relevant chunks for a query on an async session
+        
+        Same arguments, results and errors as retrieve_chunks.
+        """
+        if top_k is None:
+            top_k = RetrievalService.settings.TOP_K_CHUNKS
+        if threshold is None:
+            threshold = RetrievalService.settings.SIMILARITY_THRESHOLD
+        if collapse_duplicates is None:
+            collapse_duplicates = RetrievalService.settings.RETRIEVAL_COLLAPSE_DUPLICATES
+        
+        try:
+            query_embedding = await EmbeddingService.embed_text_async(query)
+            if len(query_embedding) != RetrievalService.EMBEDDING_DIMENSION:
+                logger.warning(
+                    f"Query embedding length {len(query_embedding)} != expected {RetrievalService.EMBEDDING_DIMENSION}."
+                )
+        except ValueError as e:
+            logger.error(f"Failed to generate query embedding: {str(e)}")
+            raise
+        
+        for statement, params in RetrievalService._search_settings(None, None):
+            await db.execute(statement, params)
+        with VECTOR_SEARCH_SECONDS.time():
+            results = (await db.execute(
+                RetrievalService._similarity_query(query_embedding, top_k, collapse_duplicates)
+            )).all()
+        if collapse_duplicates:
+            results = RetrievalService._collapse(results, top_k)
+        
+        # The span lookup is shared with the sync path through the session's greenlet bridge
+        chunks = [chunk for chunk, _ in results]
+        await db.run_sync(lambda session: ChunkStore.materialize(session, chunks))
+        
+        scored_results = RetrievalService._score(results, threshold)
+        logger.info(f"Retrieved {len(scored_results)} relevant chunks for query")
+        return scored_results
+    
+    @staticmethod
+    def _search_settings(probes: int, ef_search: int) -> list:
+        """Transaction-local ANN search parameters as (statement, params) pairs"""
+        settings = RetrievalService.settings
+        probes = settings.VECTOR_SEARCH_IVFFLAT_PROBES if probes is None else probes
+        ef_search = settings.VECTOR_SEARCH_HNSW_EF_SEARCH if ef_search is None else ef_search
+        # set_config(..., true) is SET LOCAL: it ends with the transaction, so
+        # pooled connections (and pgbouncer transaction mode) don't keep it
+        statement = text("SELECT set_config(:name, :value, true)")
+        values = (("ivfflat.probes", probes), ("hnsw.ef_search", ef_search))
+        return [(statement, {"name": name, "value": str(int(value))}) for name, value in values if value]
+    
+    @staticmethod
+    def _similarity_query(query_embedding: list, top_k: int, collapse_duplicates: bool):
+        """Nearest chunks with their distance to the query embedding"""
+        # Query chunks with similarity scores using pgvector's <=> operator
+        # The <=> operator returns cosine distance (0 = most similar, 2 = most dissimilar),
+        # the operator of the vector_cosine_ops index, so the ANN index can serve it
+        return select(
             Chunk,
-            # Use the <-> operator for cosine distance
-            Chunk.embedding.op('<->', return_type=Float)(query_embedding).label('similarity')
+            Chunk.embedding.op('<=>', return_type=Float)(query_embedding).label('similarity')
         ).filter(
             Chunk.embedding != None
         ).order_by(
             'similarity'
-        ).limit(top_k).all()
-        
+        ).limit(top_k * 3 if collapse_duplicates else top_k)
+    
+    @staticmethod
+    def _collapse(results: list, top_k: int) -> list:
+        """Keep the first hit of each near-duplicate group"""
+        # Copies of one boilerplate passage share an embedding, keep the first of each group
+        seen = set()
+        collapsed = []
+        for chunk, score in results:
+            key = DedupService.group_key(chunk)
+            if key not in seen:
+                seen.add(key)
+                collapsed.append((chunk, score))
+        return collapsed[:top_k]
+    
+    @staticmethod
+    def _score(results: list, threshold: float) -> list:
         # Convert similarity distance to score (1 - distance)
-        scored_results = [
+        return [
             (chunk, 1 - score) for chunk, score in results
             if (1 - score) >= threshold
         ]
-        
-        logger.info(f"Retrieved {len(scored_results)} relevant chunks for query")
-        return scored_results
     
     @staticmethod
     def search(
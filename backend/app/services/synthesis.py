@@ -1,10 +1,15 @@
 """
 Synthesis service for generating answers using Gemini
 """
-import google.generativeai as genai
+import asyncio
+import logging
 from typing import List, Tuple
 from app.models.chunk import Chunk
 from app.config import get_settings
+from app.utils.gemini import configure_gemini, uses_rest, QuotaExceededError, is_quota_error
+from app.utils.metrics import GENERATION_SECONDS, GEMINI_ERRORS, GEMINI_QUOTA_HITS
+
+logger = logging.getLogger(__name__)
 
 
 class SynthesisService:
@@ -17,7 +22,7 @@ class SynthesisService:
         if not self.settings.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not set in environment")
         
-        genai.configure(api_key=self.settings.GOOGLE_API_KEY)
+        self.genai = configure_gemini()
     
     @staticmethod
     def generate_answer(
@@ -39,29 +44,12 @@ class SynthesisService:
         if not chunks:
             return f"I don't have enough information to answer your question about '{query}'."
         
-        # Prepare context
-        context_parts = []
-        for idx, (chunk, score) in enumerate(chunks, 1):
-            context_parts.append(
-                f"[Source {idx} (relevance: {score:.2%})]\n{chunk.content}"
-            )
-        
-        context = "\n\n".join(context_parts)
-        
-        # Create prompt
-        prompt = f"""You are a helpful assistant answering questions based on provided documents.
-        
-Answer the following question in {language} based ONLY on the provided context.
-If the context doesn't contain the answer, say so explicitly.
-Always cite which source(s) you're using.
-
-Question: {query}
-
-Context from documents:
-{context}
-
-Please provide a comprehensive answer citing the relevant sources."""
-        
+        prompt = SynthesisService._build_prompt(query, chunks, language)
+        with GENERATION_SECONDS.time():
+            return SynthesisService._generate(prompt)
+    
+    @staticmethod
+    def _generate(prompt: str) -> str:
         try:
             service = SynthesisService()
 
@@ -73,7 +61,7 @@ Please provide a comprehensive answer citing the relevant sources."""
             # genai.generate or genai.GenerativeModel usage.
             try:
                 # genai.generate_text -> returns object with .text or dict
-                resp = genai.generate_text(model=model_name, prompt=prompt, temperature=0)
+                resp = service.genai.generate_text(model=model_name, prompt=prompt, temperature=0)
                 # try common attributes
                 if hasattr(resp, 'text') and resp.text:
                     return resp.text
@@ -90,7 +78,7 @@ Please provide a comprehensive answer citing the relevant sources."""
 
             try:
                 # Older or alternate API
-                resp = genai.generate(model=model_name, prompt=prompt, temperature=0)
+                resp = service.genai.generate(model=model_name, prompt=prompt, temperature=0)
                 if hasattr(resp, 'text') and resp.text:
                     return resp.text
                 if isinstance(resp, dict) and 'candidates' in resp and resp['candidates']:
@@ -100,20 +88,90 @@ Please provide a comprehensive answer citing the relevant sources."""
 
             try:
                 # Last resort: GenerativeModel interface used previously in codebase
-                model = genai.GenerativeModel(model_name)
+                model = service.genai.GenerativeModel(model_name)
                 response = model.generate_content(prompt)
                 # response may have .text or .candidates
                 if hasattr(response, 'text') and response.text:
                     return response.text
                 if isinstance(response, dict) and 'candidates' in response and response['candidates']:
                     return response['candidates'][0].get('content') or response['candidates'][0].get('output')
-            except Exception as e:
-                raise ValueError(f"Failed to generate answer: {str(e)}")
+            except Exception:
+                # Reported below, keeping the client's error (and its status code)
+                raise
 
             # If none of the above returned text, raise explicit error
             raise ValueError("Failed to generate answer: generation returned no text from model")
         except Exception as e:
-            raise ValueError(f"Failed to generate answer: {str(e)}")
+            raise SynthesisService._failure(e)
+    
+    @staticmethod
+    async def generate_answer_async(
+        query: str,
+        chunks: List[Tuple[Chunk, float]],
+        language: str = "Russian"
+    ) -> str:
+        """
+        Generate answer without blocking the event loop
+        
+        Uses the GenerativeModel interface, the one the current client
+        supports natively in async form. If the client lacks it, or it fails
+        for a reason other than quota or returns no text, the sync path's
+        fallback chain runs in a thread, as with the REST client.
+        """
+        if not chunks:
+            return f"I don't have enough information to answer your question about '{query}'."
+        
+        if uses_rest():
+            # The REST client has no async methods, keep the loop free with a thread
+            return await asyncio.to_thread(SynthesisService.generate_answer, query, chunks, language)
+        
+        prompt = SynthesisService._build_prompt(query, chunks, language)
+        with GENERATION_SECONDS.time():
+            try:
+                service = SynthesisService()
+                model = service.genai.GenerativeModel(service.settings.GENERATION_MODEL)
+                response = await model.generate_content_async(prompt)
+                if hasattr(response, 'text') and response.text:
+                    return response.text
+            except Exception as e:
+                if is_quota_error(e):
+                    raise SynthesisService._failure(e)
+                logger.warning(f"Async generation failed, trying the other entrypoints: {str(e)}")
+            return await asyncio.to_thread(SynthesisService._generate, prompt)
+    
+    @staticmethod
+    def _failure(error: Exception) -> ValueError:
+        """Count a failed generation and wrap it, as QuotaExceededError for quota"""
+        if is_quota_error(error):
+            GEMINI_QUOTA_HITS.inc("generate")
+            return QuotaExceededError(f"Failed to generate answer: {str(error)}")
+        GEMINI_ERRORS.inc("generate")
+        return ValueError(f"Failed to generate answer: {str(error)}")
+    
+    @staticmethod
+    def _build_prompt(query: str, chunks: List[Tuple[Chunk, float]], language: str) -> str:
+        # Prepare context
+        context_parts = []
+        for idx, (chunk, score) in enumerate(chunks, 1):
+            context_parts.append(
+                f"[Source {idx} (relevance: {score:.2%})]\n{chunk.text}"
+            )
+        
+        context = "\n\n".join(context_parts)
+        
+        # Create prompt
+        return f"""You are a helpful assistant answering questions based on provided documents.
+        
+Answer the following question in {language} based ONLY on the provided context.
+If the context doesn't contain the answer, say so explicitly.
+Always cite which source(s) you're using.
+
+Question: {query}
+
+Context from documents:
+{context}
+
+Please provide a comprehensive answer citing the relevant sources."""
     
     @staticmethod
     def format_sources(chunks: List[Tuple[Chunk, float]]) -> List[dict]:
@@ -129,11 +187,11 @@ Please provide a comprehensive answer citing the relevant sources."""
         sources = []
         for chunk, score in chunks:
             sources.append({
-                "document": chunk.chunk_metadata.get("document_filename") if chunk.chunk_metadata else "Unknown",
+                "document": chunk.document_filename or "Unknown",
                 "category": chunk.chunk_metadata.get("category") if chunk.chunk_metadata else None,
                 "chunk_index": chunk.chunk_index,
                 "relevance_score": round(score, 4),
-                "content_preview": chunk.content[:200] + "..." if len(chunk.content) > 200 else chunk.content
+                "content_preview": chunk.text[:200] + "..." if len(chunk.text) > 200 else chunk.text
             })
         
         return sources
@@ -0,0 +1,260 @@
+"""
+ANN index maintenance for chunk embeddings
+
+IVFFlat centroids are trained on the rows present when the index is built,
+so an index created on an empty table keeps poor recall as data arrives.
+VectorIndexService sizes the index for the current row count (IVFFlat
+lists, or HNSW m / ef_construction), builds it CONCURRENTLY under a
+temporary name with tuned maintenance_work_mem and parallel workers, then
+swaps it in. Build details are stored as JSON in COMMENT ON INDEX, which is
+what later status reports and the post-ingest auto rebuild compare against.
+
+A concurrent build cannot run in a transaction, so its settings and lock
+are session-level. Behind PgBouncer in transaction mode (DB_PGBOUNCER) they
+would leak to, or be released on, other server connections: builds then go
+over an unpooled connection to DATABASE_DIRECT_URL.
+"""
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from datetime import datetime
+import json
+import math
+import threading
+import time
+import logging
+from app import database
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "chunks_embedding_idx"
+BUILD_INDEX_NAME = "chunks_embedding_idx_new"
+# pg_try_advisory_lock key, one index build per database across workers
+BUILD_LOCK_KEY = 0x76656374  # "vect"
+INDEX_TYPES = ("ivfflat", "hnsw")
+
+
+class VectorIndexService:
+    """Service for sizing, rebuilding and inspecting the embedding index"""
+
+    settings = get_settings()
+    _auto_lock = threading.Lock()
+
+    @staticmethod
+    def tune(rows: int, index_type: str = None) -> dict:
+        """
+        Index parameters for a row count
+
+        IVFFlat: lists = rows / 1000 up to 1M rows, sqrt(rows) above.
+        HNSW: m 16 (24 above 1M rows), ef_construction 64 (128 above 1M rows),
+        unless set in settings.
+
+        Returns:
+            {"type": ..., "params": {...}}
+        """
+        index_type = (index_type or VectorIndexService.settings.VECTOR_INDEX_TYPE).lower()
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported vector index type: {index_type}")
+        large = rows > 1_000_000
+        if index_type == "hnsw":
+            m = VectorIndexService.settings.VECTOR_INDEX_HNSW_M or (24 if large else 16)
+            ef_construction = VectorIndexService.settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION or (128 if large else 64)
+            # pgvector requires ef_construction >= 2 * m
+            return {"type": "hnsw", "params": {"m": m, "ef_construction": max(ef_construction, 2 * m)}}
+        lists = int(math.sqrt(rows)) if large else rows // 1000
+        return {"type": "ivfflat", "params": {"lists": max(lists, 1)}}
+
+    @staticmethod
+    def status(engine=None) -> dict:
+        """Current index definition, size, embedded rows and last build info"""
+        engine = engine or VectorIndexService._engine()
+        with engine.connect() as conn:
+            definition = conn.execute(
+                text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+                {"name": INDEX_NAME}
+            ).scalar()
+            rows = conn.execute(text("SELECT count(*) FROM chunks WHERE embedding IS NOT NULL")).scalar()
+            size = None
+            last_build = None
+            if definition:
+                size = conn.execute(
+                    text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": INDEX_NAME}
+                ).scalar()
+                last_build = VectorIndexService._last_build(conn)
+        return {
+            "index": INDEX_NAME,
+            "exists": definition is not None,
+            "definition": definition,
+            "size_bytes": size,
+            "embedded_rows": rows,
+            "last_build": last_build,
+            "recommended": VectorIndexService.tune(rows),
+        }
+
+    @staticmethod
+    def rebuild(index_type: str = None, concurrently: bool = True, engine=None) -> dict:
+        """
+        Build a tuned index for the current rows and swap it in
+
+        Args:
+            index_type: "ivfflat" or "hnsw" (default from settings)
+            concurrently: Build without blocking writes (slower)
+            engine: SQLAlchemy engine (default: the primary)
+
+        Returns:
+            Build report: type, params, rows, seconds, size_bytes
+
+        Raises:
+            RuntimeError: If another build holds the lock, or DB_PGBOUNCER is
+                set without a DATABASE_DIRECT_URL
+        """
+        if engine is None:
+            engine = VectorIndexService._build_engine()
+            try:
+                return VectorIndexService.rebuild(index_type, concurrently, engine)
+            finally:
+                if engine is not database.engine:
+                    engine.dispose()
+        settings = VectorIndexService.settings
+        concurrent = "CONCURRENTLY " if concurrently else ""
+
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": BUILD_LOCK_KEY}).scalar():
+                raise RuntimeError("A vector index build is already running")
+            try:
+                rows = conn.execute(text("SELECT count(*) FROM chunks WHERE embedding IS NOT NULL")).scalar()
+                tuned = VectorIndexService.tune(rows, index_type)
+                with_clause = ", ".join(f"{key} = {int(value)}" for key, value in tuned["params"].items())
+
+                conn.execute(text(f"SET maintenance_work_mem = '{settings.VECTOR_INDEX_MAINTENANCE_WORK_MEM}'"))
+                # The pool's connections carry DB_STATEMENT_TIMEOUT_MS, which a build
+                # on a large table outlasts (reset below before the connection goes back)
+                conn.execute(text("SET statement_timeout = 0"))
+                if settings.VECTOR_INDEX_PARALLEL_WORKERS > 0:
+                    conn.execute(text(
+                        f"SET max_parallel_maintenance_workers = {int(settings.VECTOR_INDEX_PARALLEL_WORKERS)}"
+                    ))
+
+                logger.info(f"🧭 Building {tuned['type']} index ({with_clause}) over {rows} embeddings...")
+                started = time.perf_counter()
+                # Leftover of an interrupted concurrent build is an invalid index
+                leftover_valid = conn.execute(text(
+                    "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+                ), {"name": BUILD_INDEX_NAME}).scalar()
+                if leftover_valid is not None:
+                    state = "valid" if leftover_valid else "INVALID"
+                    logger.warning(f"Dropping {state} leftover {BUILD_INDEX_NAME} of an earlier build")
+                    conn.execute(text(f"DROP INDEX {concurrent}IF EXISTS {BUILD_INDEX_NAME}"))
+                try:
+                    conn.execute(text(
+                        f"CREATE INDEX {concurrent}{BUILD_INDEX_NAME} ON chunks "
+                        f"USING {tuned['type']} (embedding vector_cosine_ops) WITH ({with_clause})"
+                    ))
+                except Exception:
+                    # A failed concurrent build leaves its index behind, marked invalid
+                    try:
+                        conn.execute(text(f"DROP INDEX {concurrent}IF EXISTS {BUILD_INDEX_NAME}"))
+                    except Exception as e:
+                        logger.warning(f"Could not drop invalid {BUILD_INDEX_NAME}: {e}")
+                    raise
+                seconds = time.perf_counter() - started
+
+                report = {
+                    "type": tuned["type"],
+                    "params": tuned["params"],
+                    "rows": rows,
+                    "seconds": round(seconds, 2),
+                    "concurrently": concurrently,
+                    "built_at": datetime.utcnow().isoformat(),
+                }
+                comment = json.dumps(report).replace("'", "''")
+                conn.execute(text(f"COMMENT ON INDEX {BUILD_INDEX_NAME} IS '{comment}'"))
+
+                # Swap: the new index serves queries while the old one is dropped
+                conn.execute(text(f"DROP INDEX {concurrent}IF EXISTS {INDEX_NAME}"))
+                conn.execute(text(f"ALTER INDEX {BUILD_INDEX_NAME} RENAME TO {INDEX_NAME}"))
+                report["size_bytes"] = conn.execute(
+                    text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": INDEX_NAME}
+                ).scalar()
+            finally:
+                # Back to the connection's defaults (including its statement timeout)
+                conn.execute(text("RESET statement_timeout"))
+                conn.execute(text("RESET maintenance_work_mem"))
+                conn.execute(text("RESET max_parallel_maintenance_workers"))
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BUILD_LOCK_KEY})
+
+        logger.info(
+            f"✅ Built {report['type']} index in {report['seconds']}s, "
+            f"{report['size_bytes'] / 1e6:.1f} MB"
+        )
+        return report
+
+    @staticmethod
+    def needs_rebuild(engine=None) -> bool:
+        """Whether embedded rows outgrew the last build (uses the planner's row estimate)"""
+        engine = engine or VectorIndexService._engine()
+        settings = VectorIndexService.settings
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'chunks'")
+            ).scalar() or 0
+            if rows < settings.VECTOR_INDEX_REBUILD_MIN_ROWS:
+                return False
+            last_build = VectorIndexService._last_build(conn)
+        built_rows = (last_build or {}).get("rows") or 0
+        return rows >= built_rows * settings.VECTOR_INDEX_REBUILD_GROWTH
+
+    @staticmethod
+    def rebuild_after_ingest(embedded: int):
+        """
+        Rebuild the index in the background if an ingest grew the table enough
+
+        Called after ingestion; returns immediately.
+        """
+        if embedded <= 0 or not VectorIndexService.settings.VECTOR_INDEX_AUTO_REBUILD:
+            return
+        if not VectorIndexService._auto_lock.acquire(blocking=False):
+            return  # A check or build is already running in this process
+
+        def run():
+            try:
+                if VectorIndexService.needs_rebuild():
+                    VectorIndexService.rebuild()
+            except Exception as e:
+                logger.warning(f"Automatic vector index rebuild skipped: {e}")
+            finally:
+                VectorIndexService._auto_lock.release()
+
+        threading.Thread(target=run, name="vector-index-rebuild", daemon=True).start()
+
+    @staticmethod
+    def _last_build(conn) -> dict:
+        # to_regclass is NULL (and so is the comment) when the index does not exist
+        comment = conn.execute(
+            text("SELECT obj_description(to_regclass(:name), 'pg_class')"), {"name": INDEX_NAME}
+        ).scalar()
+        try:
+            return json.loads(comment) if comment else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _build_engine():
+        """Engine whose connections are real server sessions"""
+        settings = VectorIndexService.settings
+        if not settings.DB_PGBOUNCER:
+            return VectorIndexService._engine()
+        if not settings.DATABASE_DIRECT_URL:
+            raise RuntimeError(
+                "Vector index builds need a direct database session, set "
+                "DATABASE_DIRECT_URL (DB_PGBOUNCER is on)"
+            )
+        # One connection for the build, closed afterwards
+        return create_engine(settings.DATABASE_DIRECT_URL, poolclass=NullPool)
+
+    @staticmethod
+    def _engine():
+        if database.engine is None:
+            raise RuntimeError("Database not initialized")
+        return database.engine
@@ -0,0 +1,212 @@
+"""
+Streaming DOCX text extraction
+
+Reads ``word/document.xml`` straight from the zip with iterparse instead of
+building the python-docx object model. Body paragraphs and table rows are
+processed and dropped as soon as they are closed, so memory holds the
+extracted text plus one table row, not the whole document tree.
+
+The output follows FileParser.parse_docx: headers, body paragraphs, tables,
+footers. Merged table cells are emitted once (python-docx repeats a cell for
+every grid column it spans and for every row of a vertical merge).
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+W_BODY = _w("body")
+W_P = _w("p")
+W_R = _w("r")
+W_T = _w("t")
+W_TAB = _w("tab")
+W_PTAB = _w("ptab")
+W_BR = _w("br")
+W_CR = _w("cr")
+W_NO_BREAK_HYPHEN = _w("noBreakHyphen")
+W_HYPERLINK = _w("hyperlink")
+W_TBL = _w("tbl")
+W_TR = _w("tr")
+W_TC = _w("tc")
+W_TC_PR = _w("tcPr")
+W_V_MERGE = _w("vMerge")
+W_P_PR = _w("pPr")
+W_SECT_PR = _w("sectPr")
+W_HEADER_REFERENCE = _w("headerReference")
+W_FOOTER_REFERENCE = _w("footerReference")
+W_TYPE = _w("type")
+W_VAL = _w("val")
+R_ID = f"{{{R_NS}}}id"
+
+
+def _run_text(run) -> str:
+    """Text of a w:r element, same translation as python-docx Run.text"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or "")
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append("\t")
+        elif tag == W_BR:
+            # Page and column breaks have no text equivalent
+            if child.get(W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == W_CR:
+            parts.append("\n")
+        elif tag == W_NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def _paragraph_text(paragraph) -> str:
+    """Text of a w:p element (direct runs and hyperlink runs)"""
+    parts = []
+    for child in paragraph:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(run) for run in child.findall(W_R))
+    return "".join(parts)
+
+
+def _is_merge_continuation(tc) -> bool:
+    """Second and later rows of a vertical merge carry no content of their own"""
+    tc_pr = tc.find(W_TC_PR)
+    if tc_pr is None:
+        return False
+    v_merge = tc_pr.find(W_V_MERGE)
+    return v_merge is not None and v_merge.get(W_VAL, "continue") == "continue"
+
+
+def _row_text(tr) -> str:
+    cell_texts = []
+    for tc in tr.findall(W_TC):
+        if _is_merge_continuation(tc):
+            continue
+        cell_text = "\n".join(_paragraph_text(p) for p in tc.findall(W_P)).strip()
+        if cell_text:
+            cell_texts.append(cell_text)
+    return " | ".join(cell_texts)
+
+
+def _section_refs(sect_pr) -> dict:
+    """Relationship IDs of the default header/footer of a section"""
+    refs = {"header": None, "footer": None}
+    for tag, key in ((W_HEADER_REFERENCE, "header"), (W_FOOTER_REFERENCE, "footer")):
+        for ref in sect_pr.findall(tag):
+            if ref.get(W_TYPE, "default") == "default":
+                refs[key] = ref.get(R_ID)
+    return refs
+
+
+def _read_relationships(archive: zipfile.ZipFile) -> dict:
+    try:
+        data = archive.read("word/_rels/document.xml.rels")
+    except KeyError:
+        return {}
+    root = ET.fromstring(data)
+    return {
+        rel.get("Id"): posixpath.normpath(posixpath.join("word", rel.get("Target", "")))
+        for rel in root.iter(f"{{{REL_NS}}}Relationship")
+    }
+
+
+def _part_paragraphs(archive: zipfile.ZipFile, part_name: str) -> list:
+    """Stripped non-empty texts of the top-level paragraphs of a header/footer part"""
+    root = ET.fromstring(archive.read(part_name))
+    texts = []
+    for paragraph in root.findall(W_P):
+        text = _paragraph_text(paragraph).strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def _headers_footers(archive: zipfile.ZipFile, sections: list, kind: str) -> list:
+    """
+    Texts of the default header or footer of every section, in section order
+
+    A section without its own reference is linked to the previous one, which
+    is how Word (and python-docx) resolve it.
+    """
+    rels = _read_relationships(archive)
+    texts = []
+    current = None
+    for refs in sections:
+        if refs[kind]:
+            current = rels.get(refs[kind])
+        if current:
+            texts.extend(_part_paragraphs(archive, current))
+    return texts
+
+
+def extract_docx_parts(file_path: str) -> list:
+    """
+    Extract tagged text parts from a DOCX file without loading its DOM
+
+    Args:
+        file_path: Path to DOCX file
+
+    Returns:
+        List of text parts in parse_docx order
+    """
+    paragraphs = []
+    tables = []
+    sections = []
+
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as document_xml:
+            stack = []
+            table_rows = None
+            for event, elem in ET.iterparse(document_xml, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    continue
+
+                stack.pop()
+                parent = stack[-1] if stack else None
+                if parent is None:
+                    continue
+
+                if parent.tag == W_BODY:
+                    if elem.tag == W_P:
+                        text = _paragraph_text(elem).strip()
+                        if text:
+                            paragraphs.append(text)
+                        p_pr = elem.find(W_P_PR)
+                        sect_pr = p_pr.find(W_SECT_PR) if p_pr is not None else None
+                        if sect_pr is not None:
+                            sections.append(_section_refs(sect_pr))
+                    elif elem.tag == W_TBL:
+                        if table_rows:
+                            tables.append("\n".join(table_rows))
+                        table_rows = None
+                    elif elem.tag == W_SECT_PR:
+                        sections.append(_section_refs(elem))
+                    # Body holds only the element being read
+                    parent.remove(elem)
+
+                elif elem.tag == W_TR and parent.tag == W_TBL and stack[-2].tag == W_BODY:
+                    # Row of a top-level table: emit it and drop it
+                    row_text = _row_text(elem)
+                    if table_rows is None:
+                        table_rows = []
+                    if row_text:
+                        table_rows.append(row_text)
+                    parent.remove(elem)
+
+        parts = [f"[HEADER] {text}" for text in _headers_footers(archive, sections, "header")]
+        parts.extend(paragraphs)
+        parts.extend(tables)
+        parts.extend(f"[FOOTER] {text}" for text in _headers_footers(archive, sections, "footer"))
+
+    return parts
@@ -1,75 +1,358 @@
-from PyPDF2 import PdfReader
-from docx import Document as DocxDocument
-try:
+import codecs
+import logging
+import math
+import mmap
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from importlib.util import find_spec
+from app.config import get_settings
+from app.utils.docx_reader import extract_docx_parts
+
+# PyPDF2, python-docx, pdfplumber (with pdfminer) and pypdfium2 are imported
+# where they are used: together they make up a large share of the API's
+# start-up time, and query-only processes never parse a file
+HAS_PDFPLUMBER = find_spec("pdfplumber") is not None
+HAS_PDFIUM = find_spec("pypdfium2") is not None
+
+logger = logging.getLogger(__name__)
+
+# PDF extraction profiles:
+#   fast     - raw text layer only (pdfium, PyPDF2 if unavailable), no tables
+#   balanced - pdfplumber plain text, tables only on pages that look tabular
+#   full     - pdfplumber layout text with tight tolerances, tables on every page
+EXTRACTION_PROFILES = ("fast", "balanced", "full")
+
+# Ruling lines/rectangles a page needs before table extraction is attempted
+TABLE_MIN_RULINGS = 4
+
+
+# Text files at least this large are memory-mapped instead of copied into memory
+TEXT_MMAP_MIN_BYTES = 16 * 1024 * 1024
+# Bytes inspected to pick the encoding of a text file
+ENCODING_SAMPLE_BYTES = 64 * 1024
+# Tried in order when no BOM is present; latin-1 accepts any byte sequence
+TEXT_FALLBACK_ENCODINGS = ('utf-8', 'cp1251', 'latin-1')
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),  # before UTF-16 LE, it shares the prefix
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(data) -> str:
+    """
+    Pick the encoding of a text buffer from its BOM or a leading sample
+
+    Args:
+        data: bytes, bytearray or mmap
+
+    Returns:
+        Codec name to decode the whole buffer with
+    """
+    head = bytes(data[:4])
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    sample = bytes(data[:ENCODING_SAMPLE_BYTES])
+    # Incremental decode so a multi-byte char cut at the sample end is not an error
+    final = len(data) <= ENCODING_SAMPLE_BYTES
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=final)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    # 0x98 is the only byte cp1251 leaves undefined
+    if b'\x98' not in sample:
+        return 'cp1251'
+    return 'latin-1'
+
+
+def _page_looks_tabular(page) -> bool:
+    """Cheap check: ruling lines and rectangles come straight from the page objects"""
+    return len(page.lines) + len(page.rects) >= TABLE_MIN_RULINGS
+
+
+def _format_tables(tables) -> list:
+    parts = []
+    for table in tables or []:
+        table_text = []
+        for row in table:
+            if row:
+                row_text = ' | '.join([str(cell).strip() if cell else '' for cell in row])
+                if row_text.strip():
+                    table_text.append(row_text)
+        if table_text:
+            parts.append('\n'.join(table_text))
+    return parts
+
+
+def _extract_pdfplumber_page(page, profile: str = "full") -> list:
+    """Extract text and tables from a single pdfplumber page"""
+    parts = []
+
+    if profile == "full":
+        # Извлекаем весь текст с layout
+        page_text = page.extract_text(
+            layout=True,
+            x_tolerance=1,
+            y_tolerance=1
+        )
+    else:
+        page_text = page.extract_text()
+
+    if page_text and page_text.strip():
+        parts.append(page_text.strip())
+
+    # Дополнительно извлекаем таблицы
+    if profile == "full" or _page_looks_tabular(page):
+        parts.extend(_format_tables(page.extract_tables()))
+
+    return parts
+
+
+def _iter_text_layer_pages(file_path: str, first_page: int, last_page: int):
+    """Yield {"page", "parts", "seconds"} for the raw text layer of pages [first_page, last_page)"""
+    if HAS_PDFIUM:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for page_num in range(first_page, last_page):
+                started = time.perf_counter()
+                page = pdf[page_num]
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range().replace('\r\n', '\n')
+                textpage.close()
+                page.close()
+                yield {
+                    "page": page_num,
+                    "parts": [page_text.strip()] if page_text.strip() else [],
+                    "seconds": time.perf_counter() - started,
+                }
+        finally:
+            pdf.close()
+        return
+
+    from PyPDF2 import PdfReader
+    with open(file_path, 'rb') as file:
+        reader = PdfReader(file)
+        for page_num in range(first_page, last_page):
+            started = time.perf_counter()
+            page_text = reader.pages[page_num].extract_text() or ""
+            yield {
+                "page": page_num,
+                "parts": [page_text.strip()] if page_text.strip() else [],
+                "seconds": time.perf_counter() - started,
+            }
+
+
+def _extract_page_range(
+    file_path: str,
+    first_page: int,
+    last_page: int,
+    profile: str = "full"
+) -> list:
+    """
+    Extract pages [first_page, last_page) of a PDF
+
+    Module-level so it can be pickled into worker processes. Each worker opens
+    the file itself and only loads the pages it was given.
+
+    Returns:
+        List of {"page", "parts", "seconds"} dicts in page order
+    """
+    if profile == "fast" or not HAS_PDFPLUMBER:
+        return list(_iter_text_layer_pages(file_path, first_page, last_page))
+
     import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
+    results = []
+    page_numbers = list(range(first_page + 1, last_page + 1))  # pdfplumber is 1-based
+    with pdfplumber.open(file_path, pages=page_numbers) as pdf:
+        for offset, page in enumerate(pdf.pages):
+            started = time.perf_counter()
+            parts = _extract_pdfplumber_page(page, profile)
+            results.append({
+                "page": first_page + offset,
+                "parts": parts,
+                "seconds": time.perf_counter() - started,
+            })
+            # Release cached layout objects, long ranges otherwise keep them all
+            page.close()
+    return results
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    if HAS_PDFIUM:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if HAS_PDFPLUMBER:
+        import pdfplumber
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    from PyPDF2 import PdfReader
+    with open(file_path, 'rb') as file:
+        return len(PdfReader(file).pages)
+
 
 class FileParser:
     """Utility class for parsing different file formats"""
 
+    settings = get_settings()
+
+    @staticmethod
+    def resolve_profile(profile: str = None) -> str:
+        """Return the extraction profile to use (settings default if None)"""
+        profile = (profile or FileParser.settings.PDF_EXTRACTION_PROFILE).lower()
+        if profile not in EXTRACTION_PROFILES:
+            raise ValueError(
+                f"Unknown extraction profile: {profile}. "
+                f"Expected one of: {', '.join(EXTRACTION_PROFILES)}"
+            )
+        return profile
+
+    @staticmethod
+    def _resolve_pdf_workers(workers: int = None) -> int:
+        if workers is None:
+            workers = FileParser.settings.PDF_PARSE_WORKERS
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        return workers
+
+    @staticmethod
+    def extract_pdf_pages(file_path: str, workers: int = None, profile: str = None) -> list:
+        """
+        Extract PDF pages, optionally across a process pool
+
+        Page ranges are split across workers and reassembled in page order,
+        so the result is identical to sequential extraction.
+
+        Args:
+            file_path: Path to PDF file
+            workers: Worker processes (None = settings, 0 = one per CPU core)
+            profile: Extraction profile (None = settings)
+
+        Returns:
+            List of {"page", "parts", "seconds"} dicts in page order
+        """
+        profile = FileParser.resolve_profile(profile)
+        workers = FileParser._resolve_pdf_workers(workers)
+        page_count = _count_pdf_pages(file_path)
+
+        if workers <= 1 or page_count < FileParser.settings.PDF_PARALLEL_MIN_PAGES:
+            pages = _extract_page_range(file_path, 0, page_count, profile)
+        else:
+            workers = min(workers, page_count)
+            # Several ranges per worker so one slow (table-heavy) range
+            # does not leave the other workers idle at the end
+            range_size = max(1, math.ceil(page_count / (workers * 4)))
+            ranges = [
+                (start, min(start + range_size, page_count))
+                for start in range(0, page_count, range_size)
+            ]
+            # spawn: forking a threaded server process is not safe
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                futures = [
+                    pool.submit(_extract_page_range, file_path, first, last, profile)
+                    for first, last in ranges
+                ]
+                pages = [page for future in futures for page in future.result()]
+
+        if pages:
+            total = sum(page["seconds"] for page in pages)
+            slowest = max(pages, key=lambda page: page["seconds"])
+            logger.info(
+                f"PDF extracted ({profile}): {page_count} pages, workers={workers}, "
+                f"page time total={total:.2f}s, slowest page {slowest['page'] + 1} "
+                f"({slowest['seconds']:.2f}s)"
+            )
+        return pages
+
+    @staticmethod
+    def iter_pdf_pages(file_path: str, profile: str = None):
+        """
+        Yield the text of each PDF page in order
+
+        Only the current page's layout objects are kept in memory, so this is
+        the entry point for streaming ingestion of very large PDFs.
+        """
+        profile = FileParser.resolve_profile(profile)
+        if profile != "fast" and HAS_PDFPLUMBER:
+            import pdfplumber
+            with ExitStack() as stack:
+                pdf = stack.enter_context(pdfplumber.open(file_path))
+                reader = None  # PyPDF2, opened on the first page pdfplumber fails on
+                for page_num, page in enumerate(pdf.pages):
+                    try:
+                        parts = _extract_pdfplumber_page(page, profile)
+                    except Exception as e:
+                        # Same fallback as parse_pdf, one page at a time
+                        logger.warning(f"PDF page {page_num + 1} extraction ({profile}) failed, using PyPDF2: {e}")
+                        if reader is None:
+                            from PyPDF2 import PdfReader
+                            reader = PdfReader(stack.enter_context(open(file_path, 'rb')))
+                        page_text = reader.pages[page_num].extract_text() or ""
+                        parts = [page_text.strip()] if page_text.strip() else []
+                    finally:
+                        page.close()
+                    if parts:
+                        yield "\n\n".join(parts)
+            return
+
+        for page in _iter_text_layer_pages(file_path, 0, _count_pdf_pages(file_path)):
+            if page["parts"]:
+                yield "\n\n".join(page["parts"])
+
+    @staticmethod
+    def iter_pages(file_path: str, file_type: str, profile: str = None):
+        """Yield document text page by page (non-paginated formats yield once)"""
+        if file_type.lower() == 'pdf':
+            yield from FileParser.iter_pdf_pages(file_path, profile)
+        else:
+            yield FileParser.parse_file(file_path, file_type)
+
     @staticmethod
-    def parse_pdf(file_path: str) -> str:
-        """Extract ALL text from PDF - maximum extraction mode"""
+    def parse_pdf(file_path: str, workers: int = None, profile: str = None) -> str:
+        """Extract text from PDF using the given extraction profile"""
+        profile = FileParser.resolve_profile(profile)
         try:
             text_parts = []
 
-            # Метод 1: pdfplumber (лучший для сложных PDF)
-            if HAS_PDFPLUMBER:
-                try:
-                    with pdfplumber.open(file_path) as pdf:
-                        for page_num, page in enumerate(pdf.pages):
-                            # Извлекаем весь текст с layout
-                            page_text = page.extract_text(
-                                layout=True,
-                                x_tolerance=1,
-                                y_tolerance=1
-                            )
-
-                            if page_text and page_text.strip():
-                                text_parts.append(page_text.strip())
-
-                            # Дополнительно извлекаем таблицы
-                            tables = page.extract_tables()
-                            if tables:
-                                for table in tables:
-                                    table_text = []
-                                    for row in table:
-                                        if row:
-                                            row_text = ' | '.join([str(cell).strip() if cell else '' for cell in row])
-                                            if row_text.strip():
-                                                table_text.append(row_text)
-                                    if table_text:
-                                        text_parts.append('\n'.join(table_text))
-
-                    if text_parts:
-                        return "\n\n".join(text_parts)
-
-                except Exception as e:
-                    print(f"pdfplumber extraction failed: {e}")
+            # Метод 1: profile extraction (pdfplumber / pdfium)
+            try:
+                for page in FileParser.extract_pdf_pages(file_path, workers, profile):
+                    text_parts.extend(page["parts"])
+
+                if text_parts:
+                    return "\n\n".join(text_parts)
+
+            except Exception as e:
+                logger.warning(f"PDF extraction ({profile}) failed: {e}")
 
             # Метод 2: PyPDF2 (fallback)
+            from PyPDF2 import PdfReader
             text_parts = []
             with open(file_path, 'rb') as file:
                 reader = PdfReader(file)
 
-                for page_num, page in enumerate(reader.pages):
-                    # Пробуем разные режимы извлечения
-                    page_text = None
-
-                    # Режим 1: layout (сохраняет форматирование)
+                for page in reader.pages:
                     try:
                         page_text = page.extract_text()
-                    except:
-                        pass
-
-                    # Режим 2: plain (обычный)
-                    if not page_text or not page_text.strip():
-                        try:
-                            page_text = page.extract_text()
-                        except:
-                            pass
+                    except Exception:
+                        page_text = None
 
                     if page_text and page_text.strip():
                         text_parts.append(page_text.strip())
@@ -87,7 +370,21 @@ class FileParser:
     @staticmethod
     def parse_docx(file_path: str) -> str:
         """Extract ALL text from DOCX - maximum extraction mode"""
+        if FileParser.settings.DOCX_STREAMING:
+            try:
+                result = "\n\n".join(extract_docx_parts(file_path))
+                if result.strip():
+                    return result
+            except Exception as e:
+                logger.warning(f"Streaming DOCX extraction failed, using python-docx: {e}")
+
+        return FileParser._parse_docx_document(file_path)
+
+    @staticmethod
+    def _parse_docx_document(file_path: str) -> str:
+        """Extract text from DOCX through the python-docx object model"""
         try:
+            from docx import Document as DocxDocument
             doc = DocxDocument(file_path)
             text_parts = []
 
@@ -108,9 +405,14 @@ class FileParser:
             # 3. Таблицы (tables) - КРИТИЧНО!
             for table in doc.tables:
                 table_texts = []
+                # row.cells repeats merged cells, emit each one once
+                seen_cells = set()
                 for row in table.rows:
                     row_texts = []
                     for cell in row.cells:
+                        if cell._tc in seen_cells:
+                            continue
+                        seen_cells.add(cell._tc)
                         # Извлекаем текст из каждой ячейки
                         cell_text = cell.text.strip()
                         if cell_text:
@@ -152,22 +454,49 @@ class FileParser:
             raise ValueError(f"Failed to parse DOCX: {str(e)}")
 
     @staticmethod
-    def parse_txt(file_path: str) -> str:
-        """Read text from TXT file"""
-        try:
-            encodings = ['utf-8', 'utf-8-sig', 'cp1251', 'windows-1251', 'latin-1', 'cp1252']
+    def read_text(file_path: str) -> str:
+        """
+        Read a text file, detecting its encoding in a single pass
+
+        The bytes are read once (memory-mapped for large files), the encoding
+        is picked from a BOM or a sample, and the whole file is decoded once.
+        Another candidate is only tried if the full decode fails past the
+        sample. Newlines are normalized like text-mode open() does.
+        """
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return ""
+
+        with open(file_path, 'rb') as file:
+            if size >= TEXT_MMAP_MIN_BYTES:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = file.read()
 
-            for encoding in encodings:
+        try:
+            encoding = detect_encoding(data)
+            candidates = [encoding] + [
+                enc for enc in TEXT_FALLBACK_ENCODINGS if enc != encoding
+            ]
+            for encoding in candidates:
                 try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        return file.read()
-                except (UnicodeDecodeError, LookupError):
+                    text = str(data, encoding)
+                    break
+                except UnicodeDecodeError:
                     continue
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
 
-            # Последняя попытка
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-                return file.read()
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
 
+    @staticmethod
+    def parse_txt(file_path: str) -> str:
+        """Read text from TXT file"""
+        try:
+            return FileParser.read_text(file_path)
         except Exception as e:
             raise ValueError(f"Failed to parse TXT: {str(e)}")
 
@@ -175,18 +504,17 @@ class FileParser:
     def parse_md(file_path: str) -> str:
         """Read markdown file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            return FileParser.read_text(file_path)
         except Exception as e:
             raise ValueError(f"Failed to parse Markdown: {str(e)}")
 
     @staticmethod
-    def parse_file(file_path: str, file_type: str) -> str:
-        """Parse file based on its type"""
+    def parse_file(file_path: str, file_type: str, profile: str = None) -> str:
+        """Parse file based on its type (profile applies to PDFs)"""
         file_type = file_type.lower()
 
         if file_type == 'pdf':
-            return FileParser.parse_pdf(file_path)
+            return FileParser.parse_pdf(file_path, profile=profile)
         elif file_type == 'docx':
             return FileParser.parse_docx(file_path)
         elif file_type == 'txt':
@@ -194,4 +522,19 @@ class FileParser:
         elif file_type == 'md':
             return FileParser.parse_md(file_path)
         else:
-            raise ValueError(f"Unsupported file type: {file_type}")
\ No newline at end of file
+            raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def parse_file_timed(file_path: str, file_type: str, profile: str = None) -> tuple:
+    """
+    Process pool entry point of batch ingestion: (text, seconds) of one file
+
+    PDFs are parsed sequentially here, the batch already spreads its files
+    over the pool's processes.
+    """
+    started = time.perf_counter()
+    if file_type.lower() == 'pdf':
+        text = FileParser.parse_pdf(file_path, workers=1, profile=profile)
+    else:
+        text = FileParser.parse_file(file_path, file_type, profile)
+    return text, time.perf_counter() - started
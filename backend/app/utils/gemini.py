@@ -0,0 +1,59 @@
+"""
+Gemini client configuration
+
+The services used to call genai.configure on every request, which drops and
+rebuilds the API clients (and their connections) each time. configure_gemini
+applies the settings once per process and again only if they change.
+GEMINI_API_ENDPOINT and GEMINI_TRANSPORT point the client at another server,
+such as the local stand-in used by the benchmarks. Quota rejections are told
+apart by status code (is_quota_error) wherever a call fails.
+
+google.generativeai (with its gRPC and protobuf stack) is imported on first
+use rather than with the app, which keeps it out of worker start-up.
+"""
+import threading
+
+from app.config import get_settings
+
+_configured = None
+_lock = threading.Lock()
+
+
+def configure_gemini():
+    """
+    Import and configure the genai client from settings if not done yet
+
+    Returns:
+        The google.generativeai module
+    """
+    global _configured
+    import google.generativeai as genai
+
+    settings = get_settings()
+    key = (settings.GOOGLE_API_KEY, settings.GEMINI_TRANSPORT, settings.GEMINI_API_ENDPOINT)
+    if _configured == key:
+        return genai
+    with _lock:
+        if _configured == key:
+            return genai
+        genai.configure(
+            api_key=settings.GOOGLE_API_KEY,
+            transport=settings.GEMINI_TRANSPORT or None,
+            client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT} if settings.GEMINI_API_ENDPOINT else None
+        )
+        _configured = key
+    return genai
+
+
+def uses_rest() -> bool:
+    """Whether calls go over REST, whose client has no native async methods"""
+    return get_settings().GEMINI_TRANSPORT.lower() == "rest"
+
+
+class QuotaExceededError(ValueError):
+    """The Gemini API rejected a call for quota (HTTP 429 / RESOURCE_EXHAUSTED)"""
+
+
+def is_quota_error(error: Exception) -> bool:
+    """429 from the client: TooManyRequests (REST) or ResourceExhausted (gRPC)"""
+    return isinstance(error, QuotaExceededError) or getattr(error, "code", None) == 429
@@ -0,0 +1,89 @@
+"""
+Worker start-up warm-up and shutdown drain
+
+warm_up() runs in each worker's startup event: it opens a few connections
+in every pool and builds the Gemini clients, so the first requests a fresh
+worker gets do not pay for connection setup and client construction. It
+never fails start-up; problems are logged. drain() runs on shutdown, after
+the server has stopped taking requests and finished the in-flight ones: it
+waits for background jobs (bulk deletes, batch ingestion) and then closes
+the pools.
+"""
+import asyncio
+import logging
+import time
+
+from app import database
+from app.config import get_settings
+from app.services.jobs import JobService
+from app.utils.gemini import configure_gemini, uses_rest
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _warm_sync_pool(engine, connections: int):
+    opened = [engine.connect() for _ in range(connections)]
+    try:
+        for conn in opened:
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+async def _warm_async_pool(engine, connections: int):
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+
+    # Concurrent, so the pool really holds that many connections afterwards
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+def _warm_gemini():
+    configure_gemini()
+    from google.generativeai import client
+
+    client.get_default_generative_client()
+    if not uses_rest():
+        client.get_default_generative_async_client()
+
+
+async def warm_up():
+    """Open pool connections and build the Gemini clients for this worker"""
+    started = time.perf_counter()
+    connections = settings.WARMUP_DB_CONNECTIONS
+    if connections > 0:
+        engines = [database.async_engine] + [replica.engine for replica in database.replicas]
+        try:
+            if database.engine is not None:
+                await asyncio.to_thread(_warm_sync_pool, database.engine, connections)
+            for engine in engines:
+                if engine is not None:
+                    await _warm_async_pool(engine, connections)
+        except Exception as e:
+            logger.warning(f"Database warm-up failed: {e}")
+
+    if settings.WARMUP_GEMINI and settings.GOOGLE_API_KEY:
+        try:
+            await asyncio.to_thread(_warm_gemini)
+        except Exception as e:
+            logger.warning(f"Gemini client warm-up failed: {e}")
+    logger.info(f"🔥 Warm-up done in {time.perf_counter() - started:.2f}s")
+
+
+async def drain():
+    """Let background jobs finish (up to SHUTDOWN_DRAIN_SECONDS), then close the pools"""
+    active = JobService.active_count()
+    if active:
+        logger.info(f"⏳ Waiting for {active} background job(s) to finish...")
+        remaining = await asyncio.to_thread(JobService.drain, settings.SHUTDOWN_DRAIN_SECONDS)
+        if remaining:
+            logger.warning(f"{remaining} background job(s) still running at shutdown")
+
+    if database.engine is not None:
+        database.engine.dispose()
+    for engine in [database.async_engine] + [replica.engine for replica in database.replicas]:
+        if engine is not None:
+            await engine.dispose()
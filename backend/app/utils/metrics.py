@@ -0,0 +1,193 @@
+"""
+Prometheus metrics without a client library
+
+Counters, gauges and histograms with labels, rendered in the Prometheus
+text exposition format by render() for GET /metrics. With METRICS_ENABLED
+off every update returns at its first check and Histogram.time() hands out
+a shared no-op context, so instrumented code pays close to nothing.
+
+Gauges and counters can also be read from a callback at scrape time
+(set_function), for values owned elsewhere such as pool and job counts.
+
+Values are kept per process, there is no multiprocess aggregation: run
+serve.py with one worker, or scrape each single-worker instance on its own.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Tuple
+
+from app.config import get_settings
+
+ENABLED = get_settings().METRICS_ENABLED
+
+# Seconds; parsing large PDFs and generation reach the top buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = []
+_NOOP = nullcontext()
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._function = None
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def set_function(self, function: Callable[[], Dict[tuple, float]]):
+        """Read the values at scrape time: function() -> {label values tuple: value}"""
+        self._function = function
+
+    def _labels(self, labelvalues: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labelvalues)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self):
+        if self._function is not None:
+            return sorted(self._function().items())
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, value in self._samples():
+            lines.append(f"{self.name}{self._labels(labelvalues)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic count"""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount: float = 1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, +Inf last, then sum
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labelvalues):
+        """Context manager observing the duration of its block"""
+        if not ENABLED:
+            return _NOOP
+        return self._timer(labelvalues)
+
+    @contextmanager
+    def _timer(self, labelvalues: tuple):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            samples = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labelvalues, (counts, total) in samples:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._labels(labelvalues, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labelvalues)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(labelvalues)} {cumulative}")
+        return "\n".join(lines)
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# Pipeline stages
+PARSE_SECONDS = Histogram("rag_parse_seconds", "Document parsing time", ("file_type",))
+CHUNK_SECONDS = Histogram("rag_chunk_seconds", "Chunking time per document")
+EMBED_BATCH_SECONDS = Histogram("rag_embed_batch_seconds", "Gemini batch embedding request time")
+EMBED_ITEM_SECONDS = Histogram("rag_embed_item_seconds", "Gemini single-text embedding request time")
+EMBED_BATCH_ITEM_SECONDS = Histogram(
+    "rag_embed_batch_item_seconds", "Batch embedding request time divided by its texts"
+)
+DB_INSERT_SECONDS = Histogram("rag_db_insert_seconds", "Chunk insert commit time")
+VECTOR_SEARCH_SECONDS = Histogram("rag_vector_search_seconds", "Vector similarity query time")
+GENERATION_SECONDS = Histogram("rag_generation_seconds", "Answer generation time")
+
+# Gemini failures, operation = embed or generate
+GEMINI_ERRORS = Counter("rag_gemini_errors_total", "Failed Gemini API calls", ("operation",))
+GEMINI_QUOTA_HITS = Counter("rag_gemini_quota_hits_total", "Gemini calls rejected for quota", ("operation",))
+
+# Load
+REQUESTS_IN_FLIGHT = Gauge("rag_http_requests_in_flight", "HTTP requests being served")
+JOBS = Gauge("rag_jobs", "Background jobs by status", ("status",))
+DB_POOL_IN_USE = Gauge("rag_db_pool_in_use", "Checked-out database connections", ("pool",))
+DB_POOL_OVERFLOW = Gauge("rag_db_pool_overflow", "Open connections beyond the pool size", ("pool",))
+DB_POOL_CHECKOUT_WAIT = Counter(
+    "rag_db_pool_checkout_wait_seconds_total", "Time spent waiting for database connections", ("pool",)
+)
+DB_SLOW_QUERIES = Counter("rag_db_slow_queries_total", "Statements over SLOW_QUERY_MS", ("kind",))
+DB_POOL_TIMEOUTS = Counter("rag_db_pool_timeouts_total", "Connection checkouts that timed out", ("pool",))
@@ -0,0 +1,82 @@
+"""
+MinHash signatures and LSH band keys for near-duplicate text detection
+
+A signature is NUM_PERM minimum hashes over the word 3-gram shingles of a
+text; the fraction of equal positions in two signatures estimates the
+Jaccard similarity of their shingle sets. Signatures are split into BANDS
+bands of ROWS values and each band is hashed to a bucket key: texts that
+share any bucket are candidates (with 16 bands of 8 rows, pairs above ~0.7
+similarity almost always collide), which are then checked with similarity().
+
+Hashes are seeded constants and crc32/blake2b, not Python's per-process
+salted hash(), so signatures and buckets can be persisted.
+"""
+import hashlib
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(20251)
+# a < 2**32 and 32-bit shingle hashes keep a * x + b inside uint64
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def shingles(text: str) -> set:
+    """Lowercased word 3-grams (the whole text for shorter texts)"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a text (uint32 array of NUM_PERM values)
+
+    None for a text without words: an empty shingle set would give every
+    such text the same signature, i.e. make them all exact duplicates.
+    """
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text)),
+        dtype=np.uint64
+    )
+    if not len(hashes):
+        return None
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    """Signed 64-bit bucket key of every band, index = band number"""
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in sig.reshape(BANDS, ROWS)
+    ]
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
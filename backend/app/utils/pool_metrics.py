@@ -0,0 +1,84 @@
+"""
+Connection pool metrics
+
+metered_pool_class() derives a pool class whose checkouts are timed, so
+requests queueing for a database connection show up as checkout wait
+instead of unexplained latency. The metrics object is a class attribute:
+SQLAlchemy rebuilds pools with self.__class__ after dispose(), and the
+numbers carry over.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+
+
+class PoolMetrics:
+    """Checkout counters of one pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def snapshot(self, pool) -> dict:
+        """Counters plus the pool's current in-use, idle and overflow connections"""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            stats = {
+                "pool": self.name,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / attempts, 6) if attempts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+        if pool is not None and hasattr(pool, "checkedout"):
+            stats.update({
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # QueuePool counts overflow from -pool_size; only opened extras matter
+                "overflow": max(0, pool.overflow()),
+            })
+        return stats
+
+
+def metered_pool_class(base: type, name: str) -> type:
+    """
+    Subclass of a SQLAlchemy pool class that times every checkout
+
+    Args:
+        base: Pool class to extend (QueuePool, AsyncAdaptedQueuePool)
+        name: Label used in the metrics
+
+    Returns:
+        Pool class with a ``metrics`` attribute (PoolMetrics)
+    """
+    metrics = PoolMetrics(name)
+
+    def connect(self):
+        # Covers queueing for a free connection, opening overflow ones and pre-ping
+        started = time.perf_counter()
+        try:
+            connection = base.connect(self)
+        except exc.TimeoutError:
+            metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.observe(time.perf_counter() - started)
+        return connection
+
+    return type(f"Metered{base.__name__}", (base,), {"metrics": metrics, "connect": connect})
@@ -0,0 +1,177 @@
+"""
+On-demand request profiling
+
+A SamplingProfiler thread reads every thread's stack from
+sys._current_frames() at a fixed interval while one request runs, so it
+sees the event loop as well as the worker threads sync endpoints and
+to_thread calls run on (and, being process-wide, whatever else ran at the
+same time). Reports are speedscope files (https://www.speedscope.app), one
+profile per thread, stored under PROFILING_DIR.
+
+Only one request is profiled at a time; the middleware in app.main exists
+only with PROFILING_ENABLED, so unprofiled requests pay nothing otherwise.
+"""
+import ipaddress
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from app.config import get_settings
+
+settings = get_settings()
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+SUFFIX = ".speedscope.json"
+
+_busy = threading.Lock()
+_allowed = [
+    ipaddress.ip_network(client.strip(), strict=False)
+    for client in settings.PROFILING_ALLOWED_CLIENTS.split(",") if client.strip()
+]
+
+
+def client_allowed(host: str) -> bool:
+    """Whether a client address is in PROFILING_ALLOWED_CLIENTS"""
+    try:
+        address = ipaddress.ip_address(host)
+    except (TypeError, ValueError):
+        return False
+    return any(address in network for network in _allowed)
+
+
+def try_begin() -> bool:
+    """Claim the profiler; False while another request is being profiled"""
+    return _busy.acquire(blocking=False)
+
+
+def end():
+    _busy.release()
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads until stopped"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._frames = []  # speedscope frames
+        self._frame_index = {}  # (name, file, line) -> index in _frames
+        self._stacks = {}  # thread id -> list of (timestamp, stack of frame indices)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started = 0.0
+        self.stopped = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self, request_thread: int, name: str) -> dict:
+        """
+        Stop sampling and build the speedscope document
+
+        Threads other than request_thread that sat in one stack for the
+        whole run (idle pool workers) are left out.
+        """
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        profiles = []
+        for thread_id, samples in self._stacks.items():
+            stacks = [stack for _, stack in samples]
+            if thread_id != request_thread and len(set(stacks)) <= 1:
+                continue
+            # Each sample lasts until the next one (the last one until stop)
+            times = [timestamp for timestamp, _ in samples] + [self.stopped]
+            profiles.append({
+                "type": "sampled",
+                "name": f"{names.get(thread_id, thread_id)}" + (" (request)" if thread_id == request_thread else ""),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.stopped - self.started, 6),
+                "samples": [list(stack) for stack in stacks],
+                "weights": [round(times[i + 1] - times[i], 6) for i in range(len(samples))],
+            })
+        # Request thread first, speedscope opens the first profile
+        profiles.sort(key=lambda profile: not profile["name"].endswith("(request)"))
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "rag-backend",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self._frames},
+            "profiles": profiles,
+        }
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter() - self.started
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self._stacks.setdefault(thread_id, []).append((now, self._stack(frame)))
+
+    def _stack(self, frame) -> tuple:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self._frames)
+                self._frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        # speedscope stacks go from the root to the leaf
+        return tuple(reversed(stack))
+
+
+def _directory() -> Path:
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def save(report: dict) -> str:
+    """Write a report, drop the oldest beyond PROFILING_KEEP (0 = keep all); returns its id"""
+    directory = _directory()
+    profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    with open(directory / f"{profile_id}{SUFFIX}", "w") as f:
+        json.dump(report, f)
+    if settings.PROFILING_KEEP > 0:
+        for old in sorted(directory.glob(f"*{SUFFIX}"))[:-settings.PROFILING_KEEP]:
+            old.unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles() -> list:
+    """Stored reports, newest first: id, request, duration, size"""
+    profiles = []
+    for path in sorted(_directory().glob(f"*{SUFFIX}"), reverse=True):
+        try:
+            with open(path) as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({
+            "id": path.name[:-len(SUFFIX)],
+            "request": report.get("name"),
+            "seconds": max((profile["endValue"] for profile in report.get("profiles", [])), default=0),
+            "size_bytes": path.stat().st_size,
+        })
+    return profiles
+
+
+def profile_path(profile_id: str) -> Path:
+    """Path of a stored report, None for unknown or malformed ids"""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = _directory() / f"{profile_id}{SUFFIX}"
+    return path if path.is_file() else None
@@ -0,0 +1,113 @@
+"""
+Read-replica selection
+
+ReplicaRouter picks the async engine a read-only request should use. Each
+replica's replication lag is measured at most every check interval; a
+replica is skipped when it lags more than the configured maximum or when
+the lag check fails. A read that must see a given write (read-your-writes)
+passes the time of that write and only goes to replicas known to have
+replayed past it. With no usable replica, reads go to the primary.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import List
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Replay lag in seconds; 0 when everything received is replayed (an idle
+# primary would otherwise make the last replay timestamp look old)
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """A replica engine and its last lag measurement"""
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.lag_seconds = float("inf")
+        self.checked_at = 0.0
+        self._check_lock = asyncio.Lock()
+
+    def in_use(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    def replayed_until(self) -> float:
+        """Wall-clock time up to which the replica is known to have replayed"""
+        return self.checked_at - self.lag_seconds
+
+
+class ReplicaRouter:
+    """Chooses a replica (or the primary) for each read"""
+
+    def __init__(
+        self,
+        primary,
+        replicas: List[Replica],
+        selection: str = "round_robin",
+        max_lag_seconds: float = 5.0,
+        check_interval: float = 5.0,
+        check_timeout: float = 1.0
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.selection = selection.lower()
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._next = itertools.count()
+
+    async def choose(self, consistent: bool = False, written_at: float = 0.0):
+        """
+        Engine for a read
+
+        Args:
+            consistent: Read from the primary regardless of replica state
+            written_at: Unix time of a write the read must see (0 = none)
+
+        Returns:
+            Async engine of a fresh enough replica, or the primary
+        """
+        if consistent or not self.replicas:
+            return self.primary
+        await asyncio.gather(*(self._refresh(replica) for replica in self.replicas))
+        usable = [replica for replica in self.replicas if self._fresh(replica, written_at)]
+        if not usable:
+            return self.primary
+        if self.selection == "least_connections":
+            return min(usable, key=Replica.in_use).engine
+        return usable[next(self._next) % len(usable)].engine
+
+    def _fresh(self, replica: Replica, written_at: float) -> bool:
+        if replica.lag_seconds > self.max_lag_seconds:
+            return False
+        # Read-your-writes: the replica must have replayed past the write
+        return replica.replayed_until() >= written_at
+
+    async def _refresh(self, replica: Replica):
+        if time.time() - replica.checked_at < self.check_interval:
+            return
+        async with replica._check_lock:
+            if time.time() - replica.checked_at < self.check_interval:
+                return
+            try:
+                replica.lag_seconds = float(await asyncio.wait_for(
+                    self._measure_lag(replica), self.check_timeout
+                ))
+            except Exception as e:
+                logger.warning(f"Replica {replica.name} lag check failed: {e}")
+                replica.lag_seconds = float("inf")
+            replica.checked_at = time.time()
+
+    @staticmethod
+    async def _measure_lag(replica: Replica) -> float:
+        async with replica.engine.connect() as conn:
+            return (await conn.execute(LAG_QUERY)).scalar() or 0.0
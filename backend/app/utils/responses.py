@@ -0,0 +1,38 @@
+"""
+Fast JSON responses
+
+FastJSONResponse is the app's default response class. Pydantic models are
+serialized by pydantic-core's own JSON serializer, without the dict round
+trip and jsonable_encoder pass of FastAPI's default path; anything else goes
+through orjson when installed (pip install orjson), else pydantic-core.
+
+Endpoints return FastJSONResponse(...) themselves for large payloads:
+FastAPI passes a returned response through without validating the content
+against response_model again (the model still documents the schema). Rows
+that already have the model's fields and types from a query are rendered
+as plain dicts, which pydantic-core serializes several times faster than
+it builds models for them.
+"""
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import pydantic_core
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core (models) or orjson"""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if HAS_ORJSON:
+            return orjson.dumps(
+                content,
+                default=pydantic_core.to_jsonable_python,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        return pydantic_core.to_json(content)
@@ -0,0 +1,241 @@
+"""
+Slow statement capture
+
+install() times every statement an engine runs. Statements over
+SLOW_QUERY_MS are kept in memory (statement, parameter shapes, duration)
+for GET /api/admin/slow-queries, and a SLOW_QUERY_EXPLAIN_SAMPLE_RATE share
+of them is explained in the background on a separate connection. Read-only
+statements are re-run under EXPLAIN (ANALYZE, BUFFERS); writes only get a
+plain EXPLAIN: re-running them while their own transaction is still open
+would wait on its row locks and fail on its uncommitted primary keys. The
+plan tells whether the embedding index served a similarity search; a
+sequential scan over chunks there is logged as a warning. The
+transaction-local search settings retrieval applies with set_config
+(ivfflat.probes, hnsw.ef_search) are tracked per transaction and applied
+again before the EXPLAIN, so the plan is the one that statement got.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+
+from app.config import get_settings
+from app.utils.metrics import DB_SLOW_QUERIES
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+VECTOR_INDEX_NAME = "chunks_embedding_idx"
+VECTOR_OPERATORS = ("<=>", "<->", "<#>")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+# Statements that change data or take row locks are never executed again
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+# set_config(name, value, true) settings that change vector query plans
+LOCAL_SETTINGS = ("ivfflat.probes", "hnsw.ef_search")
+STATEMENT_CHARS = 2000
+MAX_PENDING_EXPLAINS = 4
+
+_entries = deque(maxlen=settings.SLOW_QUERY_HISTORY)
+_lock = threading.Lock()
+_explainer = None
+_explain_engines = {}
+_pending = 0
+
+INDEX_LISTING = text("""
+    SELECT i.indexname, i.tablename, i.indexdef,
+           pg_relation_size(CAST(quote_ident(i.indexname) AS regclass)) AS size_bytes,
+           s.idx_scan
+    FROM pg_indexes i
+    LEFT JOIN pg_stat_user_indexes s ON s.indexrelname = i.indexname AND s.schemaname = i.schemaname
+    WHERE i.schemaname = 'public'
+    ORDER BY i.tablename, i.indexname
+""")
+
+
+def install(sync_engine, name: str):
+    """Time the statements of an engine (sync_engine of async ones)"""
+    if settings.SLOW_QUERY_MS <= 0:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "begin")
+    def reset_local_settings(conn):
+        conn.info.pop("local_settings", None)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def check_duration(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._slow_query_started
+        if "set_config" in statement and isinstance(parameters, dict) and parameters.get("name") in LOCAL_SETTINGS:
+            conn.info.setdefault("local_settings", {})[parameters["name"]] = parameters.get("value")
+        if seconds * 1000 >= settings.SLOW_QUERY_MS:
+            local_settings = dict(conn.info.get("local_settings") or {})
+            _record(sync_engine, name, statement, parameters, executemany, seconds, local_settings)
+
+
+def classify(statement: str) -> str:
+    """retrieval (vector similarity), ingestion (writes), or other"""
+    upper = statement.lstrip().upper()
+    if any(operator in statement for operator in VECTOR_OPERATORS):
+        return "retrieval"
+    if upper.startswith(("INSERT", "UPDATE", "DELETE")):
+        return "ingestion"
+    return "other"
+
+
+def is_read_only(statement: str) -> bool:
+    """SELECT / WITH statements that neither write nor lock rows: safe to execute again"""
+    return statement.lstrip().upper().startswith(("SELECT", "WITH")) and not _WRITES.search(statement)
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Types and sizes of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "first": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return _value_shape(parameters)
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "null"
+    if hasattr(value, "__len__"):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _record(sync_engine, name: str, statement: str, parameters, executemany: bool, seconds: float,
+            local_settings: dict = None):
+    global _pending
+    kind = classify(statement)
+    DB_SLOW_QUERIES.inc(kind)
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "engine": name,
+        "kind": kind,
+        "duration_ms": round(seconds * 1000, 1),
+        "statement": statement[:STATEMENT_CHARS],
+        "parameters": parameter_shape(parameters, executemany),
+        "settings": local_settings or {},
+        "explain": None,
+    }
+    logger.info(f"🐢 Slow {kind} statement on {name}: {entry['duration_ms']} ms")
+
+    explain = (
+        random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+        and statement.lstrip().upper().startswith(EXPLAINABLE)
+    )
+    with _lock:
+        _entries.append(entry)
+        if explain and _pending >= MAX_PENDING_EXPLAINS:
+            entry["explain"] = {"skipped": "too many explains pending"}
+            explain = False
+        if explain:
+            _pending += 1
+            entry["explain"] = {"status": "pending"}
+    if explain:
+        first = list(parameters)[0] if executemany and parameters else parameters
+        _executor().submit(_explain, sync_engine, entry, statement, first)
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _explainer
+    with _lock:
+        if _explainer is None:
+            _explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        return _explainer
+
+
+def _explain_engine(sync_engine):
+    # Own unpooled engine: explains must not take connections from the app's
+    # pools, and an async engine's connections cannot be used from this thread
+    key = str(sync_engine.url)
+    with _lock:
+        if key not in _explain_engines:
+            _explain_engines[key] = create_engine(sync_engine.url, poolclass=NullPool)
+        return _explain_engines[key]
+
+
+def _explain(sync_engine, entry: dict, statement: str, parameters):
+    global _pending
+    try:
+        with _explain_engine(sync_engine).connect() as conn:
+            timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS if settings.DB_STATEMENT_TIMEOUT_MS > 0 else 60_000
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+            for setting, value in entry["settings"].items():
+                conn.execute(text("SELECT set_config(:name, :value, true)"), {"name": setting, "value": value})
+            analyze = is_read_only(statement)
+            options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+            plan = conn.exec_driver_sql(f"EXPLAIN ({options}) " + statement, parameters or {}).scalar()
+            conn.rollback()
+        plan = plan[0] if isinstance(plan, list) else plan
+        summary = summarize_plan(plan)
+        entry["explain"] = {"status": "done", "analyzed": analyze, **summary, "plan": plan}
+        if entry["kind"] == "retrieval" and not summary["vector_index_used"]:
+            logger.warning(
+                f"⚠️  Similarity search on {entry['engine']} did not use {VECTOR_INDEX_NAME} "
+                f"(scans: {', '.join(summary['scans']) or 'none'})"
+            )
+    except Exception as e:
+        entry["explain"] = {"status": "failed", "error": str(e)[:500]}
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def summarize_plan(plan: dict) -> dict:
+    """Scans in an EXPLAIN (FORMAT JSON) plan and whether the vector index served it"""
+    scans = []
+    vector_index_used = False
+    seq_scan_chunks = False
+    nodes = [plan.get("Plan", {})]
+    while nodes:
+        node = nodes.pop()
+        node_type = node.get("Node Type", "")
+        if "Scan" in node_type:
+            target = node.get("Index Name") or node.get("Relation Name") or ""
+            scans.append(f"{node_type} on {target}".strip())
+            if node.get("Index Name") == VECTOR_INDEX_NAME:
+                vector_index_used = True
+            if node_type == "Seq Scan" and node.get("Relation Name") == "chunks":
+                seq_scan_chunks = True
+        nodes.extend(node.get("Plans", []))
+    return {
+        "vector_index_used": vector_index_used,
+        "seq_scan_on_chunks": seq_scan_chunks,
+        "scans": scans,
+        "execution_ms": plan.get("Execution Time"),
+        "planning_ms": plan.get("Planning Time"),
+    }
+
+
+def recent(kind: str = None, limit: int = 50) -> list:
+    """Captured statements, newest first"""
+    with _lock:
+        entries = list(_entries)
+    entries.reverse()
+    return [entry for entry in entries if kind is None or entry["kind"] == kind][:limit]
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def index_listing(engine) -> list:
+    """Indexes of the public schema with size and scans since the stats reset"""
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(INDEX_LISTING)]
@@ -1,5 +1,142 @@
 import re
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from app.utils.tokenizer import get_token_counter
+
+
+# Chars of cleaned text used to measure chars per token for an exact tokenizer
+TOKEN_CALIBRATION_CHARS = 64 * 1024
+
+# Abbreviations whose dots must not end a sentence, found by checking the text
+# before every dot (see TextProcessor._protect_abbreviations). The phase is
+# the position of the substitution in the original sequence of four re.sub
+# passes, which the single pass reproduces.
+_TITLES = ('Mr', 'Dr', 'Ms', 'Sr', 'Jr')
+_ABBREVIATION_PHASES = {'etc': 0, 'ie': 1, 'etc2': 2, 'title': 3}
+_ABBREVIATION_PLACEHOLDERS = {'etc': 'и_т_д', 'ie': 'т_е', 'etc2': 'и_т_п'}
+_PLACEHOLDER_RE = re.compile(r'и_т_д|т_е|и_т_п|<DOT>')
+_PLACEHOLDER_TEXT = {'и_т_д': 'и т.д.', 'т_е': 'т.е.', 'и_т_п': 'и т.п.', '<DOT>': '.'}
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[А-ЯA-Z])')
+
+
+def _restore_placeholder(match) -> str:
+    return _PLACEHOLDER_TEXT[match.group()]
+
+
+# Characters matched by \s in str patterns (all of them are below U+3001)
+_WHITESPACE_TABLE = np.array([chr(c).isspace() for c in range(0x3001)], dtype=bool)
+
+
+class BoundaryIndex:
+    """
+    Chunk cut candidates of a text, located once for all windows
+
+    Separators that are usually present near the window end (paragraph,
+    newline, space) are searched with bounded str.rfind on the full text, no
+    window copy. Sentence ends and punctuation are often absent, which used
+    to mean re-running a regex and eight searches over every overlapping
+    window; their offsets are found with one vectorized pass over the text
+    the first time a cut needs them, so each lookup is a binary search.
+    find_cut returns exactly what TextProcessor._find_boundary returns for
+    text[start:end].
+    """
+
+    PUNCTUATION = ['. ', '! ', '? ', '.\n', '!\n', '?\n', '; ', ';\n']
+
+    def __init__(self, text: str):
+        self.text = text
+        self._offsets = {}
+        self._codes = None
+
+    @property
+    def codes(self) -> np.ndarray:
+        if self._codes is None:
+            self._codes = np.frombuffer(
+                self.text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32
+            )
+        return self._codes
+
+    def _get(self, kind: str):
+        offsets = self._offsets.get(kind)
+        if offsets is None:
+            offsets = self._sentences() if kind == 'sentence' else self._pairs(kind)
+            self._offsets[kind] = offsets
+        return offsets
+
+    def _pairs(self, pattern: str) -> np.ndarray:
+        codes = self.codes
+        offsets = np.flatnonzero(codes[:-1] == ord(pattern[0]))
+        return offsets[codes[offsets + 1] == ord(pattern[1])]
+
+    def _sentences(self) -> tuple:
+        """(start, end) offsets of the sentence-end regex used by _find_boundary"""
+        codes = self.codes
+
+        def is_space(offsets):
+            found = codes[offsets]
+            low = found < len(_WHITESPACE_TABLE)
+            result = np.zeros(len(offsets), dtype=bool)
+            result[low] = _WHITESPACE_TABLE[found[low]]
+            return result
+
+        marks = np.flatnonzero((codes == ord('.')) | (codes == ord('!')) | (codes == ord('?')))
+        marks = marks[marks + 1 < len(codes)]
+        starts = marks[is_space(marks + 1)]
+
+        # Walk all whitespace runs forward at once; runs are short after cleaning
+        ends = starts + 1
+        active = np.arange(len(ends))
+        while len(active):
+            ends[active] += 1
+            active = active[ends[active] < len(codes)]
+            active = active[is_space(ends[active])]
+
+        # The char after the run must be a capital (runs reaching the end never match)
+        in_text = ends < len(codes)
+        starts, ends = starts[in_text], ends[in_text]
+        follow = codes[ends]
+        capital = ((follow >= 0x41) & (follow <= 0x5A)) | ((follow >= 0x410) & (follow <= 0x42F))
+        return starts[capital], ends[capital]
+
+    def find_cut(self, start: int, end: int, chunk_chars: int) -> int:
+        """Best cut position relative to start for the window [start, end) (-1 if none)"""
+        text = self.text
+
+        # Параграф
+        pos = text.rfind('\n\n', start, end)
+        if pos - start > int(0.3 * chunk_chars):
+            return pos - start + 2
+
+        # Конец предложения: first match past 40% whose lookahead char is in the window
+        sentence_starts, sentence_ends = self._get('sentence')
+        i = int(sentence_ends.searchsorted(start + int(0.4 * chunk_chars), side='right'))
+        while i < len(sentence_ends) and sentence_ends[i] < end:
+            if sentence_starts[i] >= start:
+                return int(sentence_ends[i]) - start
+            i += 1
+
+        # Знаки препинания
+        for punct in self.PUNCTUATION:
+            offsets = self._get(punct)
+            i = int(offsets.searchsorted(end - 1)) - 1
+            pos = int(offsets[i]) if i >= 0 else -1
+            if pos - start > int(0.5 * chunk_chars):
+                return pos - start + 2
+
+        # Перевод строки
+        pos = text.rfind('\n', start, end)
+        if pos - start > int(0.6 * chunk_chars):
+            return pos - start + 1
+
+        # Пробел
+        pos = text.rfind(' ', start, end)
+        if pos - start > int(0.7 * chunk_chars):
+            return pos - start + 1
+
+        return -1
+
 
 class TextProcessor:
     """Utility class for text processing"""
@@ -11,33 +148,117 @@ class TextProcessor:
             return ""
 
         # ТОЛЬКО убираем множественные пробелы между словами
-        text = re.sub(r' {2,}', ' ', text)
+        # (halving str.replace passes, far faster than a regex on long text)
+        while '  ' in text:
+            text = text.replace('  ', ' ')
 
         # Убираем пробелы в начале/конце строк
-        lines = [line.strip() for line in text.split('\n')]
-        text = '\n'.join(lines)
+        text = '\n'.join([line.strip() for line in text.split('\n')])
 
         # Убираем более 2 переводов строк подряд
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        while '\n\n\n' in text:
+            text = text.replace('\n\n\n', '\n\n')
 
         # Общий trim
-        text = text.strip()
+        return text.strip()
 
-        return text
+    @staticmethod
+    def clean_text_stream(pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Streaming clean_text over an iterable of text pieces (e.g. pages)
+
+        Pieces may be split anywhere, even inside a whitespace run. The
+        trailing whitespace of each piece is held back until the next
+        non-whitespace text shows what it was, so the concatenation of the
+        yielded strings equals clean_text("".join(pieces)).
+        """
+        pending = ""
+        started = False
+        for piece in pieces:
+            if not piece:
+                continue
+            buffer = pending + piece
+            body_end = len(buffer.rstrip())
+            if not body_end:
+                pending = buffer
+                continue
+            body, pending = buffer[:body_end], buffer[body_end:]
+            if started:
+                # The leading run is inside a line; anchor it with a non-space char
+                cleaned = TextProcessor.clean_text('.' + body)[1:]
+            else:
+                cleaned = TextProcessor.clean_text(body)
+                started = True
+            if cleaned:
+                yield cleaned
 
     @staticmethod
     def count_tokens(text: str) -> int:
-        """Estimate token count"""
+        """Token count (real tokenizer if configured, otherwise an estimate)"""
         if not text:
             return 0
 
-        words = len(text.split())
-        chars = len(text)
+        return get_token_counter().count(text)
 
-        tokens_by_chars = chars / 3.8
-        tokens_by_words = words * 1.3
+    @staticmethod
+    def _abbreviation_ending_at(text: str, dot: int):
+        """(start, kind) of the abbreviation whose final dot is text[dot], or None"""
+        prev = text[dot - 1]
+        if prev in 'деп':
+            if dot < 3 or text[dot - 2] != '.' or text[dot - 3] != 'т':
+                return None
+            if prev == 'е':
+                return dot - 3, 'ie'
+            # "и", at least one whitespace char, "т.д." / "т.п."
+            i = dot - 4
+            while i >= 0 and text[i].isspace():
+                i -= 1
+            if i < dot - 4 and i >= 0 and text[i] == 'и':
+                return i, 'etc' if prev == 'д' else 'etc2'
+            return None
+        if prev in 'rs':
+            if text[dot - 3:dot] == 'Mrs':
+                return dot - 3, 'title'
+            if text[dot - 2:dot] in _TITLES:
+                return dot - 2, 'title'
+        return None
 
-        return int((tokens_by_chars + tokens_by_words) / 2)
+    @staticmethod
+    def _protect_abbreviations(text: str) -> str:
+        """
+        Swap abbreviation dots for placeholders in a single pass
+
+        Candidates are only looked for at dots (str.find), instead of running
+        four regexes that try every position. Same result as the original
+        sequential substitutions: each needs a word boundary before it, and a
+        later substitution's boundary fails right after an earlier one's
+        placeholder (which ends in a letter, where the original had a dot).
+        """
+        parts = []
+        pos = 0
+        prev_end = -1
+        prev_phase = -1
+        dot = text.find('.', 1)
+        while dot != -1:
+            found = TextProcessor._abbreviation_ending_at(text, dot)
+            if found:
+                start, kind = found
+                phase = _ABBREVIATION_PHASES[kind]
+                before = text[start - 1] if start else ''
+                at_boundary = not (before.isalnum() or before == '_')
+                if at_boundary and not (start == prev_end and prev_phase < phase):
+                    parts.append(text[pos:start])
+                    if kind == 'title':
+                        parts.append(text[start:dot] + '<DOT>')
+                    else:
+                        parts.append(_ABBREVIATION_PLACEHOLDERS[kind])
+                    pos = prev_end = dot + 1
+                    prev_phase = phase
+            dot = text.find('.', dot + 1)
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return ''.join(parts)
 
     @staticmethod
     def split_into_sentences(text: str) -> List[str]:
@@ -46,100 +267,291 @@ class TextProcessor:
             return []
 
         # Защита сокращений
-        text = re.sub(r'\bи\s+т\.д\.', 'и_т_д', text)
-        text = re.sub(r'\bт\.е\.', 'т_е', text)
-        text = re.sub(r'\bи\s+т\.п\.', 'и_т_п', text)
-        text = re.sub(r'\b(Mr|Mrs|Dr|Ms|Sr|Jr)\.', r'\1<DOT>', text)
-
-        sentences = re.split(r'(?<=[.!?])\s+(?=[А-ЯA-Z])', text)
-
-        sentences = [
-            s.replace('и_т_д', 'и т.д.')
-             .replace('т_е', 'т.е.')
-             .replace('и_т_п', 'и т.п.')
-             .replace('<DOT>', '.')
-             .strip()
+        text = TextProcessor._protect_abbreviations(text)
+
+        sentences = _SENTENCE_SPLIT_RE.split(text)
+
+        return [
+            _PLACEHOLDER_RE.sub(_restore_placeholder, s).strip()
+            if ('_' in s or '<' in s) else s.strip()
             for s in sentences if s.strip()
         ]
 
-        return sentences
+    @staticmethod
+    def _chunk_sizes(chunk_size: int, overlap: int, avg_chars_per_token: float = 4) -> Tuple[int, int]:
+        """Convert token sizes to (chunk_chars, overlap_chars)"""
+        chunk_chars = max(400, int(chunk_size * avg_chars_per_token))
+        overlap_chars = max(100, int(overlap * avg_chars_per_token))
+        return chunk_chars, overlap_chars
 
     @staticmethod
-    def smart_chunk_text(
-        text: str,
-        chunk_size: int = 800,
-        overlap: int = 200
-    ) -> List[Tuple[str, int, int]]:
-        """Smart chunking with sentence boundary detection"""
-        if not text:
-            return []
+    def _find_boundary(window: str, chunk_chars: int) -> int:
+        """
+        Find the best cut position inside a chunk window (-1 if none)
+
+        Reference definition of the cut rules; chunking uses the equivalent
+        BoundaryIndex.find_cut, which avoids re-scanning overlapping windows.
+        """
+        best_boundary = -1
+
+        # Параграф
+        para_break = window.rfind('\n\n')
+        if para_break > int(0.3 * chunk_chars):
+            best_boundary = para_break + 2
+
+        # Конец предложения
+        if best_boundary == -1:
+            for match in re.finditer(r'[.!?]\s+(?=[А-ЯA-Z])', window):
+                pos = match.end()
+                if pos > int(0.4 * chunk_chars):
+                    best_boundary = pos
+                    break
+
+        # Знаки препинания
+        if best_boundary == -1:
+            for char in ['. ', '! ', '? ', '.\n', '!\n', '?\n', '; ', ';\n']:
+                pos = window.rfind(char)
+                if pos > int(0.5 * chunk_chars):
+                    best_boundary = pos + len(char)
+                    break
+
+        # Перевод строки
+        if best_boundary == -1:
+            pos = window.rfind('\n')
+            if pos > int(0.6 * chunk_chars):
+                best_boundary = pos + 1
+
+        # Пробел
+        if best_boundary == -1:
+            pos = window.rfind(' ')
+            if pos > int(0.7 * chunk_chars):
+                best_boundary = pos + 1
+
+        return best_boundary
 
-        # Минимальная очистка
-        text = TextProcessor.clean_text(text)
+    @staticmethod
+    def _token_sizing(chunk_size: int, overlap: int, sample: str) -> Tuple[int, int, int]:
+        """
+        (chunk_chars, overlap_chars, token_limit) for the configured token counter
+
+        The heuristic keeps the fixed 4 chars per token and no limit. An exact
+        tokenizer measures chars per token on a sample of the text, and every
+        chunk is then checked against chunk_size real tokens.
+        """
+        counter = get_token_counter()
+        if not counter.exact:
+            return (*TextProcessor._chunk_sizes(chunk_size, overlap), 0)
+        chars_per_token = counter.chars_per_token(sample[:TOKEN_CALIBRATION_CHARS])
+        return (*TextProcessor._chunk_sizes(chunk_size, overlap, chars_per_token), chunk_size)
 
-        avg_chars_per_token = 4
-        chunk_chars = max(400, chunk_size * avg_chars_per_token)
-        overlap_chars = max(100, int(overlap * avg_chars_per_token))
+    @staticmethod
+    def _fit_tokens(text: str, start: int, end: int, index: BoundaryIndex, token_limit: int) -> int:
+        """Move end back (to a boundary where possible) until text[start:end] fits token_limit"""
+        counter = get_token_counter()
+        tokens = counter.count(text[start:end], cache=False)
+        while tokens > token_limit:
+            window = int((end - start) * token_limit / tokens * 0.95)
+            if window < 1:
+                break
+            end = start + window
+            best_boundary = index.find_cut(start, end, window)
+            if best_boundary > 0:
+                end = start + best_boundary
+            tokens = counter.count(text[start:end], cache=False)
+        return end
 
+    @staticmethod
+    def _chunk_range(
+        text: str,
+        start: int,
+        chunk_chars: int,
+        overlap_chars: int,
+        last_start: int = 0,
+        final: bool = True,
+        offset: int = 0,
+        token_limit: int = 0
+    ) -> Tuple[List[Tuple[str, int, int]], int, int]:
+        """
+        Core chunking loop shared by smart_chunk_text and StreamingChunker
+
+        Args:
+            text: Text buffer to cut
+            start: Absolute offset of the next chunk start
+            chunk_chars: Target chunk size in chars
+            overlap_chars: Overlap between chunks in chars
+            last_start: Absolute start of the last emitted chunk
+            final: Whether text is the end of the document; if not, the loop
+                stops before the tail that more text could still extend
+            offset: Absolute offset of text[0]
+            token_limit: Max real tokens per chunk (0 = sizes in chars only)
+
+        Returns:
+            (chunks, next start, last chunk start), offsets are absolute
+        """
         chunks: List[Tuple[str, int, int]] = []
         text_len = len(text)
-        start = 0
+        start -= offset
+        index = None
 
         while start < text_len:
             end = start + chunk_chars
 
             if end >= text_len:
-                chunk_text = text[start:text_len].strip()
-                if chunk_text:
-                    chunks.append((chunk_text, start, text_len))
-                break
-
-            window = text[start:end]
-            best_boundary = -1
-
-            # Параграф
-            para_break = window.rfind('\n\n')
-            if para_break > int(0.3 * chunk_chars):
-                best_boundary = para_break + 2
-
-            # Конец предложения
-            if best_boundary == -1:
-                for match in re.finditer(r'[.!?]\s+(?=[А-ЯA-Z])', window):
-                    pos = match.end()
-                    if pos > int(0.4 * chunk_chars):
-                        best_boundary = pos
-                        break
-
-            # Знаки препинания
-            if best_boundary == -1:
-                for char in ['. ', '! ', '? ', '.\n', '!\n', '?\n', '; ', ';\n']:
-                    pos = window.rfind(char)
-                    if pos > int(0.5 * chunk_chars):
-                        best_boundary = pos + len(char)
-                        break
-
-            # Перевод строки
-            if best_boundary == -1:
-                pos = window.rfind('\n')
-                if pos > int(0.6 * chunk_chars):
-                    best_boundary = pos + 1
-
-            # Пробел
-            if best_boundary == -1:
-                pos = window.rfind(' ')
-                if pos > int(0.7 * chunk_chars):
-                    best_boundary = pos + 1
-
-            if best_boundary > 0:
-                end = start + best_boundary
+                if not final:
+                    break
+                end = text_len
+                if token_limit:
+                    if index is None:
+                        index = BoundaryIndex(text)
+                    end = TextProcessor._fit_tokens(text, start, end, index, token_limit)
+                if end == text_len:
+                    chunk_text = text[start:text_len].strip()
+                    if chunk_text:
+                        chunks.append((chunk_text, offset + start, offset + text_len))
+                    start = text_len
+                    break
+            else:
+                if index is None:
+                    index = BoundaryIndex(text)
+                best_boundary = index.find_cut(start, end, chunk_chars)
+                if best_boundary > 0:
+                    end = start + best_boundary
+                if token_limit:
+                    end = TextProcessor._fit_tokens(text, start, end, index, token_limit)
 
             chunk_text = text[start:end].strip()
             if chunk_text:
-                chunks.append((chunk_text, start, end))
+                chunks.append((chunk_text, offset + start, offset + end))
+                last_start = offset + start
 
             start = end - overlap_chars
 
-            if start <= (chunks[-1][1] if chunks else 0):
+            if offset + start <= last_start:
                 start = end
 
-        return chunks
\ No newline at end of file
+        return chunks, offset + start, last_start
+
+    @staticmethod
+    def strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+        """Narrow text[start:end] to the offsets of its stripped content"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    @staticmethod
+    def smart_chunk_text(
+        text: str,
+        chunk_size: int = 800,
+        overlap: int = 200
+    ) -> List[Tuple[str, int, int]]:
+        """Smart chunking with sentence boundary detection"""
+        if not text:
+            return []
+
+        # Минимальная очистка
+        text = TextProcessor.clean_text(text)
+
+        chunk_chars, overlap_chars, token_limit = TextProcessor._token_sizing(chunk_size, overlap, text)
+        chunks, _, _ = TextProcessor._chunk_range(
+            text, 0, chunk_chars, overlap_chars, token_limit=token_limit
+        )
+        return chunks
+
+
+class StreamingChunker:
+    """
+    Incremental version of TextProcessor.smart_chunk_text
+
+    Pages are fed one at a time and joined with a paragraph break. Only the
+    text after the last cut is kept, so memory stays at about one page plus
+    one chunk, while the overlap carries across page boundaries. Feeding every
+    page and calling finish() yields exactly the chunks smart_chunk_text would
+    produce for the joined text. With an exact tokenizer, chunking waits until
+    the calibration sample (the same text prefix smart_chunk_text measures)
+    has arrived.
+
+    With keep_text the whole cleaned text is also collected (for span
+    storage), and span() resolves the exact offsets of the chunks returned by
+    the last feed()/finish() call.
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, chunk_size: int = 800, overlap: int = 200, keep_text: bool = False):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.chunk_chars = None
+        self.overlap_chars = None
+        self.token_limit = 0
+        if not get_token_counter().exact:
+            self.chunk_chars, self.overlap_chars, self.token_limit = TextProcessor._token_sizing(
+                chunk_size, overlap, ""
+            )
+        self._buffer = ""
+        self._buffer_offset = 0  # absolute offset of _buffer[0]
+        self._start = 0
+        self._last_start = 0
+        self._has_text = False
+        self._text_parts = [] if keep_text else None
+
+    @property
+    def text(self) -> str:
+        """Cleaned text fed so far (keep_text only), the text chunk offsets refer to"""
+        return "".join(self._text_parts)
+
+    def feed(self, text: str) -> List[Tuple[str, int, int]]:
+        """Add a page of text and return the chunks that are now complete"""
+        text = TextProcessor.clean_text(text)
+        if not text:
+            return []
+        self._trim()
+        if self._has_text:
+            self._buffer += self.SEPARATOR
+            if self._text_parts is not None:
+                self._text_parts.append(self.SEPARATOR)
+        self._buffer += text
+        if self._text_parts is not None:
+            self._text_parts.append(text)
+        self._has_text = True
+        return self._drain(final=False)
+
+    def finish(self) -> List[Tuple[str, int, int]]:
+        """Flush the remaining tail as the last chunk(s)"""
+        self._trim()
+        return self._drain(final=True)
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Offsets of the stripped text of a chunk from the last feed()/finish()"""
+        offset = self._buffer_offset
+        start, end = TextProcessor.strip_span(self._buffer, start - offset, end - offset)
+        return start + offset, end + offset
+
+    def _trim(self):
+        # Drop everything before the next chunk start, it can't be reused. Done
+        # lazily so the chunks of the last call can still be resolved by span()
+        keep_from = self._start - self._buffer_offset
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._buffer_offset = self._start
+
+    def _drain(self, final: bool) -> List[Tuple[str, int, int]]:
+        if self.chunk_chars is None:
+            # Nothing has been cut yet, so the buffer still starts at offset 0
+            if len(self._buffer) < TOKEN_CALIBRATION_CHARS and not final:
+                return []
+            self.chunk_chars, self.overlap_chars, self.token_limit = TextProcessor._token_sizing(
+                self.chunk_size, self.overlap, self._buffer
+            )
+        chunks, self._start, self._last_start = TextProcessor._chunk_range(
+            self._buffer,
+            self._start,
+            self.chunk_chars,
+            self.overlap_chars,
+            last_start=self._last_start,
+            final=final,
+            offset=self._buffer_offset,
+            token_limit=self.token_limit
+        )
+        return chunks
@@ -0,0 +1,161 @@
+"""
+Token counting
+
+The heuristic counter is the zero-dependency default. When a SentencePiece
+model file is configured (TOKENIZER_MODEL_PATH) and the sentencepiece
+package is installed, counts come from the real tokenizer instead, and the
+chunker sizes chunks by them.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+try:
+    import sentencepiece as spm
+    HAS_SENTENCEPIECE = True
+except ImportError:
+    HAS_SENTENCEPIECE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _LRU:
+    """Small thread-safe LRU of text -> token count"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: int):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class TokenCounter:
+    """
+    Base token counter with an LRU for repeated strings
+
+    Subclasses implement _count_batch; count and count_batch consult the
+    cache first and only tokenize the misses.
+    """
+
+    # Whether counts come from the embedding-side tokenizer rather than a guess
+    exact = False
+    # Longer texts are not cached: hashing them costs about as much as counting
+    CACHE_MAX_CHARS = 4096
+
+    def __init__(self, cache_size: int = 4096):
+        self._cache = _LRU(cache_size)
+
+    def _count_batch(self, texts: List[str]) -> List[int]:
+        raise NotImplementedError
+
+    def count(self, text: str, cache: bool = True) -> int:
+        """Token count of one text (cache=False for one-off strings such as chunks)"""
+        if not text:
+            return 0
+        if not cache or len(text) > self.CACHE_MAX_CHARS:
+            return self._count_batch([text])[0]
+        cached = self._cache.get(text)
+        if cached is None:
+            cached = self._count_batch([text])[0]
+            self._cache.put(text, cached)
+        return cached
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """Token counts of many texts, tokenizing all cache misses in one call"""
+        counts = [
+            self._cache.get(text) if text and len(text) <= self.CACHE_MAX_CHARS else None
+            for text in texts
+        ]
+        missing = [i for i, value in enumerate(counts) if value is None and texts[i]]
+        if missing:
+            fresh = self._count_batch([texts[i] for i in missing])
+            for i, value in zip(missing, fresh):
+                counts[i] = value
+                if len(texts[i]) <= self.CACHE_MAX_CHARS:
+                    self._cache.put(texts[i], value)
+        return [value or 0 for value in counts]
+
+    def chars_per_token(self, sample: str) -> float:
+        """Average chars per token, used to turn token sizes into char windows"""
+        tokens = self.count(sample, cache=False)
+        return len(sample) / tokens if tokens else 4.0
+
+
+class HeuristicTokenCounter(TokenCounter):
+    """Blend of chars/3.8 and words*1.3, no tokenizer needed"""
+
+    # Chunk sizing assumption of the original chunker, kept so output is unchanged
+    CHARS_PER_TOKEN = 4
+
+    def _count_batch(self, texts: List[str]) -> List[int]:
+        chars = np.fromiter((len(text) for text in texts), dtype=np.float64, count=len(texts))
+        words = np.fromiter((len(text.split()) for text in texts), dtype=np.float64, count=len(texts))
+        return ((chars / 3.8 + words * 1.3) / 2).astype(np.int64).tolist()
+
+    def chars_per_token(self, sample: str) -> float:
+        return self.CHARS_PER_TOKEN
+
+
+class SentencePieceTokenCounter(TokenCounter):
+    """Counts tokens with a local SentencePiece model file"""
+
+    exact = True
+
+    def __init__(self, model_path: str, cache_size: int = 4096):
+        super().__init__(cache_size)
+        self.model_path = model_path
+        self._processor = spm.SentencePieceProcessor(model_file=model_path)
+
+    def _count_batch(self, texts: List[str]) -> List[int]:
+        # Encoding a list runs in the C++ library, on several threads for big batches
+        return [len(ids) for ids in self._processor.encode(texts)]
+
+
+_counter: Optional[TokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide token counter picked from settings (heuristic if no model is usable)"""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = _build_counter()
+    return _counter
+
+
+def _build_counter() -> TokenCounter:
+    settings = get_settings()
+    cache_size = settings.TOKEN_COUNT_CACHE_SIZE
+    model_path = settings.TOKENIZER_MODEL_PATH
+    if model_path:
+        if not HAS_SENTENCEPIECE:
+            logger.warning("TOKENIZER_MODEL_PATH is set but sentencepiece is not installed, using heuristic token counts")
+        else:
+            try:
+                counter = SentencePieceTokenCounter(model_path, cache_size)
+                logger.info(f"🔤 Token counts from SentencePiece model {model_path}")
+                return counter
+            except Exception as e:
+                logger.warning(f"Failed to load tokenizer model {model_path}: {e}, using heuristic token counts")
+    return HeuristicTokenCounter(cache_size)
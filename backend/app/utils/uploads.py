@@ -0,0 +1,146 @@
+"""
+Staging of uploaded files on disk
+
+Uploads are copied to UPLOAD_DIR in fixed-size pieces, so a request never
+holds a whole file in memory. Zip archives are unpacked member by member
+under the same limits on file count and total bytes as plain files. Each
+staged file becomes an entry for IngestionService.create_documents_batch;
+files that cannot be ingested (unsupported type, unreadable archive member)
+become entries with an error instead of failing the whole batch.
+"""
+import asyncio
+import logging
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_TYPES = ("pdf", "txt", "md", "docx")
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+class UploadLimitError(ValueError):
+    """A batch upload exceeds its file count or byte limit"""
+
+
+def file_type_of(filename: str) -> str:
+    return PurePosixPath(filename or "").suffix.lower().lstrip(".")
+
+
+class UploadStager:
+    """Saves the files of one batch upload, enforcing the batch limits"""
+
+    def __init__(self, upload_dir: Path, max_files: int, max_bytes: int):
+        self.upload_dir = Path(upload_dir)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.entries = []
+        self.total_bytes = 0
+
+    async def add(self, file):
+        """Stage one UploadFile: a document, or a zip archive of documents"""
+        file_type = file_type_of(file.filename)
+        if file_type == "zip":
+            archive = self.upload_dir / f"{uuid.uuid4()}.zip"
+            try:
+                # Archive bytes count towards the limit as well as what they unpack to
+                await self._copy_upload(file, archive)
+                await asyncio.to_thread(self._extract_zip, archive, file.filename)
+            finally:
+                archive.unlink(missing_ok=True)
+            return
+        if file_type not in SUPPORTED_TYPES:
+            self._reject(file.filename, f"Unsupported file type: {file_type or 'none'}")
+            return
+        self._check_file_count()
+        path = self.upload_dir / f"{uuid.uuid4()}.{file_type}"
+        size = await self._copy_upload(file, path)
+        self._accept(file.filename, file_type, path, size)
+
+    def discard(self):
+        """Remove everything staged so far (the request is rejected)"""
+        for entry in self.entries:
+            if entry["file_path"]:
+                Path(entry["file_path"]).unlink(missing_ok=True)
+        self.entries = []
+
+    async def _copy_upload(self, file, path: Path) -> int:
+        size = 0
+        with open(path, "wb") as out:
+            while True:
+                data = await file.read(COPY_BUFFER_BYTES)
+                if not data:
+                    break
+                size += len(data)
+                self._add_bytes(len(data), path)
+                out.write(data)
+        return size
+
+    def _extract_zip(self, archive: Path, archive_name: str):
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    name = PurePosixPath(info.filename).name
+                    if info.is_dir() or not name or name.startswith(".") or "__MACOSX/" in info.filename:
+                        continue
+                    display_name = f"{archive_name}/{info.filename}"
+                    file_type = file_type_of(name)
+                    if file_type not in SUPPORTED_TYPES:
+                        self._reject(display_name, f"Unsupported file type: {file_type or 'none'}")
+                        continue
+                    self._check_file_count()
+                    path = self.upload_dir / f"{uuid.uuid4()}.{file_type}"
+                    try:
+                        size = self._copy_member(zf, info, path)
+                    except UploadLimitError:
+                        raise
+                    except Exception as e:
+                        path.unlink(missing_ok=True)
+                        self._reject(display_name, f"Failed to unpack: {e}")
+                        continue
+                    self._accept(name, file_type, path, size)
+        except zipfile.BadZipFile as e:
+            self._reject(archive_name, f"Invalid zip archive: {e}")
+
+    def _copy_member(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo, path: Path) -> int:
+        # Counted while unpacking: the sizes in the archive directory can lie
+        size = 0
+        with zf.open(info) as member, open(path, "wb") as out:
+            while True:
+                data = member.read(COPY_BUFFER_BYTES)
+                if not data:
+                    break
+                size += len(data)
+                self._add_bytes(len(data), path)
+                out.write(data)
+        return size
+
+    def _add_bytes(self, count: int, path: Path):
+        self.total_bytes += count
+        if self.total_bytes > self.max_bytes:
+            path.unlink(missing_ok=True)
+            raise UploadLimitError(f"Batch exceeds {self.max_bytes} bytes")
+
+    def _check_file_count(self):
+        if sum(entry["error"] is None for entry in self.entries) >= self.max_files:
+            raise UploadLimitError(f"Batch exceeds {self.max_files} files")
+
+    def _accept(self, filename: str, file_type: str, path: Path, size: int):
+        self.entries.append({
+            "filename": filename,
+            "file_type": file_type,
+            "file_path": str(path),
+            "file_size": size,
+            "error": None,
+        })
+
+    def _reject(self, filename: str, error: str):
+        logger.warning(f"Skipping {filename} in batch upload: {error}")
+        self.entries.append({
+            "filename": filename,
+            "file_type": None,
+            "file_path": None,
+            "file_size": 0,
+            "error": error,
+        })
@@ -0,0 +1,5 @@
+"""
+Local benchmarks for the RAG backend
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_pdf_extraction``.
+"""
@@ -0,0 +1,115 @@
+"""
+Benchmark: boundary-index chunker vs window-scan reference
+
+Checks that TextProcessor.smart_chunk_text returns exactly the chunks of the
+window-scan algorithm (TextProcessor._find_boundary on every window) and
+reports throughput of both in MB/s. Exits non-zero on any mismatch.
+
+Usage:
+    python -m benchmarks.bench_chunking --size-mb 1 5 --chunk-size 800 --overlap 200
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from app.utils.text_processor import TextProcessor
+from benchmarks.corpus import EN_WORDS, RU_WORDS, make_log_text, make_text
+
+
+def reference_chunks(text: str, chunk_size: int, overlap: int, clean: bool = True) -> list:
+    """Window-scan chunking: slice every window and apply the cut rules to it"""
+    if clean:
+        text = TextProcessor.clean_text(text)
+    chunk_chars, overlap_chars = TextProcessor._chunk_sizes(chunk_size, overlap)
+    chunks = []
+    text_len = len(text)
+    start = 0
+    while start < text_len:
+        end = start + chunk_chars
+        if end >= text_len:
+            chunk_text = text[start:text_len].strip()
+            if chunk_text:
+                chunks.append((chunk_text, start, text_len))
+            break
+        best_boundary = TextProcessor._find_boundary(text[start:end], chunk_chars)
+        if best_boundary > 0:
+            end = start + best_boundary
+        chunk_text = text[start:end].strip()
+        if chunk_text:
+            chunks.append((chunk_text, start, end))
+        start = end - overlap_chars
+        if start <= (chunks[-1][1] if chunks else 0):
+            start = end
+    return chunks
+
+
+def fuzz_parity(trials: int = 500) -> int:
+    """Random texts over a punctuation-heavy alphabet; returns mismatch count"""
+    rng = random.Random(5)
+    alphabet = ['.', '!', '?', ';', ' ', '\n', '\t', 'A', 'Б', 'x', 'ж', '  ', '\n\n']
+    mismatches = 0
+    for _ in range(trials):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3000)))
+        chunk_size = rng.choice([1, 50, 100, 150])
+        overlap = rng.choice([0, 10, 40])
+        if TextProcessor.smart_chunk_text(text, chunk_size, overlap) != reference_chunks(text, chunk_size, overlap):
+            mismatches += 1
+    return mismatches
+
+
+def throughput(func, text: str, *args) -> tuple:
+    started = time.perf_counter()
+    result = func(text, *args)
+    elapsed = time.perf_counter() - started
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    failed = False
+    mismatches = fuzz_parity()
+    print(json.dumps({"fuzz_mismatches": mismatches}))
+    failed |= mismatches > 0
+
+    corpora = (
+        ("en", lambda size: make_text(size, EN_WORDS)),
+        ("ru", lambda size: make_text(size, RU_WORDS)),
+        ("log", make_log_text),
+    )
+    for name, make in corpora:
+        for size_mb in args.size_mb:
+            text = make(int(size_mb * 1024 * 1024))
+            mb = len(text.encode("utf-8")) / 1e6
+            new, new_s = throughput(TextProcessor.smart_chunk_text, text, args.chunk_size, args.overlap)
+            ref, ref_s = throughput(reference_chunks, text, args.chunk_size, args.overlap)
+
+            # Cutting alone, cleaning is shared by both and dominates the totals
+            cleaned = TextProcessor.clean_text(text)
+            chunk_chars, overlap_chars = TextProcessor._chunk_sizes(args.chunk_size, args.overlap)
+            _, cut_new_s = throughput(TextProcessor._chunk_range, cleaned, 0, chunk_chars, overlap_chars)
+            _, cut_ref_s = throughput(reference_chunks, cleaned, args.chunk_size, args.overlap, False)
+            row = {
+                "corpus": name,
+                "size_mb": round(mb, 1),
+                "chunks": len(new),
+                "identical": new == ref,
+                "window_scan_mb_s": round(mb / ref_s, 2),
+                "boundary_index_mb_s": round(mb / new_s, 2),
+                "cut_only_window_scan_mb_s": round(mb / cut_ref_s, 1),
+                "cut_only_boundary_index_mb_s": round(mb / cut_new_s, 1),
+            }
+            failed |= not row["identical"]
+            print(json.dumps(row))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
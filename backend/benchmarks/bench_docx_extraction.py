@@ -0,0 +1,100 @@
+"""
+Benchmark: python-docx vs streaming DOCX extraction
+
+Generates a large synthetic DOCX (prose, merged-cell tables, headers and
+footers) and runs each extractor in a fresh process, reporting wall time,
+peak RSS and output size. Fails (exit status 1, with a diff) unless both
+extract exactly the same text.
+
+Usage:
+    python -m benchmarks.bench_docx_extraction --paragraphs 20000 --tables 20 --rows 300
+"""
+import argparse
+import difflib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import make_docx
+
+RUNNER = """
+import json, resource, sys, time
+from app.utils.file_parser import FileParser
+from app.utils.docx_reader import extract_docx_parts
+method, path, out_path = sys.argv[1], sys.argv[2], sys.argv[3]
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+if method == "python-docx":
+    text = FileParser._parse_docx_document(path)
+else:
+    text = "\\n\\n".join(extract_docx_parts(path))
+elapsed = time.perf_counter() - started
+with open(out_path, "w", encoding="utf-8") as f:
+    f.write(text)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "seconds": round(elapsed, 3),
+    "peak_rss_mb": round(peak / 1024, 1),
+    "rss_growth_mb": round((peak - base_rss) / 1024, 1),
+    "chars": len(text),
+}))
+"""
+
+
+# Lines of the text diff printed when the extractors disagree
+DIFF_LINES = 40
+
+
+def run(method: str, path: str, out_path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER, method, path, out_path],
+        capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parent.parent
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--docx", help="Use an existing DOCX instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.docx or make_docx(
+            Path(tmp) / "synthetic.docx",
+            paragraphs=args.paragraphs, tables=args.tables, table_rows=args.rows
+        )
+        print(f"DOCX: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        rows = {}
+        texts = {}
+        for method in ("python-docx", "streaming"):
+            out_path = Path(tmp) / f"{method}.txt"
+            rows[method] = {"method": method, **run(method, path, str(out_path))}
+            texts[method] = out_path.read_text(encoding="utf-8")
+            print(json.dumps(rows[method]))
+
+    legacy, streaming = rows["python-docx"], rows["streaming"]
+    print(
+        f"streaming: {legacy['seconds'] / streaming['seconds']:.1f}x faster, "
+        f"RSS growth {legacy['rss_growth_mb']} MB -> {streaming['rss_growth_mb']} MB"
+    )
+    if texts["python-docx"] != texts["streaming"]:
+        diff = difflib.unified_diff(
+            texts["python-docx"].splitlines(), texts["streaming"].splitlines(),
+            "python-docx", "streaming", lineterm=""
+        )
+        print("Extracted text differs:", file=sys.stderr)
+        for line in list(diff)[:DIFF_LINES]:
+            print(line, file=sys.stderr)
+        sys.exit(1)
+    print("Extracted text is identical")
+
+
+if __name__ == "__main__":
+    main()
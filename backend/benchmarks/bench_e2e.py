@@ -0,0 +1,316 @@
+"""
+Benchmark: end-to-end ingestion throughput and /ask latency
+
+Runs the API against a local Postgres+pgvector (DATABASE_URL, schema
+created with migrate.py) and the fake Gemini server from
+benchmarks/fake_gemini.py, so numbers depend on our code rather than on
+Google's latency and quotas. For each corpus size it uploads generated
+PDF/DOCX/TXT documents (docs/s, chunks/s per type), then measures
+/api/queries/ask p50/p95/p99 at each concurrency level. The whole run is
+written as one JSON document; --compare reports the change between two.
+
+Usage:
+    python -m benchmarks.bench_e2e --sizes 30 150 --concurrency 1 8 32 --out e2e.json
+    python -m benchmarks.bench_e2e --latency-ms 80 --error-rate 0.02 --types pdf txt
+    python -m benchmarks.bench_e2e --url http://127.0.0.1:8001 --sizes 30   # API already running
+    python -m benchmarks.bench_e2e --compare last_release.json e2e.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, urlparse
+
+from benchmarks.corpus import make_docx, make_pdf, make_text
+from benchmarks.fake_gemini import start_server
+from benchmarks.load_test import run_level
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+QUERIES = (
+    "What does the policy say about employee access control?",
+    "Summarize the quarter revenue report.",
+    "Which project risks need compliance review?",
+)
+
+
+def request(url: str, method: str, path: str, body: bytes = None, headers: dict = None,
+            timeout: float = 600) -> tuple:
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def upload(url: str, path: Path) -> dict:
+    """Upload one file through /api/documents/upload as multipart form data"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{path.name}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + path.read_bytes() + f"\r\n--{boundary}--\r\n".encode()
+    started = time.perf_counter()
+    status, data = request(url, "POST", "/api/documents/upload", body,
+                           {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    return {"status": status, "seconds": time.perf_counter() - started, "error": None if status == 200 else data[:200]}
+
+
+def generate(directory: Path, file_type: str, name: str, seed: int, scale: float) -> Path:
+    path = directory / f"{name}.{file_type}"
+    if file_type == "pdf":
+        return Path(make_pdf(path, pages=max(1, int(20 * scale)), table_every=5, seed=seed))
+    if file_type == "docx":
+        return Path(make_docx(path, paragraphs=max(1, int(200 * scale)), tables=2, table_rows=20, seed=seed))
+    path.write_text(make_text(int(60_000 * scale), seed=seed), encoding="utf-8")
+    return path
+
+
+def chunk_counts(url: str, prefix: str) -> dict:
+    """Chunks per file type of the benchmark's documents, read from the listing"""
+    counts = {}
+    cursor = None
+    while True:
+        path = f"/api/documents?limit=500&include_chunk_counts=true&filename_prefix={quote(prefix)}"
+        if cursor:
+            path += f"&cursor={quote(cursor)}"
+        status, data = request(url, "GET", path)
+        if status != 200:
+            raise RuntimeError(f"Listing documents failed: {status} {data[:200]!r}")
+        page = json.loads(data)
+        for item in page["items"]:
+            file_type = item["filename"].rsplit(".", 1)[-1]
+            counts[file_type] = counts.get(file_type, 0) + (item.get("chunk_count") or 0)
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return counts
+
+
+def ingest(url: str, files: list, workers: int) -> dict:
+    """Upload files (type, path) and report per-type seconds, documents and failures"""
+    stats = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda item: (item[0], upload(url, item[1])), files))
+    wall = time.perf_counter() - started
+    for file_type, result in results:
+        entry = stats.setdefault(file_type, {"documents": 0, "failed": 0, "upload_seconds": 0.0, "errors": []})
+        if result["status"] == 200:
+            entry["documents"] += 1
+            entry["upload_seconds"] += result["seconds"]
+        else:
+            entry["failed"] += 1
+            if len(entry["errors"]) < 3:
+                entry["errors"].append(f"{result['status']}: {result['error']!r}")
+    return {"wall_seconds": wall, "types": stats}
+
+
+def cleanup(url: str, prefix: str):
+    status, data = request(url, "POST", "/api/documents/bulk_delete",
+                           json.dumps({"filename_prefix": prefix}).encode(),
+                           {"Content-Type": "application/json"})
+    if status != 202:
+        print(f"Cleanup failed: {status} {data[:200]!r}", file=sys.stderr)
+        return
+    job_id = json.loads(data)["job_id"]
+    while True:
+        status, data = request(url, "GET", f"/api/jobs/{job_id}")
+        if status != 200 or json.loads(data)["status"] in ("done", "failed"):
+            return
+        time.sleep(0.5)
+
+
+def wait_ready(url: str, process, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if request(url, "GET", "/health", timeout=2)[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"API at {url} not ready after {timeout}s")
+
+
+def start_api(port: int, gemini_endpoint: str):
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_ENDPOINT": gemini_endpoint,
+        "GEMINI_TRANSPORT": "rest",
+        "GOOGLE_API_KEY": env.get("GOOGLE_API_KEY") or "fake",
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def run(args) -> dict:
+    server, fake = start_server(
+        args.fake_port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate
+    )
+    gemini_endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    process = None
+    url = args.url
+    if not url:
+        process = start_api(args.port, gemini_endpoint)
+        url = f"http://127.0.0.1:{args.port}"
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "api": url,
+            "fake_gemini": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                            "error_rate": args.error_rate},
+            "types": args.types,
+            "scale": args.scale,
+            "upload_workers": args.upload_workers,
+            "duration": args.duration,
+        },
+        "ingestion": [],
+        "queries": [],
+    }
+    try:
+        wait_ready(url, process)
+        uploaded = 0
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in sorted(args.sizes):
+                # Grow the corpus to `size` documents, types in rotation
+                files = []
+                for index in range(uploaded, size):
+                    file_type = args.types[index % len(args.types)]
+                    files.append((file_type, generate(Path(tmp), file_type, f"{prefix}{index:05d}", index, args.scale)))
+                uploaded = max(uploaded, size)
+
+                before = chunk_counts(url, prefix)
+                result = ingest(url, files, args.upload_workers)
+                after = chunk_counts(url, prefix)
+                for file_type, entry in sorted(result["types"].items()):
+                    chunks = after.get(file_type, 0) - before.get(file_type, 0)
+                    seconds = entry["upload_seconds"]
+                    row = {
+                        "corpus_size": size,
+                        "file_type": file_type,
+                        "documents": entry["documents"],
+                        "failed": entry["failed"],
+                        "chunks": chunks,
+                        "seconds": round(seconds, 3),
+                        "docs_per_s": round(entry["documents"] / seconds, 3) if seconds else None,
+                        "chunks_per_s": round(chunks / seconds, 1) if seconds else None,
+                        "errors": entry["errors"],
+                    }
+                    report["ingestion"].append(row)
+                    print(json.dumps(row), flush=True)
+
+                for concurrency in args.concurrency:
+                    query = QUERIES[len(report["queries"]) % len(QUERIES)]
+                    body = json.dumps({"query": query, "top_k": args.top_k}).encode()
+                    row = run_level(url, "POST", "/api/queries/ask", body, concurrency, args.duration)
+                    row = {"corpus_size": size, **row}
+                    report["queries"].append(row)
+                    print(json.dumps(row), flush=True)
+    finally:
+        try:
+            if not args.keep:
+                cleanup(url, prefix)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+            server.shutdown()
+
+    report["meta"]["gemini_calls"] = dict(fake.counts)
+    return report
+
+
+def compare(before_path: str, after_path: str, threshold: float):
+    """Print the relative change of throughput and tail latency, flagging regressions"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def ratio(old, new):
+        return round(new / old, 3) if old and new is not None else None
+
+    old_ingest = {(row["corpus_size"], row["file_type"]): row for row in before["ingestion"]}
+    for row in after["ingestion"]:
+        old = old_ingest.get((row["corpus_size"], row["file_type"]))
+        if old:
+            change = ratio(old["docs_per_s"], row["docs_per_s"])
+            print(json.dumps({
+                "corpus_size": row["corpus_size"], "file_type": row["file_type"],
+                "docs_per_s_before": old["docs_per_s"], "docs_per_s_after": row["docs_per_s"],
+                "change": change, "regression": change is not None and change < 1 - threshold,
+            }))
+
+    old_queries = {(row["corpus_size"], row["concurrency"]): row for row in before["queries"]}
+    for row in after["queries"]:
+        old = old_queries.get((row["corpus_size"], row["concurrency"]))
+        if old:
+            change = ratio(old["p95_ms"], row["p95_ms"])
+            print(json.dumps({
+                "corpus_size": row["corpus_size"], "concurrency": row["concurrency"],
+                "p95_ms_before": old["p95_ms"], "p95_ms_after": row["p95_ms"],
+                "p99_ms_before": old["p99_ms"], "p99_ms_after": row["p99_ms"],
+                "change": change, "regression": change is not None and change > 1 + threshold,
+            }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Use an API that is already running (pointed at the fake server)")
+    parser.add_argument("--port", type=int, default=8011, help="Port for the API started by the benchmark")
+    parser.add_argument("--fake-port", type=int, default=8090, help="Port of the fake Gemini server")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake Gemini latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of Gemini calls answered with 429")
+    parser.add_argument("--types", nargs="+", default=["pdf", "docx", "txt"], choices=["pdf", "docx", "txt"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 150], help="Corpus sizes in documents")
+    parser.add_argument("--scale", type=float, default=1.0, help="Document size multiplier")
+    parser.add_argument("--upload-workers", type=int, default=4, help="Concurrent uploads")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per query concurrency level")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark documents")
+    parser.add_argument("--out", help="Write the JSON report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two saved reports instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change flagged as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare, args.threshold)
+        return
+
+    report = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
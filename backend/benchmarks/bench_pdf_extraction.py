@@ -0,0 +1,62 @@
+"""
+Benchmark: sequential vs parallel PDF extraction
+
+Generates a synthetic multi-hundred-page PDF and times
+``FileParser.parse_pdf`` at several worker counts.
+
+Usage:
+    python -m benchmarks.bench_pdf_extraction --pages 400 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils.file_parser import FileParser
+from benchmarks.corpus import make_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--profile", default="full", help="Extraction profile")
+    parser.add_argument("--pdf", help="Use an existing PDF instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_pdf(Path(tmp) / "synthetic.pdf", pages=args.pages)
+        print(f"PDF: {pdf_path} ({os.path.getsize(pdf_path) / 1e6:.1f} MB)")
+
+        results = []
+        baseline_text = None
+        for workers in args.workers:
+            started = time.perf_counter()
+            pages = FileParser.extract_pdf_pages(pdf_path, workers=workers, profile=args.profile)
+            elapsed = time.perf_counter() - started
+
+            text = "\n\n".join(part for page in pages for part in page["parts"])
+            if baseline_text is None:
+                baseline_text = text
+            page_times = [page["seconds"] for page in pages]
+            results.append({
+                "workers": workers,
+                "pages": len(pages),
+                "wall_seconds": round(elapsed, 3),
+                "pages_per_second": round(len(pages) / elapsed, 1),
+                "page_p50_ms": round(statistics.median(page_times) * 1000, 1),
+                "page_max_ms": round(max(page_times) * 1000, 1),
+                "identical_output": text == baseline_text,
+            })
+            print(json.dumps(results[-1]))
+
+    base = results[0]["wall_seconds"]
+    for row in results[1:]:
+        print(f"workers={row['workers']}: {base / row['wall_seconds']:.2f}x vs workers={results[0]['workers']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: PDF extraction profiles (fast / balanced / full)
+
+Generates a synthetic PDF where every N-th page is a ruled table and
+compares wall time, extracted characters and table rows per profile.
+
+Usage:
+    python -m benchmarks.bench_pdf_profiles --pages 100 --table-every 10
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils.file_parser import EXTRACTION_PROFILES, FileParser
+from benchmarks.corpus import make_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--table-every", type=int, default=10)
+    parser.add_argument("--pdf", help="Use an existing PDF instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_pdf(
+            Path(tmp) / "synthetic.pdf", pages=args.pages, table_every=args.table_every
+        )
+
+        results = []
+        for profile in EXTRACTION_PROFILES:
+            started = time.perf_counter()
+            text = FileParser.parse_pdf(pdf_path, workers=1, profile=profile)
+            elapsed = time.perf_counter() - started
+            results.append({
+                "profile": profile,
+                "wall_seconds": round(elapsed, 3),
+                "ms_per_page": round(elapsed * 1000 / args.pages, 1),
+                "chars": len(text),
+                "table_rows": sum(1 for line in text.splitlines() if " | " in line),
+            })
+            print(json.dumps(results[-1]))
+
+    full = next(row for row in results if row["profile"] == "full")
+    for row in results:
+        if row is full:
+            continue
+        print(f"{row['profile']:>8}: {full['wall_seconds'] / row['wall_seconds']:.1f}x faster than full")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Benchmark: ANN recall@k versus latency per vector index configuration
+
+Samples query vectors from the stored chunk embeddings (optionally with
+noise), computes the exact top-k by brute force in NumPy, and compares it
+with RetrievalService.search_by_embedding, the query path of
+retrieve_chunks, for every ivfflat.probes / hnsw.ef_search value swept.
+Runs against the database in DATABASE_URL: its existing embeddings, a
+synthetic clustered corpus inserted for the run, or one imported from .npy.
+
+--index-types rebuilds the live index of that database for each type (and
+restores the configured type afterwards), so point it at a local copy.
+
+Usage:
+    python -m benchmarks.bench_recall --synthetic 100000 --index-types ivfflat hnsw
+    python -m benchmarks.bench_recall --probes 1 4 16 64 --queries 500 --k 10
+    python -m benchmarks.bench_recall --export-npy corpus.npy   # then --import-npy corpus.npy elsewhere
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import delete, insert, select, text
+
+from app import database
+from app.config import get_settings
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.services.retrieval import RetrievalService
+from app.services.vector_index import VectorIndexService
+from benchmarks.load_test import percentile
+
+INSERT_BATCH = 1000
+
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, spread: float, seed: int) -> np.ndarray:
+    """Unit vectors around random cluster centers, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = centers[rng.integers(0, clusters, rows)]
+    vectors += rng.standard_normal((rows, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def insert_corpus(db, vectors: np.ndarray) -> str:
+    """Store vectors as chunks of a throwaway document; returns its id"""
+    document = Document(filename=f"bench-recall-{uuid.uuid4().hex[:8]}.txt", title="Recall benchmark corpus")
+    db.add(document)
+    db.flush()
+    for start in range(0, len(vectors), INSERT_BATCH):
+        db.execute(insert(Chunk), [
+            {"document_id": document.id, "content": f"synthetic chunk {index}",
+             "chunk_index": index, "embedding": vectors[index]}
+            for index in range(start, min(start + INSERT_BATCH, len(vectors)))
+        ])
+        db.commit()
+        print(f"Inserted {min(start + INSERT_BATCH, len(vectors))}/{len(vectors)} vectors", file=sys.stderr)
+    # Fresh statistics so the planner picks the ANN index
+    db.execute(text("ANALYZE chunks"))
+    db.commit()
+    return document.id
+
+
+def load_embeddings(db) -> tuple:
+    """All stored embeddings as (ids, unit-normalized float32 matrix)"""
+    ids, vectors = [], []
+    for chunk_id, embedding in db.execute(
+        select(Chunk.id, Chunk.embedding).where(Chunk.embedding != None)
+    ).yield_per(10_000):
+        ids.append(chunk_id)
+        vectors.append(np.asarray(embedding, dtype=np.float32))
+    matrix = np.vstack(vectors)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return ids, matrix / np.where(norms == 0, 1, norms)
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int, block: int = 16) -> list:
+    """Row indices of the k nearest vectors (cosine) for every query"""
+    results = []
+    for start in range(0, len(queries), block):
+        similarities = queries[start:start + block] @ matrix.T
+        top = np.argpartition(-similarities, min(k, matrix.shape[0] - 1), axis=1)[:, :k]
+        for row, candidates in zip(similarities, top):
+            results.append(candidates[np.argsort(-row[candidates])])
+    return results
+
+
+def index_type(definition: str) -> str:
+    definition = (definition or "").lower()
+    for name in ("hnsw", "ivfflat"):
+        if f"using {name}" in definition:
+            return name
+    return "exact"
+
+
+def sweep(db, queries: np.ndarray, truth: list, ids: list, k: int, kind: str, values: list,
+          warmup: int) -> list:
+    """Recall@k and latency of search_by_embedding for each parameter value"""
+    rows = []
+    for value in values:
+        options = {"probes": value} if kind == "ivfflat" else {"ef_search": value} if kind == "hnsw" else {}
+        for query in queries[:warmup]:
+            RetrievalService.search_by_embedding(db, query.tolist(), k, **options)
+            db.rollback()
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            results = RetrievalService.search_by_embedding(db, query.tolist(), k, **options)
+            latencies.append(time.perf_counter() - started)
+            # End the transaction, and with it the SET LOCAL search parameters
+            db.rollback()
+            found = {chunk.id for chunk, _ in results}
+            recalls.append(len(found & {ids[index] for index in expected}) / len(expected))
+        row = {
+            "index": kind,
+            "param": {"ivfflat": "probes", "hnsw": "ef_search"}.get(kind),
+            "value": value,
+            "k": k,
+            "queries": len(queries),
+            "recall": round(statistics.fmean(recalls), 4),
+            "recall_min": round(min(recalls), 4),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+        rows.append(row)
+        print(json.dumps(row), flush=True)
+    return rows
+
+
+def print_table(rows: list):
+    print(f"\n{'index':<8} {'param':<10} {'value':>6} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}",
+          file=sys.stderr)
+    for row in rows:
+        print(
+            f"{row['index']:<8} {row['param'] or '-':<10} {str(row['value'] or '-'):>6} {row['recall']:>9.4f} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, metavar="ROWS", help="Insert a synthetic clustered corpus")
+    source.add_argument("--import-npy", metavar="PATH", help="Insert the embeddings of an exported corpus")
+    source.add_argument("--export-npy", metavar="PATH", help="Save the stored embeddings and exit")
+    parser.add_argument("--clusters", type=int, default=200, help="Clusters of the synthetic corpus")
+    parser.add_argument("--spread", type=float, default=0.6, help="Spread of synthetic vectors around centers")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--noise", type=float, default=0.1,
+                        help="Noise added to sampled embeddings, so queries are not stored vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-types", nargs="+", choices=["ivfflat", "hnsw"],
+                        help="Rebuild the index as each type before sweeping (default: current index)")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 5, 10, 20, 50])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 80, 160, 320])
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed queries per configuration")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the inserted corpus")
+    parser.add_argument("--out", help="Also write the JSON rows to this file")
+    args = parser.parse_args()
+
+    if database.SessionLocal is None:
+        parser.error("Database not initialized, check DATABASE_URL")
+    settings = get_settings()
+    db = database.SessionLocal()
+    document_id = None
+    rebuilt = False
+    rows = []
+    try:
+        if args.export_npy:
+            _, matrix = load_embeddings(db)
+            np.save(args.export_npy, matrix)
+            print(f"Saved {matrix.shape[0]} embeddings to {args.export_npy}", file=sys.stderr)
+            return
+        if args.synthetic:
+            vectors = synthetic_embeddings(
+                args.synthetic, settings.EMBEDDING_DIMENSION, args.clusters, args.spread, args.seed
+            )
+            document_id = insert_corpus(db, vectors)
+        elif args.import_npy:
+            document_id = insert_corpus(db, np.load(args.import_npy).astype(np.float32))
+
+        ids, matrix = load_embeddings(db)
+        rng = np.random.default_rng(args.seed)
+        queries = matrix[rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)]
+        queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * (
+            args.noise / np.sqrt(queries.shape[1])
+        )
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        started = time.perf_counter()
+        truth = exact_top_k(matrix, queries, args.k)
+        print(
+            f"Exact top-{args.k} for {len(queries)} queries over {len(ids)} vectors "
+            f"in {time.perf_counter() - started:.2f}s",
+            file=sys.stderr
+        )
+        del matrix
+
+        for kind in args.index_types or [None]:
+            if kind:
+                VectorIndexService.rebuild(kind, concurrently=False)
+                rebuilt = True
+            else:
+                kind = index_type(VectorIndexService.status()["definition"])
+            values = {"ivfflat": args.probes, "hnsw": args.ef_search}.get(kind, [None])
+            rows.extend(sweep(db, queries, truth, ids, args.k, kind, values, args.warmup))
+    finally:
+        db.rollback()
+        if document_id and not args.keep:
+            db.execute(delete(Document).where(Document.id == document_id))
+            db.commit()
+        if rebuilt:
+            VectorIndexService.rebuild(concurrently=False)
+        db.close()
+
+    if rows:
+        print_table(rows)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: serialization of large document listings
+
+Builds a listing page of N documents (default 10k) and times the response
+path in-process through the ASGI apps, without network or database:
+
+  default   - endpoint returns DocumentPage with response_model set, so
+              FastAPI validates it again and renders it with JSONResponse
+  fast      - the rows rendered by FastJSONResponse as they are, the
+              path of GET /api/documents
+  fast+gzip / fast+br - the same behind CompressionMiddleware
+
+Prints one JSON line per variant (median/best ms, body bytes).
+
+Usage:
+    python -m benchmarks.bench_serialization --documents 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+
+from app.schemas.document import DocumentPage
+from app.utils.compression import HAS_BROTLI, CompressionMiddleware
+from app.utils.responses import HAS_ORJSON, FastJSONResponse
+
+
+def make_rows(count: int) -> list:
+    started = datetime(2025, 1, 1)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "filename": f"quarterly-report-{index:05d}.pdf",
+            "title": f"Quarterly report {index}",
+            "content_type": "application/pdf",
+            "file_size": 100_000 + index,
+            "uploaded_at": started + timedelta(minutes=index),
+            "chunk_count": index % 300,
+        }
+        for index in range(count)
+    ]
+
+
+def default_app(rows: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/documents", response_model=DocumentPage)
+    async def list_documents():
+        return DocumentPage(items=rows, next_cursor=None)
+
+    return app
+
+
+def fast_app(rows: list, compress: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    if compress:
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/documents", response_model=DocumentPage)
+    async def list_documents():
+        for row in rows:
+            row.setdefault("chunk_count", None)
+        return FastJSONResponse({"items": rows, "next_cursor": None})
+
+    return app
+
+
+async def call(app, accept_encoding: str) -> tuple:
+    """One GET /documents through the ASGI app; returns (seconds, body bytes, content-encoding)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/documents", "raw_path": b"/documents", "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 8001),
+        "headers": [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else [],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    seconds = time.perf_counter() - started
+    headers = dict(messages[0]["headers"])
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return seconds, len(body), headers.get(b"content-encoding", b"").decode()
+
+
+async def measure(name: str, app, accept_encoding: str, repeat: int) -> dict:
+    await call(app, accept_encoding)  # warm-up: routing, schema caches
+    timings = []
+    for _ in range(repeat):
+        seconds, size, encoding = await call(app, accept_encoding)
+        timings.append(seconds)
+    return {
+        "variant": name,
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "best_ms": round(min(timings) * 1000, 1),
+        "body_bytes": size,
+        "content_encoding": encoding or None,
+    }
+
+
+async def run(args):
+    rows = make_rows(args.documents)
+    variants = [
+        ("default", default_app(rows), ""),
+        ("fast", fast_app(rows, compress=False), ""),
+        ("fast+gzip", fast_app(rows, compress=True), "gzip"),
+    ]
+    if HAS_BROTLI:
+        variants.append(("fast+br", fast_app(rows, compress=True), "br"))
+    results = []
+    for name, app, accept_encoding in variants:
+        result = {"documents": args.documents, "orjson": HAS_ORJSON,
+                  **await measure(name, app, accept_encoding, args.repeat)}
+        results.append(result)
+        print(json.dumps(result), flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", help="Also write the JSON lines to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in results)
+
+
+if __name__ == "__main__":
+    main()
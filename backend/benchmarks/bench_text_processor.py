@@ -0,0 +1,127 @@
+"""
+Micro-benchmarks: TextProcessor normalization on English and Russian corpora
+
+Times clean_text, clean_text_stream (fed 4 KB pieces), split_into_sentences
+and count_tokens against the previous multi-pass implementations kept below
+as references, on 1 / 10 / 100 MB corpora by default. Output must match the
+references exactly; the script exits non-zero on any mismatch.
+
+Usage:
+    python -m benchmarks.bench_text_processor --size-mb 1 10 100 --lang en ru
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+from app.utils.text_processor import TextProcessor
+from benchmarks.corpus import EN_WORDS, RU_WORDS, make_text
+
+PIECE_CHARS = 4096
+
+# Abbreviations spliced into the corpora so sentence splitting has work to do
+ABBREVIATIONS = {
+    "en": ((" report ", " report by Dr. Smith "), (" policy ", " policy of Mrs. Brown ")),
+    "ru": ((" проект ", " проект и т.д. "), (" риск ", " риск, т.е. "), (" данные ", " данные и т.п. ")),
+}
+
+
+def reference_clean_text(text: str) -> str:
+    if not text:
+        return ""
+    text = re.sub(r' {2,}', ' ', text)
+    lines = [line.strip() for line in text.split('\n')]
+    text = '\n'.join(lines)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def reference_split_into_sentences(text: str) -> list:
+    if not text:
+        return []
+    text = re.sub(r'\bи\s+т\.д\.', 'и_т_д', text)
+    text = re.sub(r'\bт\.е\.', 'т_е', text)
+    text = re.sub(r'\bи\s+т\.п\.', 'и_т_п', text)
+    text = re.sub(r'\b(Mr|Mrs|Dr|Ms|Sr|Jr)\.', r'\1<DOT>', text)
+    sentences = re.split(r'(?<=[.!?])\s+(?=[А-ЯA-Z])', text)
+    return [
+        s.replace('и_т_д', 'и т.д.')
+         .replace('т_е', 'т.е.')
+         .replace('и_т_п', 'и т.п.')
+         .replace('<DOT>', '.')
+         .strip()
+        for s in sentences if s.strip()
+    ]
+
+
+def reference_count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return int((len(text) / 3.8 + len(text.split()) * 1.3) / 2)
+
+
+def make_corpus(lang: str, size_mb: float) -> str:
+    words = EN_WORDS if lang == "en" else RU_WORDS
+    # Cyrillic letters are two bytes in UTF-8
+    chars = int(size_mb * 1024 * 1024 / (1 if lang == "en" else 1.8))
+    text = make_text(chars, words)
+    for old, new in ABBREVIATIONS[lang]:
+        text = text.replace(old, new)
+    return text
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def stream_clean(text: str) -> str:
+    pieces = (text[i:i + PIECE_CHARS] for i in range(0, len(text), PIECE_CHARS))
+    return "".join(TextProcessor.clean_text_stream(pieces))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--lang", nargs="+", default=["en", "ru"], choices=["en", "ru"])
+    args = parser.parse_args()
+
+    failed = False
+    for lang in args.lang:
+        for size_mb in args.size_mb:
+            text = make_corpus(lang, size_mb)
+            mb = len(text.encode("utf-8")) / 1e6
+            cleaned = reference_clean_text(text)
+
+            cases = (
+                ("clean_text", TextProcessor.clean_text, reference_clean_text, text),
+                ("clean_text_stream", stream_clean, reference_clean_text, text),
+                ("split_into_sentences", TextProcessor.split_into_sentences,
+                 reference_split_into_sentences, cleaned),
+                ("count_tokens", TextProcessor.count_tokens, reference_count_tokens, cleaned),
+            )
+            for name, func, reference, data in cases:
+                result, seconds = timed(func, data)
+                expected, reference_seconds = timed(reference, data)
+                row = {
+                    "lang": lang,
+                    "size_mb": round(mb, 1),
+                    "function": name,
+                    "identical": result == expected,
+                    "reference_mb_s": round(mb / reference_seconds, 1),
+                    "mb_s": round(mb / seconds, 1),
+                    "speedup": round(reference_seconds / seconds, 2),
+                }
+                failed |= not row["identical"]
+                print(json.dumps(row))
+            del text, cleaned
+
+    if failed:
+        print("output differs from the reference implementation", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: TXT/MD reading on 100 MB+ inputs
+
+Compares the previous try-each-encoding loop (reopen and fully decode per
+candidate) with FileParser.read_text (read once, detect, decode once) for
+UTF-8 and cp1251 files, reporting wall time and peak RSS of a fresh process.
+
+Usage:
+    python -m benchmarks.bench_text_reading --size-mb 120
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import EN_WORDS, RU_WORDS, make_sentence
+
+LEGACY_ENCODINGS = ['utf-8', 'utf-8-sig', 'cp1251', 'windows-1251', 'latin-1', 'cp1252']
+
+RUNNER = """
+import json, resource, sys, time
+from app.utils.file_parser import FileParser  # imported by both so RSS is comparable
+method, path = sys.argv[1], sys.argv[2]
+started = time.perf_counter()
+if method == "legacy":
+    for encoding in %r:
+        try:
+            with open(path, "r", encoding=encoding) as f:
+                text = f.read()
+            break
+        except (UnicodeDecodeError, LookupError):
+            continue
+else:
+    text = FileParser.read_text(path)
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": round(elapsed, 3),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "chars": len(text),
+}))
+""" % LEGACY_ENCODINGS
+
+
+def write_corpus(path: Path, size_mb: int, words: list, encoding: str):
+    rng = random.Random(7)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding=encoding, newline="\n") as f:
+        while written < target:
+            paragraph = " ".join(make_sentence(rng, words) for _ in range(8)) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph.encode(encoding))
+
+
+def run(method: str, path: Path) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER, method, str(path)],
+        capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parent.parent
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=120)
+    args = parser.parse_args()
+
+    corpora = [
+        ("utf-8 english", EN_WORDS, "utf-8"),
+        ("utf-8 russian", RU_WORDS, "utf-8"),
+        ("cp1251 russian", RU_WORDS, "cp1251"),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, words, encoding in corpora:
+            path = Path(tmp) / f"{encoding}.txt"
+            write_corpus(path, args.size_mb, words, encoding)
+            size_mb = os.path.getsize(path) / 1e6
+            for method in ("legacy", "single_pass"):
+                row = {"corpus": name, "size_mb": round(size_mb, 1), "method": method, **run(method, path)}
+                row["mb_per_second"] = round(size_mb / row["seconds"], 1)
+                print(json.dumps(row))
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
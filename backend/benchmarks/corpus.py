@@ -0,0 +1,209 @@
+"""
+Synthetic corpus generators for benchmarks
+
+Everything is generated locally and deterministically (seeded), so numbers
+are comparable between runs and machines without shipping fixture files.
+"""
+import random
+
+EN_WORDS = (
+    "the system retrieval document vector index query answer model source "
+    "report policy employee contract section table value revenue quarter "
+    "support customer service process data storage network access control "
+    "review approval budget project schedule risk compliance audit"
+).split()
+
+RU_WORDS = (
+    "система документ поиск запрос ответ модель источник отчёт договор "
+    "сотрудник раздел таблица значение выручка квартал поддержка клиент "
+    "процесс данные хранение доступ контроль проверка бюджет проект риск"
+).split()
+
+
+def make_sentence(rng: random.Random, words: tuple = None) -> str:
+    """Build one capitalized sentence from the word list"""
+    words = words or EN_WORDS
+    sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 18)))
+    return sentence[0].upper() + sentence[1:] + rng.choice(".!?")
+
+
+def make_text(size_chars: int, words: tuple = None, seed: int = 42) -> str:
+    """
+    Build prose of about size_chars characters
+
+    Paragraphs are separated by blank lines and sprinkled with the things the
+    text cleaner deals with: double spaces, trailing spaces, extra blank lines.
+    """
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size_chars:
+        sentences = [make_sentence(rng, words) for _ in range(rng.randint(2, 8))]
+        paragraph = rng.choice([" ", "  ", "\n"]).join(sentences)
+        paragraph += rng.choice(["\n\n", "  \n\n", "\n\n\n\n", "\n \n"])
+        parts.append(paragraph)
+        length += len(paragraph)
+    return "".join(parts)
+
+
+def make_log_text(size_chars: int, seed: int = 42) -> str:
+    """Log/table export: single newlines, no sentence ends, the chunker's worst case"""
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size_chars:
+        line = (
+            f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+            f"{rng.choice(EN_WORDS)} {rng.choice(EN_WORDS)} id={rng.randint(0, 10 ** 6)} "
+            + " ".join(rng.choice(EN_WORDS) for _ in range(rng.randint(3, 12)))
+        )
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _prose_page_stream(rng: random.Random, page_num: int, lines: int) -> str:
+    ops = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td", f"(Page {page_num + 1}) Tj", "T*"]
+    for _ in range(lines):
+        ops.append(f"({_pdf_escape(make_sentence(rng)[:95])}) Tj")
+        ops.append("T*")
+    ops.append("ET")
+    return "\n".join(ops)
+
+
+def _table_page_stream(rng: random.Random, page_num: int, rows: int, cols: int) -> str:
+    """Ruled grid with a value in every cell, so table extraction finds it"""
+    left, top, cell_w, cell_h = 50, 780, 100, 18
+    ops = ["BT", "/F1 10 Tf", "50 800 Td", f"(Table page {page_num + 1}) Tj", "ET", "0.5 w"]
+    for r in range(rows + 1):
+        y = top - r * cell_h
+        ops.append(f"{left} {y} m {left + cols * cell_w} {y} l S")
+    for c in range(cols + 1):
+        x = left + c * cell_w
+        ops.append(f"{x} {top} m {x} {top - rows * cell_h} l S")
+    for r in range(rows):
+        for c in range(cols):
+            value = f"{rng.choice(EN_WORDS)} {rng.randint(0, 9999)}"
+            x = left + c * cell_w + 4
+            y = top - (r + 1) * cell_h + 5
+            ops.append(f"BT /F1 9 Tf {x} {y} Td ({_pdf_escape(value)}) Tj ET")
+    return "\n".join(ops)
+
+
+def make_pdf(
+    path,
+    pages: int = 300,
+    lines_per_page: int = 55,
+    table_every: int = 10,
+    seed: int = 42
+) -> str:
+    """
+    Write a synthetic text-layer PDF
+
+    Args:
+        path: Output file path
+        pages: Number of pages
+        lines_per_page: Prose lines per page
+        table_every: Every N-th page is a ruled table instead of prose (0 disables)
+        seed: Random seed
+
+    Returns:
+        Path of the written file
+    """
+    rng = random.Random(seed)
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    next_id = 4
+    for page_num in range(pages):
+        if table_every and page_num % table_every == table_every - 1:
+            stream = _table_page_stream(rng, page_num, rows=30, cols=5)
+        else:
+            stream = _prose_page_stream(rng, page_num, lines_per_page)
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        data = stream.encode("latin-1")
+        objects[content_id] = (
+            f"<< /Length {len(data)} >>\nstream\n".encode("latin-1") + data + b"\nendstream"
+        )
+        objects[page_id] = (
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{page_id} 0 R")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        body = objects[obj_id]
+        if isinstance(body, str):
+            body = body.encode("latin-1")
+        out += f"{obj_id} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for obj_id in sorted(objects):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode("latin-1")
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return str(path)
+
+
+def make_docx(
+    path,
+    paragraphs: int = 2000,
+    tables: int = 10,
+    table_rows: int = 100,
+    table_cols: int = 5,
+    sections: int = 2,
+    seed: int = 42
+) -> str:
+    """
+    Write a synthetic DOCX with headers/footers, prose and tables
+
+    Each table has a horizontally merged title row and a vertically merged
+    first column block, the cases python-docx reports as repeated cells.
+
+    Returns:
+        Path of the written file
+    """
+    from docx import Document as DocxDocument
+    from docx.enum.section import WD_SECTION
+
+    rng = random.Random(seed)
+    doc = DocxDocument()
+    per_section = max(1, paragraphs // sections)
+    tables_left = tables
+    for section_num in range(sections):
+        section = doc.sections[0] if section_num == 0 else doc.add_section(WD_SECTION.NEW_PAGE)
+        if section_num == 0 or section_num % 2 == 1:
+            section.header.is_linked_to_previous = False
+            section.header.paragraphs[0].text = f"Header of section {section_num + 1}"
+            section.footer.is_linked_to_previous = False
+            section.footer.paragraphs[0].text = f"Footer {section_num + 1} - confidential"
+        for i in range(per_section):
+            doc.add_paragraph(" ".join(make_sentence(rng) for _ in range(rng.randint(1, 4))))
+            if tables_left and i % max(1, per_section // max(1, tables // sections)) == 0:
+                tables_left -= 1
+                table = doc.add_table(rows=table_rows, cols=table_cols)
+                title = table.cell(0, 0).merge(table.cell(0, table_cols - 1))
+                title.text = f"Table {tables - tables_left}"
+                block = table.cell(1, 0).merge(table.cell(min(3, table_rows - 1), 0))
+                block.text = "Merged block"
+                for r in range(1, table_rows):
+                    for c in range(1, table_cols):
+                        table.cell(r, c).text = f"{rng.choice(EN_WORDS)} {rng.randint(0, 9999)}"
+    doc.save(str(path))
+    return str(path)
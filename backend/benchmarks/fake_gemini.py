@@ -0,0 +1,185 @@
+"""
+Local stand-in for the Gemini API used by the end-to-end benchmarks
+
+Serves the REST endpoints the app calls (embedContent, batchEmbedContents,
+generateContent) with deterministic bag-of-words embeddings, so texts that
+share words land near each other and retrieval behaves like it would on
+real vectors. Latency, jitter and the share of 429 RESOURCE_EXHAUSTED
+responses are configurable. Point the app at it with:
+
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8090 GEMINI_TRANSPORT=rest GOOGLE_API_KEY=fake
+
+Usage:
+    python -m benchmarks.fake_gemini --port 8090 --latency-ms 80 --jitter-ms 20 --error-rate 0.01
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+WORD_RE = re.compile(r"\w+")
+
+QUOTA_ERROR = {
+    "error": {
+        "code": 429,
+        "message": "Resource has been exhausted (e.g. check quota).",
+        "status": "RESOURCE_EXHAUSTED",
+    }
+}
+
+ANSWER = (
+    "Based on the provided documents, the answer is summarized from the most "
+    "relevant sources [Source 1]."
+)
+
+
+class FakeGemini:
+    """Embedding and generation behaviour plus request counters"""
+
+    def __init__(self, dim: int = 768, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 42):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.counts = {"embed": 0, "batch_embed": 0, "generate": 0, "quota_errors": 0}
+        self._word_vectors = {}
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> list:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in WORD_RE.findall(text.lower()):
+            vector += self._word_vector(word)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = zlib.crc32(word.encode("utf-8"))
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._word_vectors[word] = vector
+        return vector
+
+    def delay_and_maybe_fail(self, operation: str) -> bool:
+        """Sleep the configured latency; True if this call should get a 429"""
+        with self._lock:
+            self.counts[operation] += 1
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms))
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.counts["quota_errors"] += 1
+        if delay:
+            time.sleep(delay / 1000)
+        return fail
+
+
+def _content_text(content: dict) -> str:
+    return " ".join(part.get("text", "") for part in (content or {}).get("parts", []))
+
+
+def _handler(fake: FakeGemini):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0]
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+            if path.endswith(":batchEmbedContents"):
+                if fake.delay_and_maybe_fail("batch_embed"):
+                    return self._send(429, QUOTA_ERROR)
+                embeddings = [{"values": fake.embed(_content_text(item.get("content")))}
+                              for item in body.get("requests", [])]
+                return self._send(200, {"embeddings": embeddings})
+
+            if path.endswith(":embedContent"):
+                if fake.delay_and_maybe_fail("embed"):
+                    return self._send(429, QUOTA_ERROR)
+                return self._send(200, {"embedding": {"values": fake.embed(_content_text(body.get("content")))}})
+
+            if path.endswith(":generateContent"):
+                if fake.delay_and_maybe_fail("generate"):
+                    return self._send(429, QUOTA_ERROR)
+                return self._send(200, {
+                    "candidates": [{
+                        "content": {"parts": [{"text": ANSWER}], "role": "model"},
+                        "finishReason": "STOP",
+                    }],
+                })
+
+            self._send(404, {"error": {"code": 404, "message": f"Unknown method {path}", "status": "NOT_FOUND"}})
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] == "/stats":
+                with fake._lock:
+                    return self._send(200, dict(fake.counts))
+            self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port: int = 8090, host: str = "127.0.0.1", **options):
+    """
+    Start the fake API on a background thread
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        host: Interface to bind
+        **options: FakeGemini options (dim, latency_ms, jitter_ms, error_rate, seed)
+
+    Returns:
+        (server, fake); server.server_address holds the bound port, stop with server.shutdown()
+    """
+    fake = FakeGemini(**options)
+    server = ThreadingHTTPServer((host, port), _handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server, fake
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server, _ = start_server(
+        args.port, args.host, dim=args.dim, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed
+    )
+    print(f"Fake Gemini listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
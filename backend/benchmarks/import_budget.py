@@ -0,0 +1,111 @@
+"""
+Import-time budget check for the API's cold start
+
+Imports the app in fresh interpreters under ``python -X importtime``,
+reports the cumulative import time (median and best of the runs) with the
+slowest modules, and exits with status 1 when the median exceeds the budget
+or a module that must stay lazy (Gemini client, PDF/DOCX parsers) is
+imported at start-up. tests/test_import_budget.py runs the same check in
+the test suite.
+
+Usage:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 800 --runs 7 --out import_time.json
+    python -m benchmarks.import_budget --module app.main --forbid google.generativeai pdfplumber
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use; importing any of them with the app is a regression
+LAZY_MODULES = ("google.generativeai", "PyPDF2", "pdfplumber", "pdfminer", "docx", "pypdfium2")
+# Median cumulative import time of the app allowed, ms (IMPORT_BUDGET_MS overrides)
+DEFAULT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 1000))
+
+
+def import_profile(module: str) -> dict:
+    """{module: (self_us, cumulative_us)} of one cold import"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=dict(os.environ), capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def measure(module: str = "app.main", runs: int = 5, budget_ms: float = DEFAULT_BUDGET_MS,
+            forbid=LAZY_MODULES, top: int = 15) -> dict:
+    """Report of runs cold imports of module against the budget and the lazy modules"""
+    totals = []
+    profiles = []
+    for _ in range(runs):
+        profile = import_profile(module)
+        totals.append(profile[module][1] / 1000)
+        profiles.append(profile)
+
+    # Slowest modules by self time, median over runs
+    names = set.intersection(*(set(profile) for profile in profiles))
+    slowest = sorted(
+        ((name, statistics.median(profile[name][0] for profile in profiles) / 1000) for name in names),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    imported = sorted({
+        name for profile in profiles for name in profile
+        if any(name == forbidden or name.startswith(forbidden + ".") for forbidden in forbid)
+    })
+
+    median_ms = statistics.median(totals)
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(median_ms, 1),
+        "best_ms": round(min(totals), 1),
+        "budget_ms": budget_ms,
+        "modules": len(names),
+        "slowest_self_ms": [{"module": name, "ms": round(ms, 1)} for name, ms in slowest],
+        "forbidden_imported": imported,
+        "ok": median_ms <= budget_ms and not imported,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum median cumulative import time")
+    parser.add_argument("--forbid", nargs="*", default=list(LAZY_MODULES),
+                        help="Top-level packages that must not be imported")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = measure(args.module, args.runs, args.budget_ms, args.forbid, args.top)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if not report["ok"]:
+        imported = report["forbidden_imported"]
+        if imported:
+            print(f"Imported at start-up but must stay lazy: {', '.join(imported[:10])}", file=sys.stderr)
+        if report["median_ms"] > args.budget_ms:
+            print(f"Cold import {report['median_ms']:.0f} ms exceeds the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Load test: sustained requests per second against a running API
+
+Keeps N requests in flight for a fixed time at each concurrency level and
+prints one JSON line per level (RPS, latency percentiles, errors). Run it
+once against a server on the commit before the async endpoints and once on
+a current one, saving each with --out, then diff them with --compare.
+
+Usage:
+    python -m benchmarks.load_test --url http://127.0.0.1:8001 --concurrency 8 64 256 --out after.json
+    python -m benchmarks.load_test --path /api/documents --method GET --concurrency 64
+    python -m benchmarks.load_test --compare before.json after.json
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_level(url: str, method: str, path: str, body: bytes, concurrency: int, duration: float) -> dict:
+    target = urlparse(url)
+    headers = {"Content-Type": "application/json"} if body else {}
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        # One keep-alive connection per in-flight request slot
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=120)
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+                else:
+                    mine.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=120)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = {row["concurrency"]: row for row in map(json.loads, f)}
+    with open(after_path) as f:
+        after = {row["concurrency"]: row for row in map(json.loads, f)}
+    for concurrency in sorted(before.keys() & after.keys()):
+        old, new = before[concurrency], after[concurrency]
+        print(json.dumps({
+            "concurrency": concurrency,
+            "rps_before": old["rps"],
+            "rps_after": new["rps"],
+            "rps_gain": round(new["rps"] / old["rps"], 2) if old["rps"] else None,
+            "p95_ms_before": old["p95_ms"],
+            "p95_ms_after": new["p95_ms"],
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8001")
+    parser.add_argument("--path", default="/api/queries/ask")
+    parser.add_argument("--method", default="POST")
+    parser.add_argument("--query", default="What is the vacation policy?", help="Question for /ask")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64, 256])
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level")
+    parser.add_argument("--out", help="Also write the JSON lines to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two saved runs instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    body = json.dumps({"query": args.query}).encode() if args.method.upper() == "POST" else None
+    rows = []
+    for concurrency in args.concurrency:
+        row = run_level(args.url, args.method.upper(), args.path, body, concurrency, args.duration)
+        rows.append(row)
+        print(json.dumps(row), flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -48,7 +48,8 @@ CREATE TABLE IF NOT EXISTS chunks (
 
 -- Create indexes
 CREATE INDEX IF NOT EXISTS chunks_document_id_idx ON chunks(document_id);
-CREATE INDEX IF NOT EXISTS chunks_embedding_idx ON chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- The embedding index is built by reindex.py (or automatically after large
+-- ingests) once there is data to train IVFFlat centroids on
 """
 
 # Migration to rename metadata columns if they exist
@@ -71,26 +72,67 @@ UPDATE_EMBEDDING_DIMENSION = """
 -- Update embedding vector dimension
 DO $$
 BEGIN
-    -- Drop the old index if it exists
-    IF EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'chunks_embedding_idx') THEN
-        DROP INDEX chunks_embedding_idx;
-    END IF;
-
-    -- Recreate the chunks table with new vector dimension
-    -- We need to drop and recreate because pgvector doesn't support ALTER COLUMN type for vectors
-    IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='chunks' AND column_name='embedding') THEN
+    -- Only when the dimension differs: a tuned embedding index is kept otherwise
+    -- (for vector columns atttypmod is the dimension)
+    IF EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = 'chunks'::regclass AND attname = 'embedding' AND atttypmod <> 768
+    ) THEN
+        DROP INDEX IF EXISTS chunks_embedding_idx;
         -- Check current type and alter if needed
         ALTER TABLE chunks ALTER COLUMN embedding TYPE vector(768) USING embedding::text::vector;
+        -- The index is rebuilt by reindex.py for the new dimension
     END IF;
-
-    -- Recreate the index with the new dimension
-    CREATE INDEX IF NOT EXISTS chunks_embedding_idx ON chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 EXCEPTION WHEN OTHERS THEN
     -- If the above fails, it might be because the column is already the right type
     NULL;
 END $$;
 """
 
+# Span-referenced chunk storage (CHUNK_STORAGE_MODE=span)
+SPAN_CHUNK_STORAGE = """
+-- One stored copy of each document's cleaned text
+CREATE TABLE IF NOT EXISTS document_texts (
+    document_id UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Out-of-line but uncompressed, so substr() fetches TOAST slices instead of
+-- decompressing the whole document for every chunk read
+ALTER TABLE document_texts ALTER COLUMN content SET STORAGE EXTERNAL;
+
+-- Span chunks keep offsets into document_texts.content instead of text
+ALTER TABLE chunks ALTER COLUMN content DROP NOT NULL;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS start_char INTEGER;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS end_char INTEGER;
+"""
+
+# Near-duplicate chunk index (MinHash/LSH)
+NEAR_DUPLICATE_INDEX = """
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES chunks(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS ix_chunks_duplicate_of ON chunks(duplicate_of);
+
+CREATE TABLE IF NOT EXISTS chunk_signatures (
+    chunk_id UUID PRIMARY KEY REFERENCES chunks(id) ON DELETE CASCADE,
+    signature BYTEA NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chunk_lsh_bands (
+    band SMALLINT NOT NULL,
+    bucket BIGINT NOT NULL,
+    chunk_id UUID NOT NULL REFERENCES chunks(id) ON DELETE CASCADE,
+    PRIMARY KEY (band, bucket, chunk_id)
+);
+CREATE INDEX IF NOT EXISTS ix_chunk_lsh_bands_chunk_id ON chunk_lsh_bands(chunk_id);
+"""
+
+# Document listing: keyset pagination and filename prefix filters
+DOCUMENT_LISTING_INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_documents_uploaded_at_id ON documents (uploaded_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_documents_filename_pattern ON documents (filename varchar_pattern_ops);
+"""
+
 # Create migration tracking table
 # CREATE_ALEMBIC_TABLE = """
 # CREATE TABLE IF NOT EXISTS alembic_version (
@@ -129,6 +171,18 @@ def run_migration():
         cursor.execute(UPDATE_EMBEDDING_DIMENSION)
         print("✅ Updated embedding vector dimension to 768")
 
+        # Span chunk storage
+        cursor.execute(SPAN_CHUNK_STORAGE)
+        print("✅ Added span chunk storage")
+
+        # Near-duplicate index
+        cursor.execute(NEAR_DUPLICATE_INDEX)
+        print("✅ Added near-duplicate chunk index")
+
+        # Document listing indexes
+        cursor.execute(DOCUMENT_LISTING_INDEXES)
+        print("✅ Added document listing indexes")
+
         # Mark migration as applied
         # cursor.execute(MARK_MIGRATION)
         # print("✅ Marked migration as applied")
@@ -138,6 +192,7 @@ def run_migration():
         cursor.close()
         conn.close()
         print("✅ Migration completed successfully!")
+        print("ℹ️  Build the embedding index after loading data: python reindex.py")
 
         return True
 
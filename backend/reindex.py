@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Embedding index maintenance
+
+Builds the chunk embedding index sized for the rows currently in the table
+(IVFFlat lists or HNSW parameters), concurrently by default, and reports
+build time and size. Run it after bulk loads; large ingests also trigger it
+automatically (VECTOR_INDEX_AUTO_REBUILD).
+
+Usage:
+    python reindex.py                 # rebuild with VECTOR_INDEX_TYPE
+    python reindex.py --type hnsw
+    python reindex.py --status
+    python reindex.py --blocking      # plain CREATE INDEX, faster, blocks writes
+"""
+import argparse
+import json
+import sys
+
+from app.services.vector_index import VectorIndexService, INDEX_TYPES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding index maintenance")
+    parser.add_argument("--status", action="store_true", help="Show the current index and exit")
+    parser.add_argument("--type", choices=INDEX_TYPES, help="Index type (default from settings)")
+    parser.add_argument("--blocking", action="store_true", help="Build without CONCURRENTLY")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            print(json.dumps(VectorIndexService.status(), indent=2, default=str))
+            return True
+        report = VectorIndexService.rebuild(index_type=args.type, concurrently=not args.blocking)
+        print(f"✅ Built {report['type']} index {report['params']} over {report['rows']} rows")
+        print(f"✅ Build time {report['seconds']}s, size {report['size_bytes'] / 1e6:.1f} MB")
+        return True
+    except Exception as e:
+        print(f"❌ Index maintenance failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
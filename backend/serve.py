@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+Production server launcher
+
+Runs the API in several uvicorn worker processes sharing one listening
+socket. The app (settings, models, parsers, Gemini client code) is imported
+once in the supervisor and the workers are forked from it, so that memory
+is shared copy-on-write and workers start without re-importing. Database
+connections and Gemini clients are only created after the fork, in each
+worker's startup event.
+
+SIGTERM or Ctrl+C drains: workers stop accepting connections, finish
+in-flight requests and background jobs (SHUTDOWN_DRAIN_SECONDS each), and
+are killed only if they overrun. Workers that die are restarted.
+
+On platforms without fork, or with a single worker (the default), uvicorn
+runs the app in this process. Background jobs (GET /api/jobs/{id}), the
+slow query history and the /metrics counters live in each worker process:
+with several workers a job can only be polled on the worker that started
+it, and each scrape or admin call sees one worker. Run several workers only
+behind a proxy with sticky routing for /api/jobs, or as separate
+single-worker instances on their own ports, each scraped on its own.
+
+Usage:
+    python serve.py                                   # SERVER_* settings, one worker
+    python serve.py --workers 0 --host 0.0.0.0 --port 8001   # one worker per core
+    python serve.py --no-preload                      # each worker imports the app itself
+"""
+import argparse
+import gc
+import importlib
+import logging
+import os
+import signal
+import sys
+import time
+
+import uvicorn
+
+from app.config import get_settings
+
+logger = logging.getLogger("serve")
+settings = get_settings()
+
+# Imported lazily by the app (see app/utils/gemini.py, app/utils/file_parser.py);
+# preloading them here lets every worker share one copy
+PRELOAD_MODULES = (
+    "google.generativeai",
+    "PyPDF2",
+    "pdfplumber",
+    "pypdfium2",
+    "docx",
+)
+# Restarting a worker that keeps crashing at start-up more often than this is pointless
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def default_workers() -> int:
+    """One worker per core this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def preload():
+    """Import the app and the lazily imported heavy modules before forking"""
+    from app.main import app
+    from app import database
+
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    # Nothing may be connected when forking; connections can't be shared
+    if database.engine is not None:
+        database.engine.dispose()
+    # Keep the garbage collector from touching (and so copying) inherited objects
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def uvicorn_config(app, args) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_SECONDS),
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        log_level=args.log_level,
+    )
+
+
+class Supervisor:
+    """Forks the workers, restarts the ones that die, and drains them on shutdown"""
+
+    def __init__(self, app, args, workers: int):
+        self.app = app
+        self.args = args
+        self.workers = workers
+        self.config = uvicorn_config(app, args)
+        self.socket = self.config.bind_socket()
+        self.children = {}  # pid -> started at
+        self.stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"🚀 Starting {self.workers} workers on http://{self.args.host}:{self.args.port}")
+        for _ in range(self.workers):
+            self._spawn()
+
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if time.monotonic() - started < RESTART_BACKOFF_SECONDS:
+                time.sleep(RESTART_BACKOFF_SECONDS)
+            if not self.stopping:
+                self._spawn()
+        logger.info("All workers stopped")
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # Worker: own process group, so a terminal Ctrl+C reaches only the
+        # supervisor, which forwards a single SIGTERM (a second signal would
+        # make uvicorn skip the graceful shutdown)
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            uvicorn.Server(uvicorn_config(self.app, self.args)).run(sockets=[self.socket])
+            code = 0
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        os._exit(code)
+
+    def _stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"⏳ Draining {len(self.children)} workers...")
+        for pid in self.children:
+            self._signal(pid, signal.SIGTERM)
+        # In-flight requests, then background jobs, each get SHUTDOWN_DRAIN_SECONDS
+        deadline = 2 * settings.SHUTDOWN_DRAIN_SECONDS + 5
+
+        def kill_overdue(signum, frame):
+            for pid in list(self.children):
+                logger.warning(f"Worker {pid} did not stop in time, killing it")
+                self._signal(pid, signal.SIGKILL)
+
+        signal.signal(signal.SIGALRM, kill_overdue)
+        signal.alarm(max(1, int(deadline)))
+
+    @staticmethod
+    def _signal(pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="Worker processes (0 = one per usable core)")
+    parser.add_argument("--no-preload", action="store_true", help="Import the app in each worker instead")
+    parser.add_argument("--forwarded-allow-ips", default="127.0.0.1",
+                        help="Proxies trusted for X-Forwarded-For (client address of allow lists)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    workers = args.workers or default_workers()
+    if workers == 1 or not hasattr(os, "fork"):
+        uvicorn.Server(uvicorn_config("app.main:app", args)).run()
+        return
+
+    logger.warning(
+        f"⚠️ {workers} workers: background jobs, slow queries and metrics are per worker, "
+        "job polls and scrapes only see the worker that serves them"
+    )
+    if args.no_preload:
+        app = "app.main:app"
+    else:
+        started = time.perf_counter()
+        app = preload()
+        logger.info(f"📦 Preloaded the app in {time.perf_counter() - started:.2f}s")
+    Supervisor(app, args, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
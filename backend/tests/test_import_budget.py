@@ -0,0 +1,31 @@
+"""
+Cold-start import budget of the API (see benchmarks/import_budget.py)
+
+The budget defaults to 1000 ms of cumulative import time; set
+IMPORT_BUDGET_MS for slower or faster CI machines. The best of the runs is
+compared, so a busy machine does not fail the test while an eager import
+of the Gemini client or parsers (about 1.5 s before they were made lazy)
+still does.
+"""
+import pytest
+
+from benchmarks.import_budget import DEFAULT_BUDGET_MS, measure
+
+RUNS = 5
+
+
+@pytest.fixture(scope="module")
+def report():
+    return measure("app.main", runs=RUNS, budget_ms=DEFAULT_BUDGET_MS)
+
+
+def test_lazy_modules_not_imported_at_startup(report):
+    assert report["forbidden_imported"] == []
+
+
+def test_cold_import_within_budget(report):
+    slowest = ", ".join(f"{item['module']} {item['ms']} ms" for item in report["slowest_self_ms"][:5])
+    assert report["best_ms"] <= report["budget_ms"], (
+        f"Cold import {report['best_ms']} ms exceeds the {report['budget_ms']} ms budget "
+        f"(slowest: {slowest})"
+    )
@@ -0,0 +1,110 @@
+"""
+Parity of the rewritten text processing with the original implementations
+
+The references (window-scan chunking, multi-pass cleaning) are the ones the
+benchmarks time against; every case here must produce identical output.
+"""
+import random
+
+import pytest
+
+from app.utils.text_processor import StreamingChunker, TextProcessor
+from benchmarks.bench_chunking import reference_chunks
+from benchmarks.bench_text_processor import reference_clean_text
+from benchmarks.corpus import EN_WORDS, RU_WORDS, make_log_text, make_text
+
+CORPUS_CHARS = 200_000
+CHUNK_SIZES = [(800, 200), (150, 40), (50, 0)]
+# Punctuation-heavy alphabet: every cut rule and cleaning rule is hit often
+FUZZ_ALPHABET = ['.', '!', '?', ';', ' ', '\n', '\t', 'A', 'Б', 'x', 'ж', '  ', '\n\n', ' \n ', '\n\n\n']
+FUZZ_CASES = 300
+
+CORPORA = {
+    "en": make_text(CORPUS_CHARS, EN_WORDS),
+    "ru": make_text(CORPUS_CHARS, RU_WORDS),
+    "log": make_log_text(CORPUS_CHARS),
+}
+
+
+def fuzz_texts(seed: int):
+    rng = random.Random(seed)
+    for _ in range(FUZZ_CASES):
+        yield "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 3000))), rng
+
+
+def pages_of(text: str, rng: random.Random) -> list:
+    """Split text at random points, including empty and whitespace-only pages"""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 12)))
+    pages = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+    if rng.random() < 0.3:
+        pages.insert(rng.randint(0, len(pages)), " \n ")
+    return pages
+
+
+def streamed(pages: list, chunk_size: int, overlap: int) -> tuple:
+    chunker = StreamingChunker(chunk_size=chunk_size, overlap=overlap, keep_text=True)
+    chunks, spans = [], []
+    for page in pages + [None]:
+        batch = chunker.feed(page) if page is not None else chunker.finish()
+        chunks.extend(batch)
+        # span() resolves the chunks of the last call only
+        spans.extend(chunker.span(start, end) for _, start, end in batch)
+    return chunks, spans, chunker.text
+
+
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+@pytest.mark.parametrize("chunk_size,overlap", CHUNK_SIZES)
+def test_smart_chunk_text_matches_reference(corpus, chunk_size, overlap):
+    text = CORPORA[corpus]
+    assert TextProcessor.smart_chunk_text(text, chunk_size, overlap) == reference_chunks(text, chunk_size, overlap)
+
+
+def test_smart_chunk_text_matches_reference_fuzz():
+    for text, rng in fuzz_texts(5):
+        chunk_size = rng.choice([1, 50, 100, 150])
+        overlap = rng.choice([0, 10, 40])
+        assert TextProcessor.smart_chunk_text(text, chunk_size, overlap) == reference_chunks(
+            text, chunk_size, overlap
+        ), (text, chunk_size, overlap)
+
+
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+def test_clean_text_matches_reference(corpus):
+    assert TextProcessor.clean_text(CORPORA[corpus]) == reference_clean_text(CORPORA[corpus])
+
+
+def test_clean_text_matches_reference_fuzz():
+    for text, _ in fuzz_texts(7):
+        assert TextProcessor.clean_text(text) == reference_clean_text(text), text
+
+
+def test_clean_text_stream_matches_clean_text():
+    for text, rng in fuzz_texts(11):
+        pieces = pages_of(text, rng)
+        assert "".join(TextProcessor.clean_text_stream(pieces)) == TextProcessor.clean_text("".join(pieces)), pieces
+
+
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+@pytest.mark.parametrize("chunk_size,overlap", CHUNK_SIZES)
+def test_streaming_chunker_matches_smart_chunk_text(corpus, chunk_size, overlap):
+    pages = pages_of(CORPORA[corpus], random.Random(3))
+    chunks, spans, text = streamed(pages, chunk_size, overlap)
+    joined = StreamingChunker.SEPARATOR.join(
+        page for page in (TextProcessor.clean_text(page) for page in pages) if page
+    )
+    assert chunks == TextProcessor.smart_chunk_text(joined, chunk_size, overlap)
+    assert text == joined
+    assert [text[start:end] for start, end in spans] == [chunk for chunk, _, _ in chunks]
+
+
+def test_streaming_chunker_matches_smart_chunk_text_fuzz():
+    for text, rng in fuzz_texts(13):
+        chunk_size = rng.choice([1, 50, 100, 150])
+        overlap = rng.choice([0, 10, 40])
+        pages = pages_of(text, rng)
+        chunks, spans, stored = streamed(pages, chunk_size, overlap)
+        joined = StreamingChunker.SEPARATOR.join(
+            page for page in (TextProcessor.clean_text(page) for page in pages) if page
+        )
+        assert chunks == TextProcessor.smart_chunk_text(joined, chunk_size, overlap), (pages, chunk_size, overlap)
+        assert [stored[start:end] for start, end in spans] == [chunk for chunk, _, _ in chunks]